@@ -1,31 +1,112 @@
 import os
 import sys
 import json
-import math
+import argparse
 
-from arewepythonyet.bench import bench
+from arewepythonyet.bench import bench, sample_times
+from arewepythonyet.bench.vmsize import diff_breakdowns
+from arewepythonyet.stats import geometric_mean, arithmetic_mean
+from arewepythonyet.stats import detect_steady_state, fit_power_law
+
+
+# Runs with a noise score above this are left out of the summary, since
+# the machine was busy or throttled while they were running.
+NOISE_THRESHOLD = 0.2
+
+MEGABYTE = 1024.0 * 1024.0
+
+LATENCY_STATS = ("mean", "p50", "p90", "p99", "max")
 
 
 def main(argv):
-    # XXX TODO: use argparse
-    cmd = argv[1]
-    if len(argv) <= 2:
+    parser = argparse.ArgumentParser(prog="arewepythonyet")
+    subparsers = parser.add_subparsers(dest="cmd")
+    bench_parser = subparsers.add_parser("bench",
+        help="perform a benchmark run and record the results")
+    bench_parser.add_argument("root_dir", nargs="?")
+    bench_parser.add_argument("--jobs", "-j", type=int, default=1,
+        help="number of runs to execute in parallel, each pinned to a core")
+    bench_parser.add_argument("--js-worker", choices=("fresh", "shared"),
+        help="run py benchmarks in a long-lived js shell per engine, "
+             "using a fresh or a shared VM for each run; a shared VM has "
+             "its modules and globals reset between runs, but keeps its "
+             "heap and compiled code")
+    bench_parser.add_argument("--resume", metavar="JOURNAL",
+        help="resume an interrupted bench from its journal file")
+    bench_parser.add_argument("--runs", type=int, default=3,
+        help="number of runs of each benchmark on each engine")
+    bench_parser.add_argument("--target-ci", type=float, metavar="WIDTH",
+        help="keep doing runs until the confidence interval is narrower "
+             "than this fraction of the estimate")
+    bench_parser.add_argument("--max-runs", type=int, default=10,
+        help="maximum number of runs when using --target-ci")
+    bench_parser.add_argument("--time-budget", type=float, metavar="SECS",
+        help="stop adding runs when using --target-ci once the runs of "
+             "a benchmark on an engine have taken this long")
+    bench_parser.add_argument("--estimator", choices=("mean", "median"),
+        default="mean", help="statistic used for the confidence interval")
+    bench_parser.add_argument("--preflight", choices=("warn", "refuse", "skip"),
+        default="warn", help="what to do if the machine is busy, throttled "
+                             "or not using the performance cpufreq governor")
+    bench_parser.add_argument("--max-load", type=float, default=1.0,
+        help="highest acceptable load average before starting")
+    bench_parser.add_argument("--max-busy", type=float, default=0.1,
+        metavar="FRACTION", help="highest acceptable fraction of cpu used "
+                                 "by other processes before starting")
+    bench_parser.add_argument("--reuse-cached", action="store_true",
+        help="copy results from a recent bench on this machine rather than "
+             "re-measuring engines and benchmarks that haven't changed")
+    bench_parser.add_argument("--cache-max-age", type=int, default=30,
+        metavar="DAYS", help="oldest results to reuse with --reuse-cached")
+    bench_parser.add_argument("--samples", type=int,
+        help="number of samples per run of each py benchmark, "
+             "rather than the benchmark's own default")
+    bench_parser.add_argument("--warmups", type=int,
+        help="number of unreported warmup samples per run of each "
+             "py benchmark, rather than the benchmark's own default")
+    bench_parser.add_argument("--min-time", type=float, metavar="SECS",
+        help="minimum time for each sample of a py benchmark, which "
+             "is reached by running its workload in a loop")
+    bench_parser.add_argument("--sweep", action="store_true",
+        help="also run each py benchmark at a range of problem sizes, "
+             "to see how each engine scales")
+    summarize_parser = subparsers.add_parser("summarize",
+        help="summarize all recorded results for the website")
+    summarize_parser.add_argument("root_dir", nargs="?")
+    args = parser.parse_args(argv[1:])
+    if args.root_dir is None:
         root_dir = os.path.dirname(os.path.abspath(__file__))
-    elif len(argv) == 3:
-        root_dir = os.path.abspath(argv[2])
     else:
-        raise ValueError("at most two argv required")
-    if cmd == "bench":
-        do_bench(root_dir)
-    elif cmd == "summarize":
+        root_dir = os.path.abspath(args.root_dir)
+    if args.cmd == "bench":
+        do_bench(root_dir,
+            resume=args.resume,
+            jobs=args.jobs,
+            js_worker=args.js_worker,
+            num_runs=args.runs,
+            max_runs=args.max_runs,
+            target_ci=args.target_ci,
+            time_budget=args.time_budget,
+            estimator=args.estimator,
+            preflight=args.preflight,
+            max_load=args.max_load,
+            max_foreign=args.max_busy,
+            reuse_cached=args.reuse_cached,
+            cache_max_age=args.cache_max_age,
+            samples=args.samples,
+            warmups=args.warmups,
+            min_time=args.min_time,
+            sweep=args.sweep,
+        )
+    elif args.cmd == "summarize":
         do_summarize(root_dir)
     else:
-        raise ValueError("unknown command {}".format(cmd))
+        raise ValueError("unknown command {}".format(args.cmd))
     return 0
 
 
-def do_bench(root_dir):
-    results = bench(root_dir)
+def do_bench(root_dir, **options):
+    results = bench(root_dir, **options)
     res_dir = os.path.join(root_dir, "website", "data", "bench")
     if not os.path.isdir(res_dir):
         os.makedirs(res_dir)
@@ -66,71 +147,72 @@ def do_summarize(root_dir):
         "machine": results[-1]["machine_details"]["fingerprint"],
         "platform": results[-1]["machine_details"]["platform"],
     }
-    # For each py benchmark, take the min, max, and best arithmetic mean
-    # across all available runs.  Combine them into a single summary using
-    # geometric mean, so that we can easily normalize for display.
-    py_mean_series = []
-    py_benchmarks = {}
-    prev_results = {}
+    # The py benchmarks and the microbenchmarks are summarized the same way.
+    summary["py"] = summarize_py_category(results, "py", summary_dir)
+    summary["micro"] = summarize_py_category(results, "micro", summary_dir)
+    # For each py benchmark, summarize the peak memory usage of each engine
+    # across all available runs, in the same form as the timing data.
+    # Older results don't include resource usage, so they are skipped.
+    memory_mean_series = []
+    memory_benchmarks = {}
     for res in results:
         res_benchmarks = res["benchmarks"]["py"]
         res_means = {}
         for b_name in res_benchmarks:
-            b_series = py_benchmarks.setdefault(b_name, [])
             b_summary = {
                 "timestamp": res["timestamp"],
                 "machine": res["machine_details"]["fingerprint"],
-                "platform": results[-1]["machine_details"]["platform"],
+                "platform": res["machine_details"]["platform"],
                 "engines": {},
             }
             for e_name in res_benchmarks[b_name]:
-                # For runs in which a particular (benchmark, engine) run failed
-                # we use the previous result from that machine.
-                prev_res_key = (b_summary["machine"], b_name, e_name)
-                runs = res_benchmarks[b_name][e_name]
-                if runs is None:
-                    e_summary = prev_results.get(prev_res_key)
-                    if e_summary is None:
-                        continue
-                else:
-                    e_summary = {
-                        "mean": min(arithmetic_mean(run) for run in runs),
-                        "min": min(min(run) for run in runs),
-                        "max": max(max(run) for run in runs),
-                    }
-                    prev_results[prev_res_key] = e_summary
+                e_details = get_run_details(res, "py", b_name, e_name)
+                if e_details is None:
+                    continue
+                max_rss = [r["rusage"]["max_rss"] for r in e_details["runs"]
+                           if r is not None and r.get("rusage") is not None]
+                if not max_rss:
+                    continue
+                e_summary = {
+                    "mean": arithmetic_mean(max_rss),
+                    "min": min(max_rss),
+                    "max": max(max_rss),
+                }
                 b_summary["engines"][e_name] = e_summary
                 res_means.setdefault(e_name, []).append(e_summary)
-            b_series.append(b_summary)
+            if b_summary["engines"]:
+                memory_benchmarks.setdefault(b_name, []).append(b_summary)
+        if not res_means:
+            continue
         for e_name in res_means:
             res_means[e_name] = {
                 "mean": geometric_mean(r["mean"] for r in res_means[e_name]),
                 "min": geometric_mean(r["min"] for r in res_means[e_name]),
                 "max": geometric_mean(r["max"] for r in res_means[e_name]),
             }
-        py_mean_series.append({
+        memory_mean_series.append({
             "timestamp": res["timestamp"],
             "machine": res["machine_details"]["fingerprint"],
-            "platform": results[-1]["machine_details"]["platform"],
+            "platform": res["machine_details"]["platform"],
             "engines": res_means,
         })
     # Include the latest results in the summary data.
-    summary["py"] = {
-        "geometric_mean": py_mean_series[-1],
-        "benchmarks": dict((b[0], b[1][-1]) for b in py_benchmarks.iteritems()),
+    summary["memory"] = {
+        "geometric_mean": memory_mean_series[-1] if memory_mean_series else None,
+        "benchmarks": dict((b[0], b[1][-1]) for b in memory_benchmarks.iteritems()),
     }
     # Write out the full timeseries for each benchmark to a separate file.
     # For this purpose, we put the latest timestamp first.
-    py_dir = os.path.join(summary_dir, "py")
-    if not os.path.isdir(py_dir):
-        os.makedirs(py_dir)
-    with open(os.path.join(py_dir, "geometric_mean.json"), "w") as f:
-        json_dump({"values": list(reversed(py_mean_series))}, f)
-    pybench_dir = os.path.join(py_dir, "benchmarks")
-    if not os.path.isdir(pybench_dir):
-        os.makedirs(pybench_dir)
-    for b_name, b_series in py_benchmarks.iteritems():
-        with open(os.path.join(pybench_dir, b_name + ".json"), "w") as f:
+    memory_dir = os.path.join(summary_dir, "memory")
+    if not os.path.isdir(memory_dir):
+        os.makedirs(memory_dir)
+    with open(os.path.join(memory_dir, "geometric_mean.json"), "w") as f:
+        json_dump({"values": list(reversed(memory_mean_series))}, f)
+    memorybench_dir = os.path.join(memory_dir, "benchmarks")
+    if not os.path.isdir(memorybench_dir):
+        os.makedirs(memorybench_dir)
+    for b_name, b_series in memory_benchmarks.iteritems():
+        with open(os.path.join(memorybench_dir, b_name + ".json"), "w") as f:
             json_dump({"values": list(reversed(b_series))}, f)
     # For each misc benchmark, we just re-order into a timeseries of means.
     misc_benchmarks = {}
@@ -148,13 +230,32 @@ def do_summarize(root_dir):
                 runs = res_misc[b_name][e_name]
                 if runs is None:
                     continue
+                runs_details = None
                 if isinstance(runs, (int, long, float)):
                     runs = [[runs]]
-                b_summary["engines"][e_name] = {
+                else:
+                    e_details = get_run_details(res, "misc", b_name, e_name)
+                    runs, runs_details, _ = drop_noisy_runs(runs, e_details)
+                e_summary = {
                     "mean": min(arithmetic_mean(run) for run in runs),
                     "min": min(min(run) for run in runs),
                     "max": max(max(run) for run in runs),
                 }
+                # Benchmarks that report the time spent in each phase get
+                # the mean of each phase, for display as a stack.
+                phases = summarize_phases(runs_details)
+                if phases:
+                    e_summary["phases"] = phases
+                instances = summarize_instances(runs_details)
+                if instances:
+                    e_summary["instances"] = instances
+                imports = summarize_imports(runs_details)
+                if imports:
+                    e_summary["imports"] = imports
+                    fetch = summarize_import_fetch(runs_details)
+                    if fetch is not None:
+                        e_summary["fetch"] = fetch
+                b_summary["engines"][e_name] = e_summary
             b_series.append(b_summary)
     summary["misc"] = {
         "benchmarks": dict((b[0], b[1][-1]) for b in misc_benchmarks.iteritems()),
@@ -166,6 +267,55 @@ def do_summarize(root_dir):
     for b_name, b_series in misc_benchmarks.iteritems():
         with open(os.path.join(misc_dir, b_name + ".json"), "w") as f:
             json_dump({"values": b_series}, f)
+    # For the file size benchmarks, we also report the total size of each
+    # build under each compression codec.  Older results don't include
+    # this breakdown, so they are skipped.
+    size_series = []
+    for res in results:
+        e_details = get_run_details(res, "misc", "file_size_gz")
+        if not e_details:
+            continue
+        size_series.append({
+            "timestamp": res["timestamp"],
+            "machine": res["machine_details"]["fingerprint"],
+            "platform": res["machine_details"]["platform"],
+            "builds": dict(
+                (name, sizes["totals"]) for (name, sizes)
+                in e_details.iteritems() if sizes is not None
+            ),
+        })
+    summary["file_sizes"] = size_series[-1] if size_series else None
+    sizes_dir = os.path.join(summary_dir, "misc")
+    with open(os.path.join(sizes_dir, "file_sizes.json"), "w") as f:
+        json_dump({"values": list(reversed(size_series))}, f)
+    # For the raw file size benchmark, compare the breakdown of the size of
+    # the VM between consecutive results, to name the parts that grew most.
+    vm_size_series = []
+    prev_breakdowns = {}
+    for res in results:
+        e_details = get_run_details(res, "misc", "file_size_raw")
+        if not e_details:
+            continue
+        diffs = {}
+        for name, breakdown in e_details.iteritems():
+            if breakdown is None:
+                continue
+            prev = prev_breakdowns.get(name)
+            if prev is not None:
+                diffs[name] = diff_breakdowns(prev[1], breakdown)
+                diffs[name]["previous_timestamp"] = prev[0]
+            prev_breakdowns[name] = (res["timestamp"], breakdown)
+        vm_size_series.append({
+            "timestamp": res["timestamp"],
+            "machine": res["machine_details"]["fingerprint"],
+            "platform": res["machine_details"]["platform"],
+            "builds": dict((name, breakdown) for (name, breakdown)
+                           in e_details.iteritems() if breakdown is not None),
+            "diffs": diffs,
+        })
+    summary["vm_size"] = vm_size_series[-1] if vm_size_series else None
+    with open(os.path.join(sizes_dir, "vm_size.json"), "w") as f:
+        json_dump({"values": list(reversed(vm_size_series))}, f)
     # For each bridge benchmark, normalize each engine to its native js
     # runtime, and take the min, max, and best arithmetic mean across
     # all available runs.  Combine them into a single summary using
@@ -195,6 +345,14 @@ def do_summarize(root_dir):
                     if e_summary is None:
                         continue
                 else:
+                    py_runs, py_details, _ = drop_noisy_runs(
+                        py_runs,
+                        get_run_details(res, "bridge", b_name, "py", e_name),
+                    )
+                    js_runs, js_details, _ = drop_noisy_runs(
+                        js_runs,
+                        get_run_details(res, "bridge", b_name, "js", e_name),
+                    )
                     e_py_summary = {
                         "mean": min(arithmetic_mean(run) for run in py_runs),
                         "min": min(min(run) for run in py_runs),
@@ -210,6 +368,42 @@ def do_summarize(root_dir):
                         "min": e_py_summary["min"] / e_js_summary["min"],
                         "max": e_py_summary["max"] / e_js_summary["max"],
                     }
+                    # Benchmarks that move data across the bridge also
+                    # report their throughput on both sides.
+                    py_transfers = summarize_transfers(py_details)
+                    js_transfers = summarize_transfers(js_details)
+                    if py_transfers or js_transfers:
+                        e_summary["transfer"] = {
+                            "py": py_transfers,
+                            "js": js_transfers,
+                        }
+                    # Benchmarks that time individual calls report the
+                    # distribution of their latency on both sides.
+                    py_latencies = summarize_latencies(py_details)
+                    js_latencies = summarize_latencies(js_details)
+                    if py_latencies or js_latencies:
+                        e_summary["latency"] = {
+                            "py": py_latencies,
+                            "js": js_latencies,
+                        }
+                    # Benchmarks that move structured data report the rate
+                    # of each strategy for doing so on both sides.
+                    py_marshaling = summarize_marshaling(py_details)
+                    js_marshaling = summarize_marshaling(js_details)
+                    if py_marshaling or js_marshaling:
+                        e_summary["marshal"] = {
+                            "py": py_marshaling,
+                            "js": js_marshaling,
+                        }
+                    # Benchmarks that hand over numeric buffers report the
+                    # throughput of each method, and which were available.
+                    py_buffers = summarize_buffers(py_details)
+                    js_buffers = summarize_buffers(js_details)
+                    if py_buffers or js_buffers:
+                        e_summary["buffer"] = {
+                            "py": py_buffers,
+                            "js": js_buffers,
+                        }
                     prev_results[prev_res_key] = e_summary
                 b_summary["engines"][e_name] = e_summary
                 res_means.setdefault(e_name, []).append(e_summary)
@@ -244,11 +438,133 @@ def do_summarize(root_dir):
     for b_name, b_series in bridge_benchmarks.iteritems():
         with open(os.path.join(bridgebench_dir, b_name + ".json"), "w") as f:
             json_dump({"values": list(reversed(b_series))}, f)
+    # For each py benchmark swept over problem sizes, give the curve of
+    # time per loop against size for each engine, and fit a scaling exponent
+    # to it.  Only some bench results include sweeps, so we report the
+    # latest sweep of each benchmark.
+    sweep_benchmarks = {}
+    for res in results:
+        res_benchmarks = res["benchmarks"].get("sweep", {})
+        for b_name in res_benchmarks:
+            b_summary = {
+                "timestamp": res["timestamp"],
+                "machine": res["machine_details"]["fingerprint"],
+                "platform": res["machine_details"]["platform"],
+                "engines": {},
+            }
+            for e_name in res_benchmarks[b_name]:
+                runs = res_benchmarks[b_name][e_name]
+                if runs is None:
+                    continue
+                e_details = get_run_details(res, "sweep", b_name, e_name)
+                _, runs_details, _ = drop_noisy_runs(runs, e_details)
+                e_summary = summarize_sweep(runs_details)
+                if e_summary is not None:
+                    b_summary["engines"][e_name] = e_summary
+            if b_summary["engines"]:
+                sweep_benchmarks.setdefault(b_name, []).append(b_summary)
+    summary["sweep"] = {
+        "benchmarks": dict((b[0], b[1][-1]) for b in sweep_benchmarks.iteritems()),
+    }
+    # Write out the full timeseries for each benchmark to a separate file.
+    # For this purpose, we put the latest timestamp first.
+    sweep_dir = os.path.join(summary_dir, "sweep", "benchmarks")
+    if not os.path.isdir(sweep_dir):
+        os.makedirs(sweep_dir)
+    for b_name, b_series in sweep_benchmarks.iteritems():
+        with open(os.path.join(sweep_dir, b_name + ".json"), "w") as f:
+            json_dump({"values": list(reversed(b_series))}, f)
     # Write out the summary data.
     with open(os.path.join(summary_dir, "summary.json"), "w") as f:
         json_dump(summary, f)
 
 
+def summarize_py_category(results, category, summary_dir):
+    """Summarize the timing results of a category of py benchmarks.
+
+    For each benchmark, take the min, max, and best arithmetic mean across
+    all available runs.  Combine them into a single summary using geometric
+    mean, so that we can easily normalize for display.  We also report the
+    steady-state speed and warmup cost separately.  Runs done while the
+    machine was noisy are dropped where possible.
+
+    The full timeseries for each benchmark and for the geometric mean are
+    written out under summary_dir, and the latest results are returned.
+    Results from before the category existed are skipped.
+    """
+    mean_series = []
+    benchmarks = {}
+    prev_results = {}
+    for res in results:
+        if category not in res["benchmarks"]:
+            continue
+        res_benchmarks = res["benchmarks"][category]
+        res_means = {}
+        for b_name in res_benchmarks:
+            b_series = benchmarks.setdefault(b_name, [])
+            b_summary = {
+                "timestamp": res["timestamp"],
+                "machine": res["machine_details"]["fingerprint"],
+                "platform": results[-1]["machine_details"]["platform"],
+                "engines": {},
+            }
+            for e_name in res_benchmarks[b_name]:
+                # For runs in which a particular (benchmark, engine) run failed
+                # we use the previous result from that machine.
+                prev_res_key = (b_summary["machine"], b_name, e_name)
+                runs = res_benchmarks[b_name][e_name]
+                if runs is None:
+                    e_summary = prev_results.get(prev_res_key)
+                    if e_summary is None:
+                        continue
+                else:
+                    e_details = get_run_details(res, category, b_name, e_name)
+                    runs, runs_details, noisy_runs = drop_noisy_runs(
+                        runs, e_details
+                    )
+                    e_summary = {
+                        "mean": min(arithmetic_mean(run) for run in runs),
+                        "min": min(min(run) for run in runs),
+                        "max": max(max(run) for run in runs),
+                        "noisy_runs": noisy_runs,
+                    }
+                    e_summary.update(summarize_warmup(runs, runs_details))
+                    prev_results[prev_res_key] = e_summary
+                b_summary["engines"][e_name] = e_summary
+                res_means.setdefault(e_name, []).append(e_summary)
+            b_series.append(b_summary)
+        for e_name in res_means:
+            res_means[e_name] = {
+                "mean": geometric_mean(r["mean"] for r in res_means[e_name]),
+                "min": geometric_mean(r["min"] for r in res_means[e_name]),
+                "max": geometric_mean(r["max"] for r in res_means[e_name]),
+            }
+        mean_series.append({
+            "timestamp": res["timestamp"],
+            "machine": res["machine_details"]["fingerprint"],
+            "platform": results[-1]["machine_details"]["platform"],
+            "engines": res_means,
+        })
+    # Write out the full timeseries for each benchmark to a separate file.
+    # For this purpose, we put the latest timestamp first.
+    category_dir = os.path.join(summary_dir, category)
+    if not os.path.isdir(category_dir):
+        os.makedirs(category_dir)
+    with open(os.path.join(category_dir, "geometric_mean.json"), "w") as f:
+        json_dump({"values": list(reversed(mean_series))}, f)
+    bench_dir = os.path.join(category_dir, "benchmarks")
+    if not os.path.isdir(bench_dir):
+        os.makedirs(bench_dir)
+    for b_name, b_series in benchmarks.iteritems():
+        with open(os.path.join(bench_dir, b_name + ".json"), "w") as f:
+            json_dump({"values": list(reversed(b_series))}, f)
+    # Include the latest results in the summary data.
+    return {
+        "geometric_mean": mean_series[-1] if mean_series else None,
+        "benchmarks": dict((b[0], b[1][-1]) for b in benchmarks.iteritems()),
+    }
+
+
 def json_dump(data, f):
     json.dump(data, f,
         ensure_ascii=True,
@@ -258,19 +574,344 @@ def json_dump(data, f):
     )
 
 
-def geometric_mean(results):
-    count = 0
-    product = 1
-    for res in results:
-        product *= res
-        count += 1
-    return math.pow(product, 1.0 / count)
+def get_run_details(res, *key):
+    """Get the recorded run details for the given key, if any."""
+    details = res.get("run_details")
+    for k in key:
+        if not details:
+            return None
+        details = details.get(k)
+    return details
 
 
-def arithmetic_mean(results):
-    total = 0.0
-    count = 0
-    for res in results:
-        total += res
-        count += 1
-    return total / count
+def drop_noisy_runs(runs, e_details=None):
+    """Drop runs whose noise score is above NOISE_THRESHOLD.
+
+    Returns the remaining runs, their corresponding list of run details
+    (or None if no details were recorded), and the number of runs dropped.
+    If every run was noisy then they are all kept, since a noisy result is
+    better than no result at all.
+    """
+    if e_details is None:
+        return runs, None, 0
+    runs_details = e_details["runs"]
+    kept = [(run, run_details) for (run, run_details)
+            in zip(runs, runs_details) if not is_noisy(run_details)]
+    if not kept:
+        return runs, runs_details, 0
+    return [k[0] for k in kept], [k[1] for k in kept], len(runs) - len(kept)
+
+
+def is_noisy(run_details):
+    if run_details is None or run_details.get("noise") is None:
+        return False
+    return run_details["noise"]["score"] > NOISE_THRESHOLD
+
+
+def summarize_phases(runs_details):
+    """Get the mean time spent in each phase reported by "phase" records."""
+    phases = {}
+    if not runs_details:
+        return phases
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        for record in run_details.get("records", ()):
+            if "phase" in record:
+                phases.setdefault(record["phase"], []).append(record["time"])
+    for phase, times in phases.iteritems():
+        phases[phase] = arithmetic_mean(times)
+    return phases
+
+
+def summarize_instances(runs_details):
+    """Summarize per-VM records from benchmarks creating several VMs.
+
+    For each mode of creating VMs, this gives the mean latency of the first
+    VM and of subsequent VMs, and the mean memory added per VM where known,
+    both in all and for just the VM's asm.js heap.
+    """
+    records = {}
+    if not runs_details:
+        return records
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        for record in run_details.get("records", ()):
+            if "vm" in record:
+                records.setdefault(record["mode"], []).append(record)
+    summary = {}
+    for mode, mode_records in records.iteritems():
+        first = [r["time"] for r in mode_records if r["vm"] == 0]
+        later = [r["time"] for r in mode_records if r["vm"] > 0]
+        growth = [r["heap_growth"] for r in mode_records
+                  if r.get("heap_growth") is not None]
+        vm_heap = [r["vm_heap"] for r in mode_records
+                   if r.get("vm_heap") is not None]
+        summary[mode] = {
+            "first": arithmetic_mean(first) if first else None,
+            "subsequent": arithmetic_mean(later) if later else None,
+            "heap_growth": arithmetic_mean(growth) if growth else None,
+            "vm_heap": arithmetic_mean(vm_heap) if vm_heap else None,
+        }
+    return summary
+
+
+def summarize_sweep(runs_details):
+    """Summarize the scaling of a benchmark from its sized sample records.
+
+    For each size we take the best mean time per loop across runs, as for
+    the py benchmarks, and fit a power law to the resulting curve.  Returns
+    None if there weren't at least two sizes to fit.
+    """
+    if not runs_details:
+        return None
+    best = {}
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        times = {}
+        for record in run_details.get("records", ()):
+            if record.get("size") is None or record.get("warmup"):
+                continue
+            elapsed = record["elapsed"] - record["overhead"]
+            times.setdefault(record["size"], []).append(
+                elapsed / record["loops"]
+            )
+        for size, size_times in times.iteritems():
+            mean = arithmetic_mean(size_times)
+            if size not in best or mean < best[size]:
+                best[size] = mean
+    sizes = sorted(s for s in best if best[s] > 0)
+    if len(sizes) < 2:
+        return None
+    times = [best[s] for s in sizes]
+    exponent, coefficient = fit_power_law(sizes, times)
+    return {
+        "sizes": sizes,
+        "times": times,
+        "exponent": exponent,
+        "coefficient": coefficient,
+    }
+
+
+def summarize_imports(runs_details):
+    """Summarize per-module records from the import time benchmark.
+
+    For each module this gives the mean time taken to execute its import,
+    the mean time taken to fetch its data where that was measured, and the
+    bytes of module source that it pulled in.  A module is marked as
+    preloaded if the engine had already imported it before it was timed.
+    """
+    records = {}
+    if not runs_details:
+        return records
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        for record in run_details.get("records", ()):
+            if "module" in record:
+                records.setdefault(record["module"], []).append(record)
+    summary = {}
+    for module, module_records in records.iteritems():
+        fetch = [r["fetch"] for r in module_records if "fetch" in r]
+        summary[module] = {
+            "exec": arithmetic_mean(r["exec"] for r in module_records),
+            "fetch": arithmetic_mean(fetch) if fetch else None,
+            "bytes": max(r["bytes"] for r in module_records),
+            "preloaded": any(r.get("preloaded") for r in module_records),
+        }
+    return summary
+
+
+def summarize_import_fetch(runs_details):
+    """Give the mean total time per run spent fetching module data.
+
+    This is only measured on the js engines, and is left out of the time
+    reported for the import time benchmark so that it is comparable with
+    the native engines.  Returns None if no fetch times were recorded.
+    """
+    totals = []
+    for run_details in runs_details or ():
+        if run_details is None:
+            continue
+        fetch = [record["fetch"] for record in run_details.get("records", ())
+                 if "module" in record and "fetch" in record]
+        if fetch:
+            totals.append(sum(fetch))
+    if not totals:
+        return None
+    return arithmetic_mean(totals)
+
+
+def summarize_transfers(runs_details):
+    """Summarize records of data transfers from the bridge benchmarks.
+
+    For each direction and kind of data, this gives the best throughput in
+    MB/s at each size, and the time per call at the smallest size as the
+    fixed overhead of a call.  Sizes are counts of characters, while the
+    throughput is of the "bytes" given in each record, since a character
+    may take more than one byte.  Sizes that were skipped in every run
+    are left out.
+    """
+    best = {}
+    nbytes = {}
+    if not runs_details:
+        return best
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        for record in run_details.get("records", ()):
+            if "direction" not in record or "size" not in record:
+                continue
+            # Sizes that ran out of memory weren't timed.
+            if record.get("skipped"):
+                continue
+            key = "{}:{}".format(record["direction"], record["kind"])
+            per_call = record["time"] / record["calls"]
+            sizes = best.setdefault(key, {})
+            if record["size"] not in sizes or per_call < sizes[record["size"]]:
+                sizes[record["size"]] = per_call
+            nbytes[key, record["size"]] = record.get("bytes", record["size"])
+    summary = {}
+    for key, sizes in best.iteritems():
+        ordered = sorted(sizes)
+        summary[key] = {
+            "sizes": ordered,
+            "bytes": [nbytes[key, size] for size in ordered],
+            "mb_per_sec": [
+                nbytes[key, size] / sizes[size] / MEGABYTE
+                if sizes[size] > 0 else None
+                for size in ordered
+            ],
+            "call_overhead": sizes[ordered[0]],
+        }
+    return summary
+
+
+def summarize_latencies(runs_details):
+    """Summarize records of per-call latency from the bridge benchmarks.
+
+    Each record gives the mean and percentiles of the latency of the calls
+    made in some mode.  For each mode we take the best of each statistic
+    across all the records, as we do for the mean of the py benchmarks.
+    Where calls were timed in batches, the percentiles are of the mean
+    latency in each batch, and "batch" gives the number of calls in one.
+    """
+    summary = {}
+    if not runs_details:
+        return summary
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        for record in run_details.get("records", ()):
+            if "mode" not in record or "p50" not in record:
+                continue
+            best = summary.setdefault(record["mode"], {})
+            if "batch" in record:
+                best["batch"] = record["batch"]
+            for stat in LATENCY_STATS:
+                if stat not in best or record[stat] < best[stat]:
+                    best[stat] = record[stat]
+    return summary
+
+
+def summarize_marshaling(runs_details):
+    """Summarize records of structured data moved by the bridge benchmarks.
+
+    For each shape of data and strategy for moving it, this gives the best
+    rate in objects per second at each size of structure.
+    """
+    best = {}
+    if not runs_details:
+        return best
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        for record in run_details.get("records", ()):
+            if "strategy" not in record:
+                continue
+            if record.get("objects_per_sec") is None:
+                continue
+            key = "{}:{}".format(record["shape"], record["strategy"])
+            rates = best.setdefault(key, {})
+            rate = record["objects_per_sec"]
+            if record["size"] not in rates or rate > rates[record["size"]]:
+                rates[record["size"]] = rate
+    summary = {}
+    for key, rates in best.iteritems():
+        ordered = sorted(rates)
+        summary[key] = {
+            "sizes": ordered,
+            "objects_per_sec": [rates[size] for size in ordered],
+        }
+    return summary
+
+
+def summarize_buffers(runs_details):
+    """Summarize records of numeric buffers handed over by the bridge benchmarks.
+
+    For each kernel and method of getting its data into js, this gives the
+    best throughput in MB/s, and whether the method was available at all,
+    since a zero-copy view of the heap is not possible on every engine.
+    """
+    summary = {}
+    if not runs_details:
+        return summary
+    for run_details in runs_details:
+        if run_details is None:
+            continue
+        for record in run_details.get("records", ()):
+            if "kernel" not in record or "method" not in record:
+                continue
+            key = "{}:{}".format(record["kernel"], record["method"])
+            entry = summary.setdefault(key, {
+                "available": False,
+                "mb_per_sec": None,
+            })
+            if not record["available"]:
+                continue
+            entry["available"] = True
+            rate = record.get("mb_per_sec")
+            if rate is not None:
+                if entry["mb_per_sec"] is None or rate > entry["mb_per_sec"]:
+                    entry["mb_per_sec"] = rate
+    return summary
+
+
+def summarize_warmup(runs, runs_details=None):
+    """Summarize steady-state speed and warmup cost across runs.
+
+    This uses the steady state detected by the runner where available,
+    and otherwise detects it from the raw iteration results.  For the py
+    benchmarks the runner finds it in the series of all the harness's
+    samples, including its warmups, so those count towards the warmup.
+    We report the best steady-state mean across runs as "steady", the
+    average extra time spent in iterations before reaching steady state as
+    "warmup", and the number of runs that never reached a steady state as
+    "unsteady_runs".
+    """
+    steady_means = []
+    warmup_costs = []
+    unsteady_runs = 0
+    for i, run in enumerate(runs):
+        run_details = None
+        if runs_details is not None:
+            run_details = runs_details[i]
+        series = run
+        if run_details is None or "steady" not in run_details:
+            run_details = detect_steady_state(series)
+        elif run_details.get("series") == "samples":
+            series = sample_times(run_details["records"])
+        if not run_details["steady"]:
+            unsteady_runs += 1
+            continue
+        start, end = run_details["steady_state"]
+        steady_mean = arithmetic_mean(series[start:end])
+        steady_means.append(steady_mean)
+        warmup_costs.append(max(0, sum(series[:start]) - start * steady_mean))
+    summary = {"unsteady_runs": unsteady_runs}
+    if steady_means:
+        summary["steady"] = min(steady_means)
+        summary["warmup"] = arithmetic_mean(warmup_costs)
+    return summary
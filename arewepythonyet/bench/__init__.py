@@ -12,13 +12,54 @@ then by individual benchmark, then by python engine in use.  For each engine
 we record a list of output from multiple runs, each of which may produce
 a sequence of individual timing results.
 
+Metadata about each individual run, such as the cpu core it was pinned to,
+is recorded in a parallel set of nested dicts under the "run_details" key.
+For each engine this holds the list of per-run metadata, the number of runs
+performed and, when doing runs until a target confidence interval is reached,
+the relative width of the bootstrap confidence interval.
+Besides its timing results, a benchmark may print lines of the form
+"@awpy <json>" holding other information about the run, such as the time
+spent in each phase of starting up; these are collected in the "records"
+list of the run's metadata.  The py benchmarks use a shared timing harness
+from bench/lib, which prints a record for each sample giving its elapsed time
+and number of inner loops; the time per loop of each sample other than the
+warmups is taken as a timing result.  The metadata for each run also
+includes the number of warmup iterations before it reached a steady state,
+or a flag saying that it never did; for the py benchmarks this is detected
+from all the harness's samples, so it counts the harness warmups too, and the resource usage of the process
+(peak memory, cpu time, context switches and page faults).
+
+When sweeping, each py benchmark that declares a problem size is also run
+at each of the sizes it sweeps over, under the "sweep" category.  Each run
+of a sweep is a dict mapping each size to its times, rather than a list of
+times, and the size of each sample is also given in its record.
+
+A background thread samples how busy the machine is while the benchmarks
+are running; these samples are recorded under the "telemetry" key, and
+each run's metadata includes a "noise" score computed from them.  Before
+starting we check that the machine is quiet, and warn or refuse to run if
+it is not.
+
+Each engine's metadata also includes a "cache_key" hashing the engine's
+binaries and the benchmark's source.  When reuse_cached is set, any engine
+whose cache key matches a recent result from the same machine has that
+result copied rather than measured again, and is marked as "reused_from"
+the timestamp of the original bench.
+
+As each run completes it is also appended to a journal file, so that an
+interrupted bench can be resumed by passing that file as the "resume"
+argument to bench().
+
 """
 
 import os
 import sys
 import json
 import uuid
+import time
 import psutil
+import select
+import shutil
 import hashlib
 import tempfile
 import threading
@@ -27,24 +68,146 @@ import contextlib
 import subprocess
 from datetime import datetime
 
+from arewepythonyet.stats import ESTIMATORS, relative_ci_width
+from arewepythonyet.stats import detect_steady_state
+from arewepythonyet.bench.cache import ResultCache, hash_files, hash_strings
+from arewepythonyet.bench.cache import load_file_hashes, save_file_hashes
+from arewepythonyet.bench.journal import Journal
+from arewepythonyet.bench.probes import get_default_probes, run_probes
+from arewepythonyet.bench.process import communicate, monotonic, tail
+from arewepythonyet.bench.process import ProcessFailed, ProcessTimeout
+from arewepythonyet.bench.process import kill_process_group, new_process_group
+from arewepythonyet.bench.scheduler import Scheduler, pin_to_core
+from arewepythonyet.bench.sizes import SizeCache, measure_sizes
+from arewepythonyet.bench.vmsize import analyze_vm
+from arewepythonyet.bench.telemetry import NoiseSampler, preflight
 
-def bench(root_dir=None):
+
+def bench(root_dir=None, resume=None, **options):
     if root_dir is not None:
         root_dir = os.path.abspath(root_dir)
     else:
         dirname= os.path.dirname
         root_dir = dirname(dirname(dirname(os.path.abspath(__file__))))
-    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
     machine_details = get_machine_details()
-    benv = BenchEnvironment(root_dir)
-    results = {}
-    results["timestamp"] = timestamp
-    results["machine_details"] = machine_details
-    results["build_details"] = benv.get_build_details()
-    results["benchmarks"] = benv.run_benchmarks()
+    if resume is not None:
+        journal = Journal.resume(resume)
+        header = journal.header
+        fingerprint = header["machine_details"]["fingerprint"]
+        if fingerprint != machine_details["fingerprint"]:
+            raise RuntimeError("Journal was recorded on a different machine")
+        print "Resuming from {}".format(resume)
+        timestamp = header["timestamp"]
+        # Keep the options that affect the measurements, but allow
+        # a different level of parallelism for the remaining runs.
+        jobs = options.get("jobs", 1)
+        options = dict(header["bench_options"])
+        options["jobs"] = jobs
+        benv = BenchEnvironment(root_dir, journal=journal, **options)
+        build_details = header["build_details"]
+    else:
+        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        benv = BenchEnvironment(root_dir, **options)
+        build_details = benv.get_build_details()
+        journal_path = benv.abspath("build", "journal",
+            "{timestamp}-{platform}-{fingerprint}.jsonl".format(
+                timestamp=timestamp,
+                platform=machine_details["platform"],
+                fingerprint=machine_details["fingerprint"],
+            )
+        )
+        print "Journalling results to {}".format(journal_path)
+        benv.journal = Journal.create(journal_path, {
+            "timestamp": timestamp,
+            "machine_details": machine_details,
+            "build_details": build_details,
+            "bench_options": benv.get_options(),
+        })
+    try:
+        results = {}
+        results["timestamp"] = timestamp
+        results["machine_details"] = machine_details
+        results["build_details"] = build_details
+        results["bench_options"] = benv.get_options()
+        results["benchmarks"] = benv.run_benchmarks()
+        results["run_details"] = benv.run_details
+        results["telemetry"] = benv.sampler.samples
+    finally:
+        benv.close()
+    return results
+
+
+RECORD_PREFIX = "@awpy "
+
+# Number of samples taken at each size when sweeping over problem sizes.
+SWEEP_SAMPLES = 5
+
+
+def parse_output(output, cmd, details=None):
+    """Parse the output of a benchmark into a list of timing results.
+
+    Each line of output holds either timing results as whitespace-separated
+    numbers, or a record starting with RECORD_PREFIX followed by a JSON
+    object.  Records are collected into details["records"], if given.
+    Records of samples from the py benchmark harness also give a result,
+    which is the time per inner loop, unless they're for a warmup.
+    """
+    results = []
+    records = []
+    for ln in output.split("\n"):
+        if ln.startswith(RECORD_PREFIX):
+            record = json.loads(ln[len(RECORD_PREFIX):])
+            records.append(record)
+            if "loops" in record and not record.get("warmup"):
+                elapsed = record["elapsed"] - record["overhead"]
+                results.append(elapsed / record["loops"])
+            continue
+        try:
+            results.extend(float(res) for res in ln.split())
+        except ValueError:
+            print "ERROR:", output
+            raise
+    if details is not None and records:
+        details["records"] = records
+    if not results:
+        raise RuntimeError("No output from {}".format(cmd))
     return results
 
 
+def sample_times(records):
+    """Get the time per loop of every sample from the py benchmark harness.
+
+    Unlike the timing results, this includes the harness's warmup samples,
+    so it gives the whole series of iterations that the run went through.
+    Returns an empty list if there are no sample records.
+    """
+    times = []
+    for record in records:
+        if "loops" in record:
+            elapsed = record["elapsed"] - record["overhead"]
+            times.append(elapsed / record["loops"])
+    return times
+
+
+def split_by_size(records):
+    """Group the times per loop given by sized sample records by size.
+
+    Returns a dict mapping each size, as a string so that it survives JSON,
+    to the list of times per loop of the samples at that size.
+    """
+    sizes = {}
+    for record in records:
+        if record.get("size") is None or record.get("warmup"):
+            continue
+        elapsed = record["elapsed"] - record["overhead"]
+        sizes.setdefault(str(record["size"]), []).append(
+            elapsed / record["loops"]
+        )
+    if not sizes:
+        raise RuntimeError("No sized samples in output")
+    return sizes
+
+
 def get_machine_details():
     mac_address = uuid.getnode()
     if bin(mac_address)[9] == 1:
@@ -64,9 +227,45 @@ def get_machine_details():
 
 class BenchEnvironment(object):
 
-    def __init__(self, root_dir, num_runs=3):
+    def __init__(self, root_dir, num_runs=3, jobs=1, js_worker=None,
+                 journal=None, max_runs=10, target_ci=None, time_budget=None,
+                 estimator="mean", preflight="warn", max_load=1.0,
+                 max_foreign=0.1, reuse_cached=False, cache_max_age=30,
+                 samples=None, warmups=None, min_time=None, sweep=False):
+        if js_worker not in (None, "fresh", "shared"):
+            raise ValueError("unknown js worker mode {}".format(js_worker))
+        if estimator not in ESTIMATORS:
+            raise ValueError("unknown estimator {}".format(estimator))
+        if preflight not in ("warn", "refuse", "skip"):
+            raise ValueError("unknown preflight mode {}".format(preflight))
         self.root_dir = root_dir
         self.num_runs = num_runs
+        self.max_runs = max(max_runs, num_runs)
+        self.target_ci = target_ci
+        self.time_budget = time_budget
+        self.estimator = estimator
+        self.js_worker = js_worker
+        self.journal = journal
+        self.preflight = preflight
+        self.max_load = max_load
+        self.max_foreign = max_foreign
+        self.scheduler = Scheduler(jobs)
+        self.sampler = NoiseSampler()
+        self.reuse_cached = reuse_cached
+        self.cache_max_age = cache_max_age
+        self.samples = samples
+        self.warmups = warmups
+        self.min_time = min_time
+        self.sweep = sweep
+        self.cache = None
+        if reuse_cached:
+            self.cache = ResultCache(
+                self.abspath("website", "data", "bench"),
+                get_machine_details()["fingerprint"],
+                cache_max_age,
+            )
+        self.run_details = {}
+        self._file_sizes = None
         self.engines = []
         self.engines.append(NativeEngine(self, "cpython", "python"))
         self.engines.append(NativeEngine(self, "pypy"))
@@ -76,6 +275,63 @@ class BenchEnvironment(object):
             if os.path.exists(lib):
                 for js_shell in ("js", "d8"):
                     self.engines.append(JSEngine(self, js_shell, pypyjs_build))
+        # Variants of the js engines that start up with a code cache,
+        # which are only used for measuring load time.
+        self.code_cache_engines = []
+        for engine in self.engines:
+            if isinstance(engine, JSEngine):
+                shell_name = os.path.basename(engine.js_shell)
+                if shell_name in CodeCacheJSEngine.SHELL_ARGS:
+                    for mode in CodeCacheJSEngine.MODES:
+                        self.code_cache_engines.append(CodeCacheJSEngine(
+                            self, shell_name,
+                            os.path.basename(engine.pypyjs_build), mode
+                        ))
+
+    def close(self):
+        self.scheduler.close()
+        for engine in self.engines + self.code_cache_engines:
+            engine.close()
+        if self.journal is not None:
+            self.journal.close()
+
+    def get_options(self):
+        return {
+            "num_runs": self.num_runs,
+            "jobs": self.scheduler.jobs,
+            "js_worker": self.js_worker,
+            "max_runs": self.max_runs,
+            "target_ci": self.target_ci,
+            "time_budget": self.time_budget,
+            "estimator": self.estimator,
+            "preflight": self.preflight,
+            "max_load": self.max_load,
+            "max_foreign": self.max_foreign,
+            "reuse_cached": self.reuse_cached,
+            "cache_max_age": self.cache_max_age,
+            "samples": self.samples,
+            "warmups": self.warmups,
+            "min_time": self.min_time,
+            "sweep": self.sweep,
+        }
+
+    def get_harness_args(self):
+        """Command-line arguments for the py benchmark timing harness."""
+        args = []
+        for name in ("samples", "warmups", "min_time"):
+            value = getattr(self, name)
+            if value is not None:
+                args.extend(["--" + name.replace("_", "-"), str(value)])
+        return args
+
+    def get_lib_files(self):
+        """Modules in bench/lib that py benchmarks can import."""
+        lib_dir = self.benchpath("lib")
+        return sorted(
+            os.path.join(lib_dir, filename)
+            for filename in os.listdir(lib_dir)
+            if filename.endswith(".py")
+        )
 
     def abspath(self, *relpaths):
         return os.path.abspath(os.path.join(self.root_dir, *relpaths))
@@ -88,103 +344,191 @@ class BenchEnvironment(object):
         with open(self.abspath(path), "r") as f:
             return f.read()
 
-    def do(self, cmd, **kwds):
+    def spawn(self, cmd, **kwds):
         if isinstance(cmd, basestring):
             cmd = [cmd]
         if cmd[0][0] not in ("/", "."):
             my_cmd = self.abspath("build", "bin", cmd[0])
             if os.path.exists(my_cmd):
                 cmd[0] = my_cmd
+        # Each child gets its own process group so that we can reliably
+        # kill it along with any children of its own.  When running in a
+        # pinned worker, pin the child to the same core.
+        core = self.scheduler.current_core()
 
-        timeout = kwds.pop("timeout", None)
-        event = threading.Event()
-        result = [None, None]
-        p = subprocess.Popen(cmd, **kwds)
+        def preexec():
+            new_process_group()
+            if core is not None:
+                pin_to_core(core)
 
-        def do_communicate():
-            try:
-                output = p.communicate()
-                if p.returncode != 0:
-                    raise subprocess.CalledProcessError(p.returncode, cmd)
-            except BaseException:
-                result[1] = sys.exc_info()
-            else:
-                result[0] = output
-            finally:
-                event.set()
+        kwds.setdefault("preexec_fn", preexec)
+        return subprocess.Popen(cmd, **kwds)
 
-        thread = threading.Thread(target=do_communicate)
-        thread.start()
-        if not event.wait(timeout):
-            p.terminate()
-        thread.join()
+    def do(self, cmd, **kwds):
+        """Run a command, returning its (stdout, stderr) output.
 
-        if result[1] is not None:
-            raise result[1][0], result[1][1], result[1][2]
-        return result[0]
+        If a "details" dict is given then we record into it the time at
+        which each line of stdout arrived, the tail of any stderr, and the
+        resource usage of the process (peak memory, cpu time, etc).
+        """
+        if isinstance(cmd, basestring):
+            cmd = [cmd]
+        timeout = kwds.pop("timeout", None)
+        details = kwds.pop("details", None)
+        line_times = [] if details is not None else None
+        p = self.spawn(cmd, **kwds)
+        try:
+            stdout, stderr = communicate(p, cmd, timeout, line_times)
+        except ProcessTimeout as e:
+            if details is not None:
+                details["line_times"] = line_times
+                if e.stderr:
+                    details["stderr"] = tail(e.stderr)
+            raise
+        if details is not None:
+            details["line_times"] = line_times
+            details["rusage"] = p.rusage
+            if stderr:
+                details["stderr"] = tail(stderr)
+        if p.returncode != 0:
+            raise ProcessFailed(p.returncode, cmd, stdout, stderr)
+        return stdout, stderr
 
     def bt(self, cmd, **kwds):
+        """Run a command, returning its stdout.
+
+        If the command times out but a "details" dict was given, then any
+        complete lines of output it had produced are returned and the
+        details are marked as "timed_out".
+        """
         kwds.setdefault("stdout", subprocess.PIPE)
-        stdout, _ = self.do(cmd, **kwds)
+        kwds.setdefault("stderr", subprocess.PIPE)
+        details = kwds.get("details")
+        try:
+            stdout, _ = self.do(cmd, **kwds)
+        except ProcessTimeout as e:
+            stdout = (e.stdout or "").rpartition("\n")[0]
+            if details is None or not stdout.strip():
+                raise
+            print "WARNING: {}, keeping partial output".format(e)
+            details["timed_out"] = True
         return stdout
 
     def get_build_details(self):
-        details = {}
-        # The git revision for pypyjs (and hence for pypy).
-        pypyjs_rev = self.cat("build/pypyjs/.git/refs/heads/master")
-        details["pypyjs_revision"] = pypyjs_rev.strip()
-        # The git revision for cpython.
-        cpython_rev = self.cat("build/cpython/.git/refs/heads/2.7")
-        details["cpython_revision"] = cpython_rev.strip()
-        # The git revision for gecko (and hence for spidermonkey).
-        gecko_rev = self.cat("build/gecko-dev/.git/refs/heads/master")
-        details["gecko_revision"] = gecko_rev.strip()
-        # The git revision for v8.
-        v8_rev = self.cat("build/v8/.git/refs/heads/master")
-        details["v8_revision"] = v8_rev.strip()
-        # The docker image used to build pypyjs.
-        build_image = self.bt(["docker", "images", "rfkelly/pypyjs-build"])
-        build_image = build_image.strip().split("\n")[-1]
-        build_image = build_image.strip().split()[2]
-        details["pypyjs_build_image"] = build_image
-        # The version reported by emcc.
-        cmd = ["docker", "run", "rfkelly/pypyjs-build", "emcc", "--version"]
-        emcc_version = self.bt(cmd).strip().split("\n")[0]
-        details["emcc_version"] = emcc_version
-        # The version reported by native clang.
-        clang_version = self.bt(["clang", "--version"]).strip().split("\n")[0]
-        details["clang_version"] = clang_version
-        # The list of available engines.
+        cache_path = self.abspath("build", "cache", "build_details.json")
+        details = run_probes(self.get_build_probes(), cache_path)
+        # The list of available engines, and hashes of their binaries.
+        # Hashing the binaries in full takes a while, so the hashes are
+        # kept between benches for as long as the files are unchanged.
+        hashes_path = self.abspath("build", "cache", "file_hashes.json")
+        load_file_hashes(hashes_path)
         details["engines"] = list(e.name for e in self.engines)
+        details["engine_fingerprints"] = dict(
+            (e.name, e.fingerprint()) for e in self.engines
+        )
+        save_file_hashes(hashes_path)
         return details
 
+    def get_build_probes(self):
+        """Get the list of probes used to collect build details."""
+        return get_default_probes(self)
+
     def run_benchmarks(self):
-        results = {}
-        results["misc"] = self._run_misc_benchmarks()
-        results["py"] = self._run_py_benchmarks()
-        results["bridge"] = self._run_bridge_benchmarks()
+        self.check_quiescence()
+        self.sampler.start()
+        try:
+            results = {}
+            results["misc"] = self._run_misc_benchmarks()
+            results["py"] = self._run_py_benchmarks()
+            results["micro"] = self._run_micro_benchmarks()
+            results["bridge"] = self._run_bridge_benchmarks()
+            if self.sweep:
+                results["sweep"] = self._run_sweep_benchmarks()
+        finally:
+            self.sampler.stop()
         return results
 
+    def check_quiescence(self):
+        """Check that the machine is quiet enough to get reliable results.
+
+        Depending on self.preflight we either print a warning for each
+        problem found, or refuse to run by raising RuntimeError.
+        """
+        if self.preflight == "skip":
+            return
+        print "Checking that the machine is quiet"
+        warnings = preflight(self.max_load, self.max_foreign)
+        for msg in warnings:
+            print "WARNING: {}".format(msg)
+        if warnings and self.preflight == "refuse":
+            raise RuntimeError("Machine is too noisy to run benchmarks")
+
     def _run_misc_benchmarks(self):
         results = {}
         results["file_size_raw"] = self._run_benchmark_file_size_raw()
         results["file_size_gz"] = self._run_benchmark_file_size_gz()
         b_misc_dir = self.benchpath("b_misc")
-        for filename in sorted(os.listdir(b_misc_dir)):
+        filenames = sorted(os.listdir(b_misc_dir))
+        for filename in filenames:
             name, typ = filename.rsplit(".", 1)
+            key = ("misc", name)
             if typ == "js":
-                results[name] = self._run_js_benchmark("b_misc/" + filename)
+                engines = None
+                if name == "load_time":
+                    engines = self.engines + self.code_cache_engines
+                results.setdefault(name, {}).update(self._run_js_benchmark(
+                    "b_misc/" + filename, key, engines
+                ))
             elif typ == "py":
-                results[name] = self._run_py_benchmark("b_misc/" + filename)
+                # A py benchmark with a js counterpart, that can measure
+                # things only visible from the js side, is run natively.
+                engines = None
+                if name + ".js" in filenames:
+                    engines = [e for e in self.engines
+                               if isinstance(e, NativeEngine)]
+                results.setdefault(name, {}).update(self._run_py_benchmark(
+                    "b_misc/" + filename, key, engines
+                ))
         return results
 
     def _run_py_benchmarks(self):
+        return self._run_py_benchmark_dir("b_py", "py")
+
+    def _run_micro_benchmarks(self):
+        return self._run_py_benchmark_dir("b_micro", "micro")
+
+    def _run_py_benchmark_dir(self, dirname, category):
+        results = {}
+        b_dir = self.benchpath(dirname)
+        for filename in sorted(os.listdir(b_dir)):
+            name, typ = filename.rsplit(".", 1)
+            if typ == "py":
+                key = (category, name)
+                results[name] = self._run_py_benchmark(
+                    dirname + "/" + filename, key
+                )
+        return results
+
+    def _run_sweep_benchmarks(self):
+        """Run each py benchmark at each of the sizes that it sweeps over.
+
+        Each run gives the time per loop of every sample at every size in
+        turn, which we key by size using the records of the samples.  Unless
+        a number of samples was given, we take fewer samples than usual.
+        """
         results = {}
+        harness_args = self.get_harness_args() + ["--sweep"]
+        if self.samples is None:
+            harness_args.extend(["--samples", str(SWEEP_SAMPLES)])
         b_py_dir = self.benchpath("b_py")
         for filename in sorted(os.listdir(b_py_dir)):
             name, typ = filename.rsplit(".", 1)
             if typ == "py":
-                results[name] = self._run_py_benchmark("b_py/" + filename)
+                key = ("sweep", name)
+                results[name] = self._run_py_benchmark(
+                    "b_py/" + filename, key, harness_args=harness_args,
+                    sized=True,
+                )
         return results
 
     def _run_bridge_benchmarks(self):
@@ -197,9 +541,14 @@ class BenchEnvironment(object):
                 continue
             py_filename = self.benchpath("b_bridge", filename)
             js_filename = self.benchpath("b_bridge", name + ".js")
+            py_key = ("bridge", name, "py")
+            js_key = ("bridge", name, "js")
+            # A py benchmark may load its js counterpart, e.g. to share
+            # a driver with it.
             results[name] = {
-                "py": self._run_py_benchmark(py_filename, engines),
-                "js": self._run_js_benchmark(js_filename, engines),
+                "py": self._run_py_benchmark(py_filename, py_key, engines,
+                                             extra_files=[js_filename]),
+                "js": self._run_js_benchmark(js_filename, js_key, engines),
             }
         return results
 
@@ -207,60 +556,67 @@ class BenchEnvironment(object):
         """Benchmark tracking the file download size of the interpreter.
 
         This benchmark tracks the combined size of all files that must be
-        downloaded to launch the basic interpreter prompt.
+        downloaded to launch the basic interpreter prompt.  A breakdown of
+        the size of the VM by the parts of the interpreter is recorded in
+        the run details.
         """
-
-        def get_size(engine, filename, ignore=False):
-            path = self.abspath(engine.pypyjs_build, "lib", filename)
-            if ignore and not os.path.exists(path):
-                return 0
-            return os.stat(path).st_size
-
         results = {}
+        details = self.run_details.setdefault("misc", {})
+        details = details.setdefault("file_size_raw", {})
+        lib_dirs = {}
         for engine in self.engines:
-            if not isinstance(engine, JSEngine):
-                continue
-            name = engine.name.split("+")[1]
-            if name not in results:
-                print "Measuring file size for {}".format(name)
-                results[name] = 0
-                for filename in ("pypyjs.js", "pypyjs.vm.js",):
-                    results[name] += get_size(engine, filename)
-                for filename in ("pypyjs.vm.js.mem", "pypyjs.vm.js.zmem"):
-                    results[name] += get_size(engine, filename, ignore=True)
-
+            if isinstance(engine, JSEngine):
+                name = engine.name.split("+")[1]
+                lib_dirs[name] = os.path.join(engine.pypyjs_build, "lib")
+        for name, sizes in self._measure_file_sizes().iteritems():
+            results[name] = sizes["totals"]["raw"]
+            print "Analyzing VM size for {}".format(name)
+            details[name] = analyze_vm(lib_dirs[name])
         return results
 
     def _run_benchmark_file_size_gz(self):
         """Benchmark tracking the file download size of the interpreter.
 
         This benchmark tracks the combined gzipped size of all files that must
-        be downloaded to launch the basic interpreter prompt.
+        be downloaded to launch the basic interpreter prompt.  The sizes of
+        each file under each of the other available compression codecs are
+        recorded in the run details.
         """
+        results = {}
+        details = self.run_details.setdefault("misc", {})
+        details = details.setdefault("file_size_gz", {})
+        for name, sizes in self._measure_file_sizes().iteritems():
+            results[name] = sizes["totals"]["gzip-9"]
+            details[name] = sizes
+        return results
 
-        def get_size(build, name, ignore=False):
-            path = self.abspath(engine.pypyjs_build, "lib", filename)
-            if ignore and not os.path.exists(path):
-                return 0
-            self.do(["gzip", "-9", "--keep", "--force", path])
-            return os.stat(path + ".gz").st_size
+    def _measure_file_sizes(self):
+        """Measure the raw and compressed size of each pypyjs build's files.
 
+        Compression is done in memory, and the results are cached on disk
+        by file hash so that unchanged files are never recompressed.
+        """
+        if self._file_sizes is not None:
+            return self._file_sizes
+        cache = SizeCache(self.abspath("build", "cache", "file_sizes.json"))
         results = {}
         for engine in self.engines:
             if not isinstance(engine, JSEngine):
                 continue
             name = engine.name.split("+")[1]
             if name not in results:
-                print "Measuring compressed file size for {}".format(name)
-                results[name] = 0
-                for filename in ("pypyjs.js", "pypyjs.vm.js",):
-                    results[name] += get_size(engine, filename)
-                for filename in ("pypyjs.vm.js.mem", "pypyjs.vm.js.zmem"):
-                    results[name] += get_size(engine, filename, ignore=True)
-
+                print "Measuring file sizes for {}".format(name)
+                results[name] = measure_sizes(
+                    os.path.join(engine.pypyjs_build, "lib"),
+                    ("pypyjs.js", "pypyjs.vm.js"),
+                    ("pypyjs.vm.js.mem", "pypyjs.vm.js.zmem"),
+                    cache,
+                )
+        cache.save()
+        self._file_sizes = results
         return results
 
-    def _run_js_benchmark(self, name, engines=None):
+    def _run_js_benchmark(self, name, key, engines=None):
         """Helper to run a js file benchmark across all engines.
 
         Called with the name of a javascript benchmark file, this method
@@ -270,54 +626,207 @@ class BenchEnvironment(object):
         """
         if engines is None:
             engines = self.engines
-        results = {}
+        engines = [e for e in engines if isinstance(e, JSEngine)]
         js_file = self.benchpath(name)
-        b_name = name.rsplit("/", 1)[-1]
-        for engine in engines:
-            if not isinstance(engine, JSEngine):
-                continue
-            print "Measuring {} on {}".format(b_name, engine.name)
-            try:
-                N = self.num_runs
-                res = list(engine.run_js_benchmark(js_file) for _ in xrange(N))
-                for run in res:
-                    for run_t in run:
-                        if run_t <= 0:
-                            raise ValueError("Negative benchmark time")
-            except Exception:
-                traceback.print_exc()
-                print "Failed {} on {}".format(b_name, engine.name)
-                res = None
-            results[engine.name] = res
-        return results
+        return self._run_benchmark(key, engines, [js_file],
+            lambda engine, details: engine.run_js_benchmark(js_file, details)
+        )
 
-    def _run_py_benchmark(self, name, engines=None):
+    def _run_py_benchmark(self, name, key, engines=None, harness_args=None,
+                          extra_files=(), sized=False):
         """Helper to run a py file benchmark across all engines.
 
         Called with the name of a python benchmark file, this method runs
         it in each available engine and reports back the results.  The
         file is expected to print a single number on stdout as the result
-        of the benchmark.
+        of the benchmark.  The harness_args default to those given by the
+        options for the timing harness.  Any extra_files that the benchmark
+        loads are hashed along with its source when caching results.  If
+        sized is set, each run is keyed by size as for _run_benchmark.
         """
         if engines is None:
             engines = self.engines
-        results = {}
+        if harness_args is None:
+            harness_args = self.get_harness_args()
         py_file = self.benchpath(name)
-        b_name = name.rsplit("/", 1)[-1]
+        source_files = [py_file] + self.get_lib_files() + list(extra_files)
+        return self._run_benchmark(key, engines, source_files,
+            lambda engine, details: engine.run_py_benchmark(
+                py_file, details, harness_args
+            ),
+            harness_args, sized,
+        )
+
+    def get_cache_key(self, engine, source_files, args=()):
+        """Hash everything that goes into running some source on an engine."""
+        # The options that decide how many runs we do.
+        options = {
+            "num_runs": self.num_runs,
+            "target_ci": self.target_ci,
+            "max_runs": self.max_runs,
+            "time_budget": self.time_budget,
+            "estimator": self.estimator,
+        }
+        if isinstance(engine, JSEngine):
+            options["js_worker"] = self.js_worker
+        return hash_strings(
+            engine.fingerprint(),
+            hash_files(source_files),
+            options,
+            list(args),
+        )
+
+    def _run_benchmark(self, key, engines, source_files, run_func, args=(),
+                       sized=False):
+        """Helper to schedule all the runs of a benchmark across engines.
+
+        Each of the self.num_runs runs on each engine is submitted to the
+        scheduler as a separate job.  If any run fails then the results for
+        that engine are discarded, and any of its runs that have not yet
+        started are skipped.  Per-run metadata is recorded into the
+        self.run_details tree under the given key.
+
+        In adaptive mode (i.e. when self.target_ci is set) further runs are
+        done one at a time on each engine, until the relative width of the
+        bootstrap confidence interval drops below the target, or we reach
+        self.max_runs, or the runs on that engine exceed self.time_budget.
+
+        If sized is set, the samples of each run were taken at several
+        problem sizes, and the run is turned into a dict mapping each size to
+        its times.  The times at different sizes can't be pooled, so we skip
+        both steady state detection and adaptive repetition for such runs.
+
+        Runs that are already in the journal are not repeated, and each
+        newly-completed run is written to the journal.  If self.reuse_cached
+        is set and a recent result for the benchmark on an engine has the
+        same cache key, then that result is copied instead.
+        """
+        b_name = key[1]
+        results = {}
+        details = self.run_details
+        for k in key:
+            details = details.setdefault(k, {})
+        failed = set()
+        pending = {}
+        spent = {}
+
+        def do_run(engine):
+            if engine.name in failed:
+                return None
+            run_details = {"core": self.scheduler.current_core()}
+            self.sampler.sample()
+            t_start = monotonic()
+            run = run_func(engine, run_details)
+            t_end = monotonic()
+            self.sampler.sample()
+            run_details["duration"] = t_end - t_start
+            core = run_details["core"]
+            cores = None if core is None else [core]
+            run_details["noise"] = self.sampler.noise_between(
+                t_start, t_end, cores=cores)
+            if sized:
+                run = split_by_size(run_details.get("records", ()))
+            else:
+                series = sample_times(run_details.get("records", ()))
+                if series:
+                    # Say so, since the indices are then into this series.
+                    run_details["series"] = "samples"
+                run_details.update(detect_steady_state(series or run))
+            return run, run_details
+
+        def submit(engine, i):
+            pending[engine.name] += 1
+            self.scheduler.submit((engine, i), do_run, engine)
+
+        def add_run(engine, run, run_details):
+            results[engine.name].append(run)
+            details[engine.name]["runs"].append(run_details)
+            if run_details is not None:
+                spent[engine.name] += run_details.get("duration", 0)
+            return len(results[engine.name]) - 1
+
+        def finish(engine):
+            # All submitted runs are done, so check whether we need more.
+            runs = results[engine.name]
+            e_details = details[engine.name]
+            e_details["num_runs"] = len(runs)
+            # Bootstrapping the interval is slow, so only do it when it
+            # decides whether to do more runs.
+            if sized or self.target_ci is None:
+                return
+            ci_width = relative_ci_width(runs, self.estimator)
+            e_details["ci_width"] = ci_width
+            if ci_width <= self.target_ci:
+                return
+            if len(runs) >= self.max_runs:
+                return
+            if self.time_budget is not None:
+                if spent[engine.name] >= self.time_budget:
+                    return
+            submit(engine, add_run(engine, None, None))
+
         for engine in engines:
+            cache_key = self.get_cache_key(engine, source_files, args)
+            if self.cache is not None:
+                cached = self.cache.lookup(key, engine.name, cache_key)
+                if cached is not None:
+                    timestamp, runs, e_details = cached
+                    e_details = dict(e_details)
+                    e_details.setdefault("reused_from", timestamp)
+                    print "Reusing {} on {} from {}".format(
+                        b_name, engine.name, e_details["reused_from"]
+                    )
+                    results[engine.name] = runs
+                    details[engine.name] = e_details
+                    continue
             print "Measuring {} on {}".format(b_name, engine.name)
+            results[engine.name] = []
+            details[engine.name] = {"runs": [], "cache_key": cache_key}
+            pending[engine.name] = 0
+            spent[engine.name] = 0.0
+            i = 0
+            while True:
+                done = None
+                if self.journal is not None:
+                    done = self.journal.get(key, engine.name, i)
+                if done is not None:
+                    add_run(engine, *done)
+                elif i < self.num_runs:
+                    submit(engine, add_run(engine, None, None))
+                else:
+                    break
+                i += 1
+            if pending[engine.name] == 0:
+                finish(engine)
+        for (engine, i), res, exc_info in self.scheduler.completed():
+            pending[engine.name] -= 1
+            if engine.name in failed:
+                continue
             try:
-                N = self.num_runs
-                res = list(engine.run_py_benchmark(py_file) for _ in xrange(N))
-                for run in res:
-                    for run_t in run:
-                        if run_t <= 0:
-                            raise ValueError("Negative benchmark time")
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                run, run_details = res
+                run_times = run
+                if sized:
+                    run_times = [t for size_times in run.itervalues()
+                                 for t in size_times]
+                for run_t in run_times:
+                    if run_t <= 0:
+                        raise ValueError("Negative benchmark time")
             except Exception:
                 traceback.print_exc()
                 print "Failed {} on {}".format(b_name, engine.name)
-                res = None
-            results[engine.name] = res
+                failed.add(engine.name)
+                results[engine.name] = None
+                details[engine.name] = None
+                continue
+            results[engine.name][i] = run
+            details[engine.name]["runs"][i] = run_details
+            spent[engine.name] += run_details["duration"]
+            if self.journal is not None:
+                self.journal.record(key, engine.name, i, run, run_details)
+            if pending[engine.name] == 0:
+                finish(engine)
         return results
 
 
@@ -329,13 +838,26 @@ class Engine(object):
     def __init__(self, benv, name):
         self.benv = benv
         self.name = name
+        self._fingerprint = None
 
-    def run_py_benchmark(self, filename):
+    def fingerprint(self):
+        """Hash of the files making up this engine, for caching results."""
+        if self._fingerprint is None:
+            self._fingerprint = hash_files(self.get_files())
+        return self._fingerprint
+
+    def get_files(self):
+        raise NotImplementedError
+
+    def run_py_benchmark(self, filename, details=None, harness_args=None):
         raise NotImplementedError
 
-    def run_js_benchmark(self, filename):
+    def run_js_benchmark(self, filename, details=None):
         raise NotImplementedError
 
+    def close(self):
+        pass
+
 
 class NativeEngine(Engine):
 
@@ -349,12 +871,46 @@ class NativeEngine(Engine):
             raise RuntimeError("File not found: {}".format(py_shell))
         self.py_shell = py_shell
 
-    def run_py_benchmark(self, filename):
-        cmd = [self.py_shell, filename]
-        output = self.benv.bt(cmd, timeout=self.TIMEOUT).strip()
-        if not output:
-            raise RuntimeError("No output from {}".format(cmd))
-        return [float(res.strip()) for res in output.split()]
+    def get_files(self):
+        return [self.py_shell] + self.get_stdlib_files()
+
+    # Print the directories that the interpreter imports its stdlib from.
+    STDLIB_DIRS_CODE = "import sys; print '\\n'.join(sys.path)"
+
+    def get_stdlib_files(self):
+        """Source and extension modules of the interpreter's stdlib.
+
+        These are found by walking the directories on the interpreter's
+        sys.path without site-packages, skipping the stdlib's own tests.
+        """
+        cmd = [self.py_shell, "-S", "-c", self.STDLIB_DIRS_CODE]
+        files = set()
+        for stdlib_dir in self.benv.bt(cmd, timeout=60).split("\n"):
+            stdlib_dir = stdlib_dir.strip()
+            if not stdlib_dir or not os.path.isdir(stdlib_dir):
+                continue
+            for dirpath, dirnames, filenames in os.walk(stdlib_dir):
+                dirnames[:] = [d for d in dirnames
+                               if d not in ("test", "tests")]
+                for filename in filenames:
+                    if filename.endswith((".py", ".so")):
+                        files.add(os.path.join(dirpath, filename))
+        return sorted(files)
+
+    def run_py_benchmark(self, filename, details=None, harness_args=None):
+        if harness_args is None:
+            harness_args = self.benv.get_harness_args()
+        cmd = [self.py_shell, filename] + harness_args
+        # Unbuffered output lets us see each result as soon as it's printed.
+        env = os.environ.copy()
+        env["PYTHONUNBUFFERED"] = "1"
+        pythonpath = [self.benv.benchpath("lib")]
+        if env.get("PYTHONPATH"):
+            pythonpath.append(env["PYTHONPATH"])
+        env["PYTHONPATH"] = os.pathsep.join(pythonpath)
+        output = self.benv.bt(cmd, timeout=self.TIMEOUT, details=details,
+                              env=env)
+        return parse_output(output, cmd, details)
 
 
 class JSEngine(Engine):
@@ -373,20 +929,108 @@ class JSEngine(Engine):
             raise RuntimeError("Dir not found: {}".format(pypyjs_build))
         self.pypyjs_build = pypyjs_build
         self.pypyjs_lib = os.path.join(pypyjs_build, "lib", "pypyjs.js")
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        self._local = threading.local()
 
-    def run_js_benchmark(self, filename):
+    def get_shell_binary(self):
+        """The binary that self.js_shell runs, if it is a wrapper script."""
+        # The Makefile builds the SpiderMonkey shell as a script that runs
+        # the real binary from the build directory.
+        if self.js_shell == self.benv.abspath("build", "bin", "js"):
+            binary = self.benv.abspath("build", "gecko-dev", "js", "src",
+                                       "build", "dist", "bin", "js")
+            if os.path.exists(binary):
+                return binary
+        return self.js_shell
+
+    def get_files(self):
+        files = [self.js_shell, self.pypyjs_lib]
+        if self.get_shell_binary() != self.js_shell:
+            files.append(self.get_shell_binary())
+        lib_dir = os.path.dirname(self.pypyjs_lib)
+        for filename in ("pypyjs.vm.js", "pypyjs.vm.js.mem",
+                         "pypyjs.vm.js.zmem"):
+            path = os.path.join(lib_dir, filename)
+            if os.path.exists(path):
+                files.append(path)
+        files.append(self.benv.benchpath("runner.js"))
+        files.append(self.benv.benchpath("worker.js"))
+        files.append(self.benv.benchpath("timing.js"))
+        return files
+
+    def run_js_benchmark(self, filename, details=None):
         with self._templated_file(filename) as t_filename:
-            cmd = [self.js_shell, t_filename]
-            output = self.benv.bt(cmd, timeout=self.TIMEOUT).strip()
-        if not output:
-            raise RuntimeError("No output from {}".format(cmd))
-        try:
-            return [float(res.strip()) for res in output.split()]
-        except ValueError:
-            print "ERROR:", output
-            raise
+            cmd = [self.js_shell] + self.get_shell_args() + [t_filename]
+            output = self.benv.bt(cmd, timeout=self.TIMEOUT,
+                                  details=details)
+        return parse_output(output, cmd, details)
+
+    # Let js benchmarks force a gc on d8, as they can already do on the
+    # SpiderMonkey shell, before measuring memory.
+    MEMORY_SHELL_ARGS = {
+        "js": [],
+        "d8": ["--expose-gc"],
+    }
+
+    def get_shell_args(self):
+        """Extra command-line arguments for the js shell."""
+        shell_name = os.path.basename(self.js_shell)
+        return list(self.MEMORY_SHELL_ARGS.get(shell_name, ()))
 
-    def run_py_benchmark(self, filename):
+    def run_py_benchmark(self, filename, details=None, harness_args=None):
+        if harness_args is None:
+            harness_args = self.benv.get_harness_args()
+        py_code, py_imports = self._get_py_source(filename, harness_args)
+        if self.benv.js_worker is not None:
+            cmd = [self.js_shell, self.benv.benchpath("worker.js")]
+            output = self._run_in_worker(py_code, py_imports, details)
+        else:
+            kwds = {
+                "py_code": repr(py_code),
+                "py_imports": repr(py_imports),
+            }
+            runner = self.benv.benchpath("runner.js")
+            with self._templated_file(runner, **kwds) as t_filename:
+                cmd = [self.js_shell, t_filename]
+                output = self.benv.bt(cmd, timeout=self.TIMEOUT,
+                                      details=details)
+        return parse_output(output, cmd, details)
+
+    def _get_py_source(self, filename, harness_args):
+        """Get the code to exec for a py benchmark, and the imports it needs.
+
+        The VM can't import modules from bench/lib, so any that the file
+        imports are inlined into a preamble that puts them in sys.modules.
+        The preamble also sets sys.argv to pass on the harness arguments,
+        and __file__ so that the file can find others beside it.
+        """
+        py_code, py_imports = self._parse_py_imports(filename)
+        preamble = [
+            "import sys as _awpy_sys\n",
+            "_awpy_sys.argv = {!r}\n".format(
+                [os.path.basename(filename)] + list(harness_args)
+            ),
+            "__file__ = {!r}\n".format(os.path.abspath(filename)),
+        ]
+        for modname in list(py_imports):
+            lib_file = self.benv.benchpath("lib", modname + ".py")
+            if not os.path.exists(lib_file):
+                continue
+            py_imports.remove(modname)
+            lib_code, lib_imports = self._parse_py_imports(lib_file)
+            for impname in lib_imports:
+                if impname not in py_imports:
+                    py_imports.append(impname)
+            preamble.extend([
+                "_awpy_mod = type(_awpy_sys)({!r})\n".format(modname),
+                "exec compile({!r}, {!r}, 'exec') in _awpy_mod.__dict__\n"
+                .format(lib_code, os.path.basename(lib_file)),
+                "_awpy_sys.modules[{!r}] = _awpy_mod\n".format(modname),
+            ])
+        return "".join(preamble) + py_code, py_imports
+
+    def _parse_py_imports(self, filename):
         # XXX TODO: the PyPy.js automagic-module-file-loader currently
         # can't handle import statements in multi-line source code.
         # For now we parse out our imports and load them explicitly,
@@ -402,27 +1046,50 @@ class JSEngine(Engine):
                     impname = ln.split()
                     impname = impname[1] + "." + impname[3]
                     py_imports.append(impname)
-        kwds = {
-            "py_code": repr("".join(py_lines)),
-            "py_imports": repr(py_imports),
-        }
-        runner = self.benv.benchpath("runner.js")
-        with self._templated_file(runner, **kwds) as t_filename:
-            cmd = [self.js_shell, t_filename]
-            output = self.benv.bt(cmd, timeout=self.TIMEOUT).strip()
-        if not output:
-            raise RuntimeError("No output from {}".format(cmd))
+        return "".join(py_lines), py_imports
+
+    def close(self):
+        with self._workers_lock:
+            workers = self._workers
+            self._workers = []
+        for worker in workers:
+            worker.close()
+
+    def _run_in_worker(self, py_code, py_imports, details=None):
+        # Each scheduler thread gets its own worker process, so that
+        # the worker is pinned to the same core as the thread.
+        worker = getattr(self._local, "worker", None)
+        if worker is None:
+            fresh_vm = (self.benv.js_worker == "fresh")
+            worker = JSWorker(self, fresh_vm=fresh_vm)
+            self._local.worker = worker
+            with self._workers_lock:
+                self._workers.append(worker)
+        line_times = [] if details is not None else None
         try:
-            return [float(res.strip()) for res in output.split()]
-        except ValueError:
-            print "ERROR:", output
+            return worker.run(py_code, py_imports, self.TIMEOUT, line_times)
+        except Exception as e:
+            # Don't trust the state of a worker after a failed run.
+            self._local.worker = None
+            with self._workers_lock:
+                self._workers.remove(worker)
+            worker.close()
+            if isinstance(e, ProcessTimeout) and details is not None:
+                if e.stdout.strip():
+                    print "WARNING: {}, keeping partial output".format(e)
+                    details["timed_out"] = True
+                    return e.stdout
             raise
+        finally:
+            if details is not None:
+                details["line_times"] = line_times
 
     @contextlib.contextmanager
     def _templated_file(self, filename, **kwds):
         kwds.setdefault("js_shell", self.js_shell)
         kwds.setdefault("pypyjs_build", self.pypyjs_build)
         kwds.setdefault("pypyjs_lib", self.pypyjs_lib)
+        kwds.setdefault("startup", "cold")
         with open(filename, "r") as fTemplate:
             contents = fTemplate.read()
         # Javascript code has lots of curly brackets, so we can't
@@ -430,7 +1097,167 @@ class JSEngine(Engine):
         # hack our own simple version of {{NAME}} replacement.
         for name, value in kwds.iteritems():
             contents = contents.replace("{{"+name+"}}", value)
+        # Every script gets the high-resolution clock shim.
+        with open(self.benv.benchpath("timing.js"), "r") as fTiming:
+            contents = fTiming.read() + contents
         with tempfile.NamedTemporaryFile() as fOut:
             fOut.write(contents)
             fOut.flush()
             yield fOut.name
+
+
+class CodeCacheJSEngine(JSEngine):
+    """A js engine that starts up with its code cache already populated.
+
+    Browsers keep compiled code for the scripts on a page, so returning
+    visitors don't have to compile pypyjs.vm.js from scratch.  In "warm"
+    mode each run starts a new shell process that uses the code cache, and
+    in "hot" mode the interpreter has also already been loaded once in the
+    same process.  Templated files get "hot" or "warm" as {{startup}}.
+
+    SpiderMonkey can keep its asm.js cache in a directory shared between
+    processes, which we populate with an unmeasured run before the first
+    measured one.  d8 has no cache that persists between processes, so it
+    has no variants here; its --cache=code mode compiles the script in the
+    measured process anyway, which isn't what a returning visitor sees.
+    """
+
+    MODES = ("warm", "hot")
+
+    SHELL_ARGS = {
+        "js": ["--js-cache={cache_dir}", "--no-js-cache-per-process"],
+    }
+
+    def __init__(self, benv, js_shell, pypyjs_build, mode):
+        super(CodeCacheJSEngine, self).__init__(benv, js_shell, pypyjs_build)
+        self.name = "{}:{}".format(self.name, mode)
+        self.mode = mode
+        self.shell_args = self.SHELL_ARGS[js_shell]
+        self._cache_dir = None
+        self._cache_lock = threading.Lock()
+
+    def get_shell_args(self):
+        args = super(CodeCacheJSEngine, self).get_shell_args()
+        return args + [arg.format(cache_dir=self._cache_dir)
+                       for arg in self.shell_args]
+
+    def run_js_benchmark(self, filename, details=None):
+        with self._cache_lock:
+            if self._cache_dir is None:
+                self._cache_dir = tempfile.mkdtemp(prefix="awpy-code-cache-")
+                # Populate the cache with a run that we don't measure.
+                super(CodeCacheJSEngine, self).run_js_benchmark(filename)
+        return super(CodeCacheJSEngine, self).run_js_benchmark(filename,
+                                                                details)
+
+    def close(self):
+        super(CodeCacheJSEngine, self).close()
+        if self._cache_dir is not None:
+            shutil.rmtree(self._cache_dir, ignore_errors=True)
+            self._cache_dir = None
+
+    @contextlib.contextmanager
+    def _templated_file(self, filename, **kwds):
+        kwds.setdefault("startup", self.mode)
+        with super(CodeCacheJSEngine, self)._templated_file(filename,
+                                                             **kwds) as f:
+            yield f
+
+
+class JSWorker(object):
+    """A long-lived js shell process for running many py benchmarks.
+
+    Starting a new shell for every run means re-loading pypyjs.js each
+    time, which takes several seconds.  This instead starts the shell once
+    using the "worker.js" driver, then sends it one payload per line on
+    stdin and reads back each payload's output up to a delimiter line.
+    Each payload runs in a fresh VM unless fresh_vm is False, in which
+    case all payloads share the default VM.  Its modules and globals are
+    reset between payloads, but any other state, like the js heap and
+    the JIT's compiled code, carries over from one payload to the next.
+    """
+
+    def __init__(self, engine, fresh_vm=True):
+        self.engine = engine
+        self.delimiter = "AWPY-" + uuid.uuid4().hex
+        self._buffer = ""
+        driver = engine.benv.benchpath("worker.js")
+        # The templated file must live as long as the worker process.
+        self._template = engine._templated_file(driver,
+            fresh_vm="true" if fresh_vm else "false",
+            delimiter=self.delimiter,
+        )
+        t_filename = self._template.__enter__()
+        try:
+            cmd = [engine.js_shell] + engine.get_shell_args() + [t_filename]
+            self.proc = engine.benv.spawn(cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        except BaseException:
+            self._template.__exit__(*sys.exc_info())
+            raise
+
+    def run(self, py_code, py_imports, timeout=None, line_times=None):
+        payload = json.dumps({"code": py_code, "imports": py_imports})
+        self.proc.stdin.write(payload + "\n")
+        self.proc.stdin.flush()
+        start = monotonic()
+        if timeout is not None:
+            deadline = start + timeout
+        else:
+            deadline = None
+        output = []
+        while True:
+            try:
+                ln = self._readline(deadline)
+            except ProcessTimeout as e:
+                e.stdout = "".join(output)
+                raise
+            if ln is None:
+                raise RuntimeError("Worker for {} exited unexpectedly".format(
+                    self.engine.name
+                ))
+            if ln.startswith(self.delimiter):
+                status = ln[len(self.delimiter):].strip()
+                if status != "ok":
+                    raise RuntimeError("Worker for {} failed: {}".format(
+                        self.engine.name, status
+                    ))
+                return "".join(output)
+            output.append(ln)
+            if line_times is not None:
+                line_times.append(monotonic() - start)
+
+    def close(self):
+        try:
+            if self.proc.poll() is None:
+                # Closing stdin asks the driver to exit cleanly.
+                self.proc.stdin.close()
+                deadline = monotonic() + 5
+                while self.proc.poll() is None and monotonic() < deadline:
+                    time.sleep(0.1)
+                if self.proc.poll() is None:
+                    kill_process_group(self.proc)
+        finally:
+            self._template.__exit__(None, None, None)
+
+    def _readline(self, deadline):
+        fd = self.proc.stdout.fileno()
+        while "\n" not in self._buffer:
+            if deadline is None:
+                remaining = None
+            else:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    cmd = "worker for {}".format(self.engine.name)
+                    raise ProcessTimeout(cmd, self.engine.TIMEOUT)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(fd, 4096)
+            if not data:
+                return None
+            self._buffer += data
+        ln, self._buffer = self._buffer.split("\n", 1)
+        return ln + "\n"
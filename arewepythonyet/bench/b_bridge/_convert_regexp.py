@@ -1,3 +1,7 @@
+# This converts the octane regexp benchmark with rules written for that one
+# program, and regexp.py depends on their exact output.  Other bridge
+# benchmarks should be generated with the more general _jsconvert.py.
+
 
 import re
 import sys
@@ -18,11 +22,15 @@ print "# the asm.js heap and into native javascript."
 
 print ""
 print "import js"
-print "import time"
 print "import math"
 print "import random"
 print ""
 
+# Use the same high-resolution clock as the js version.
+
+print "awpyNow = js.globals[\"awpyNow\"]"
+print ""
+
 # Hack to allow use of a local variable named "chr".
 
 print "_builtin_chr = chr"
@@ -63,7 +71,8 @@ for ln in sys.stdin:
     # Rename some stdlib functions to python versions.
     ln = re.sub(r"Math.floor", r"_int_math_floor", ln)
     ln = re.sub(r"Math.random", r"random.random", ln)
-    ln = re.sub(r"Date.now\(\)", r"time.time() * 1000", ln)
+    ln = re.sub(r"Date.now\(\)", r"float(awpyNow()) * 1000", ln)
+    ln = re.sub(r"awpyNow\(\)", r"float(awpyNow())", ln)
     ln = re.sub(r"([a-z]+)\.charCodeAt\(([a-z]+)\)", r"ord(\1[\2])", ln)
     # Escape js attribute accesses that are python keywords.
     ln = re.sub(r"re\.exec\(", r"getattr(re, 'exec')(", ln)
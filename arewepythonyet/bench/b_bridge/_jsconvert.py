@@ -0,0 +1,2052 @@
+"""Convert javascript benchmarks into python for the bridge suite.
+
+Each bridge benchmark is a pair of a javascript program and a python program
+doing the same work, where the python version runs in PyPy.js and reaches
+javascript objects through the bridge.  This module turns a javascript
+program written in the plain style of the octane and sunspider kernels into
+the matching python program, so that new pairs don't have to be ported by
+hand.  Usage:
+
+    python _jsconvert.py benchmark.js > benchmark.py
+
+The source is split into tokens and parsed into a small syntax tree, which
+is then written out as python 2.  Anything that python can't express the
+same way, like labelled loops or assignments inside expressions, raises a
+ConversionError pointing at the offending line rather than producing a
+program that quietly does something different.  The main rules are:
+
+  * Globals that the program uses but never defines, like Math and awpyNow,
+    are looked up in js.globals, so calls to them cross the bridge just as
+    in the hand-written pairs.
+  * Constructor functions become classes, and functions assigned to their
+    prototype become methods.
+  * Common array and string idioms become their python equivalents, so
+    a.length is len(a) and a.push(x) is a.append(x).  Other methods of
+    arrays and strings are rejected, unless they're called on a js value.
+  * for loops become while loops, so that the test and update are run
+    exactly as often as in javascript.
+  * Bitwise operators wrap their operands and results to 32 bits, + turns
+    a number into a string when the other side is obviously a string, and
+    storing past the end of an array grows it, using small helpers that
+    are only defined in programs that need them.
+
+Some differences are left alone because hiding them would slow down every
+converted program: arithmetic doesn't lose precision beyond 2**53, % takes
+the sign of the divisor, += only concatenates strings with strings, and
+null and undefined are both None.  The length of a js object is only read
+as .length when it obviously is one, like the result of a regexp method,
+so other js values may need len() to work on the bridge.
+
+>>> print convert('''
+... function sum(values) {
+...   var total = 0;
+...   for (var i = 0; i < values.length; i++) {
+...     if (values[i] === null) continue;
+...     total += values[i];
+...   }
+...   return total;
+... }
+... print("sum:", sum([1, 2, null, 3]));
+... ''')
+def sum(values):
+    total = 0
+    i = 0
+    while i < len(values):
+        if values[i] is None:
+            i += 1
+            continue
+        total += values[i]
+        i += 1
+    return total
+<BLANKLINE>
+<BLANKLINE>
+print 'sum:', sum([1, 2, None, 3])
+<BLANKLINE>
+"""
+
+import os
+import re
+import sys
+import keyword
+
+
+class ConversionError(Exception):
+    """Raised for javascript that can't be converted faithfully."""
+
+    def __init__(self, message, line=None):
+        if line is not None:
+            message = "line {}: {}".format(line, message)
+        super(ConversionError, self).__init__(message)
+
+
+KEYWORDS = set([
+    "break", "case", "catch", "continue", "default", "delete", "do",
+    "else", "finally", "for", "function", "if", "in", "instanceof", "new",
+    "return", "switch", "this", "throw", "try", "typeof", "var", "void",
+    "while", "with",
+])
+
+PUNCTUATORS = sorted([
+    ">>>=", "===", "!==", ">>>", "<<=", ">>=",
+    "==", "!=", "<=", ">=", "&&", "||", "++", "--", "+=", "-=", "*=", "/=",
+    "%=", "&=", "|=", "^=", "<<", ">>",
+    "{", "}", "(", ")", "[", "]", ";", ",", "<", ">", "+", "-", "*", "/",
+    "%", "&", "|", "^", "!", "~", "?", ":", "=", ".",
+], key=len, reverse=True)
+
+ASSIGN_OPS = set([
+    "=", "+=", "-=", "*=", "/=", "%=", "<<=", ">>=", ">>>=", "&=", "|=", "^=",
+])
+
+# Precedence of javascript binary operators, loosest first.
+BINARY_PRECEDENCE = {
+    "||": 1, "&&": 2, "|": 3, "^": 4, "&": 5,
+    "==": 6, "!=": 6, "===": 6, "!==": 6,
+    "<": 7, ">": 7, "<=": 7, ">=": 7, "instanceof": 7, "in": 7,
+    "<<": 8, ">>": 8, ">>>": 8,
+    "+": 9, "-": 9,
+    "*": 10, "/": 10, "%": 10,
+}
+
+# Precedence of python operators, loosest first.
+PY_PRECEDENCE = {
+    "lambda": 0, "if": 1, "or": 2, "and": 3, "not": 4,
+    "==": 5, "!=": 5, "<": 5, ">": 5, "<=": 5, ">=": 5, "is": 5, "is not": 5,
+    "|": 6, "^": 7, "&": 8, "<<": 9, ">>": 9, "+": 10, "-": 10,
+    "*": 11, "/": 11, "%": 11, "unary": 12, "atom": 14,
+}
+
+COMPARISONS = set(["==", "!=", "<", ">", "<=", ">=", "is", "is not"])
+
+# A "/" after one of these keywords starts a regular expression.
+REGEXP_AFTER_KEYWORDS = set([
+    "case", "delete", "do", "else", "in", "instanceof", "new", "return",
+    "throw", "typeof", "void",
+])
+
+ESCAPES = {
+    "n": u"\n", "t": u"\t", "r": u"\r", "b": u"\b", "f": u"\f", "v": u"\v",
+    "0": u"\0",
+}
+
+# Names used by the generated code, which javascript names must not shadow.
+RESERVED = set(keyword.kwlist) | set([
+    "None", "True", "False", "self", "js", "len", "int", "float", "ord",
+    "unichr", "isinstance", "getattr", "setattr", "object", "Exception",
+    "_Object", "_setitem", "_str", "_toint32", "_urshift",
+])
+
+# Statements that become a single line, and so can take a trailing comment.
+SIMPLE_STATEMENTS = set([
+    "break", "continue", "empty", "expr", "return", "throw", "var",
+])
+
+# String methods that can take a regular expression.
+REGEXP_METHODS = set(["match", "replace", "search", "split"])
+
+# Methods of js arrays and strings that are converted, in some forms.
+CONVERTED_METHODS = set([
+    "charAt", "charCodeAt", "join", "pop", "push", "slice", "sort",
+    "substring",
+]) | REGEXP_METHODS
+
+# Methods of js arrays and strings.  Calls to these are only converted when
+# there's a python equivalent, since python lists and strings have few of
+# them, and some of those that they have behave differently.
+BUILTIN_METHODS = set([
+    "concat", "copyWithin", "entries", "every", "fill", "filter", "find",
+    "findIndex", "forEach", "includes", "indexOf", "join", "keys",
+    "lastIndexOf", "map", "pop", "push", "reduce", "reduceRight", "reverse",
+    "shift", "slice", "some", "sort", "splice", "toString", "unshift",
+    "values", "charAt", "charCodeAt", "codePointAt", "endsWith",
+    "localeCompare", "match", "normalize", "padEnd", "padStart", "repeat",
+    "replace", "search", "split", "startsWith", "substr", "substring",
+    "toLowerCase", "toUpperCase", "trim", "trimLeft", "trimRight",
+])
+
+# Math functions that give integers, which python needs for indexing.
+INTEGER_MATH = set(["floor", "ceil", "round"])
+
+TYPED_ARRAYS = {
+    "Float32Array": "0.0", "Float64Array": "0.0",
+    "Int8Array": "0", "Int16Array": "0", "Int32Array": "0",
+    "Uint8Array": "0", "Uint16Array": "0", "Uint32Array": "0",
+    "Uint8ClampedArray": "0",
+}
+
+HELPERS = {
+    "_Object": [
+        "class _Object(object):",
+        "    def __init__(self, **fields):",
+        "        self.__dict__.update(fields)",
+    ],
+    "_setitem": [
+        "def _setitem(a, i, value):",
+        "    if isinstance(a, list) and not 0 <= i < len(a):",
+        "        if i < 0:",
+        "            raise IndexError('negative array index %r' % (i,))",
+        "        a.extend([None] * (i + 1 - len(a)))",
+        "    a[i] = value",
+    ],
+    "_str": [
+        "def _str(x):",
+        "    if isinstance(x, basestring):",
+        "        return x",
+        "    if isinstance(x, bool):",
+        "        return 'true' if x else 'false'",
+        "    if isinstance(x, float):",
+        "        if x != x:",
+        "            return 'NaN'",
+        "        if x in (float('inf'), float('-inf')):",
+        "            return 'Infinity' if x > 0 else '-Infinity'",
+        "        if x == int(x) and abs(x) < 1e21:",
+        "            return str(int(x))",
+        "        return repr(x)",
+        "    if x is None:",
+        "        return 'null'",
+        "    return str(x)",
+    ],
+    "_toint32": [
+        "def _toint32(x):",
+        "    x = int(x) & 0xFFFFFFFF",
+        "    return x - 0x100000000 if x & 0x80000000 else x",
+    ],
+    "_urshift": [
+        "def _urshift(x, n):",
+        "    return (int(x) & 0xFFFFFFFF) >> (n & 31)",
+    ],
+}
+
+# Operators that work on signed 32-bit integers, and so give one.
+INT32_OPERATORS = set(["|", "&", "^", "<<", ">>"])
+
+NUMBER_RE = re.compile(
+    r"0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+NAME_RE = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*")
+FLAGS_RE = re.compile(r"[a-z]*")
+
+
+class Token(object):
+    """A token of javascript source.
+
+    Comments are kept with the token that follows them, apart from one on
+    the same line as the token before it, which is kept as a trailing
+    comment of that token.  Each token also notes whether a line break
+    came before it, for semicolon insertion.
+    """
+
+    def __init__(self, kind, value, line, newline):
+        self.kind = kind
+        self.value = value
+        self.line = line
+        self.newline = newline
+        self.comments = []
+        self.trailing = None
+
+    def __repr__(self):
+        return "Token({!r}, {!r})".format(self.kind, self.value)
+
+
+def tokenize(source):
+    """Split javascript source into a list of tokens, ending with "eof".
+
+    A "/" is read as division or as the start of a regular expression
+    depending on the token before it, as javascript itself does.
+
+    >>> tokenize("x = a / 2 / b; y = /[/]+/g;")[:-1]
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [Token('name', 'x'), Token('punct', '='), Token('name', 'a'),
+     Token('punct', '/'), Token('num', '2'), Token('punct', '/'),
+     Token('name', 'b'), Token('punct', ';'), Token('name', 'y'),
+     Token('punct', '='), Token('regexp', ('[/]+', 'g')),
+     Token('punct', ';')]
+    """
+    tokens = []
+    # A None in the comments stands for a blank line between them.
+    comments = []
+    pos = 0
+    line = 1
+    newline = True
+    breaks = 0
+    while pos < len(source):
+        ch = source[pos]
+        if ch == "\n":
+            line += 1
+            newline = True
+            breaks += 1
+            pos += 1
+            continue
+        if ch.isspace():
+            pos += 1
+            continue
+        if source.startswith("//", pos):
+            end = source.find("\n", pos)
+            if end == -1:
+                end = len(source)
+            text = source[pos + 2:end]
+            if tokens and not newline and tokens[-1].trailing is None:
+                tokens[-1].trailing = text
+            else:
+                if breaks > 1 and (tokens or comments):
+                    comments.append(None)
+                comments.append(text)
+            breaks = 0
+            pos = end
+            continue
+        if source.startswith("/*", pos):
+            end = source.find("*/", pos + 2)
+            if end == -1:
+                raise ConversionError("unterminated comment", line)
+            text = source[pos + 2:end]
+            if breaks > 1 and (tokens or comments):
+                comments.append(None)
+            breaks = 0
+            for ln in text.strip("*").split("\n"):
+                comments.append(re.sub(r"^\s*\*?", "", ln))
+            line += text.count("\n")
+            pos = end + 2
+            continue
+        start_line = line
+        number = NUMBER_RE.match(source, pos)
+        name = NAME_RE.match(source, pos)
+        if ch in "\"'":
+            kind = "str"
+            value, pos, line = _read_string(source, pos, line)
+        elif number and not name:
+            kind = "num"
+            value = str(number.group())
+            pos = number.end()
+        elif name:
+            kind = "name"
+            value = str(name.group())
+            pos = name.end()
+        elif ch == "/" and _starts_regexp(tokens):
+            kind = "regexp"
+            value, pos = _read_regexp(source, pos, line)
+        else:
+            for punct in PUNCTUATORS:
+                if source.startswith(punct, pos):
+                    break
+            else:
+                raise ConversionError("unexpected {!r}".format(ch), line)
+            kind = "punct"
+            value = punct
+            pos += len(punct)
+        if breaks > 1 and comments:
+            comments.append(None)
+        token = Token(kind, value, start_line, newline)
+        token.comments = comments
+        tokens.append(token)
+        comments = []
+        newline = False
+        breaks = 0
+    token = Token("eof", None, line, True)
+    token.comments = comments
+    tokens.append(token)
+    return tokens
+
+
+def _read_string(source, pos, line):
+    quote = source[pos]
+    pos += 1
+    chars = []
+    while True:
+        if pos >= len(source) or source[pos] == "\n":
+            raise ConversionError("unterminated string", line)
+        ch = source[pos]
+        if ch == quote:
+            return u"".join(chars), pos + 1, line
+        if ch != "\\":
+            chars.append(ch)
+            pos += 1
+            continue
+        esc = source[pos + 1]
+        pos += 2
+        if esc == "x":
+            chars.append(unichr(int(source[pos:pos + 2], 16)))
+            pos += 2
+        elif esc == "u":
+            chars.append(unichr(int(source[pos:pos + 4], 16)))
+            pos += 4
+        elif esc == "\n":
+            line += 1
+        elif esc in ESCAPES:
+            chars.append(ESCAPES[esc])
+        else:
+            # Unknown escapes stand for the character itself in javascript.
+            chars.append(esc)
+
+
+def _read_regexp(source, pos, line):
+    start = pos = pos + 1
+    in_class = False
+    while True:
+        if pos >= len(source) or source[pos] == "\n":
+            raise ConversionError("unterminated regular expression", line)
+        ch = source[pos]
+        if ch == "\\":
+            pos += 2
+            continue
+        if ch == "[":
+            in_class = True
+        elif ch == "]":
+            in_class = False
+        elif ch == "/" and not in_class:
+            break
+        pos += 1
+    body = source[start:pos]
+    flags = FLAGS_RE.match(source, pos + 1)
+    return (body, flags.group()), flags.end()
+
+
+def _starts_regexp(tokens):
+    if not tokens:
+        return True
+    prev = tokens[-1]
+    if prev.kind == "punct":
+        return prev.value not in (")", "]", "}")
+    if prev.kind == "name":
+        return prev.value in REGEXP_AFTER_KEYWORDS
+    return False
+
+
+class Node(object):
+    """A node of the syntax tree, with fields depending on its type."""
+
+    def __init__(self, type, line, **fields):
+        self.type = type
+        self.line = line
+        self.comments = []
+        self.trailing = None
+        self.__dict__.update(fields)
+
+
+class Parser(object):
+    """Parse a list of tokens into a tree of Nodes.
+
+    This covers the parts of ES5 used by benchmark kernels.  Statements
+    are the usual ones apart from labels, for-in and with, and expressions
+    are everything but the comma operator outside of for loops.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        if token.kind != "eof":
+            self.pos += 1
+        return token
+
+    def at(self, value, offset=0):
+        token = self.peek(offset)
+        return token.kind in ("punct", "name") and token.value == value
+
+    def accept(self, value):
+        if self.at(value):
+            return self.next()
+        return None
+
+    def expect(self, value):
+        token = self.next()
+        if token.kind not in ("punct", "name") or token.value != value:
+            raise ConversionError("expected {!r} but found {!r}".format(
+                value, token.value), token.line)
+        return token
+
+    def expect_name(self):
+        token = self.next()
+        if token.kind != "name":
+            raise ConversionError("expected a name but found {!r}".format(
+                token.value), token.line)
+        return token.value
+
+    def end_statement(self):
+        # Semicolons can be left out before a "}", a line break or the end.
+        if self.accept(";"):
+            return
+        token = self.peek()
+        if token.kind == "eof" or token.newline or self.at("}"):
+            return
+        raise ConversionError("expected ';' but found {!r}".format(
+            token.value), token.line)
+
+    def parse_program(self):
+        body = []
+        while self.peek().kind != "eof":
+            body.append(self.parse_statement())
+        program = Node("program", 1, body=body)
+        program.comments = self.peek().comments
+        return program
+
+    def parse_block(self):
+        self.expect("{")
+        body = []
+        while not self.at("}"):
+            if self.peek().kind == "eof":
+                raise ConversionError("unterminated block", self.peek().line)
+            body.append(self.parse_statement())
+        end = self.next()
+        return body, end.comments
+
+    def parse_statement(self):
+        token = self.peek()
+        comments = token.comments
+        token.comments = []
+        node = self._parse_statement(token)
+        node.comments = comments + node.comments
+        node.trailing = self.tokens[self.pos - 1].trailing
+        return node
+
+    def _parse_statement(self, token):
+        line = token.line
+        if self.at("{"):
+            body, comments = self.parse_block()
+            return Node("block", line, body=body, end_comments=comments)
+        if self.at(";"):
+            self.next()
+            return Node("empty", line)
+        if self.at("var"):
+            self.next()
+            decls = self.parse_var_decls()
+            self.end_statement()
+            return Node("var", line, decls=decls)
+        if self.at("function") and self.peek(1).kind == "name":
+            return self.parse_function(declaration=True)
+        if self.at("if"):
+            self.next()
+            test = self.parse_paren_expression()
+            consequent = self.parse_statement()
+            alternate = None
+            if self.accept("else"):
+                alternate = self.parse_statement()
+            return Node("if", line, test=test, consequent=consequent,
+                        alternate=alternate)
+        if self.at("for"):
+            return self.parse_for()
+        if self.at("while"):
+            self.next()
+            test = self.parse_paren_expression()
+            return Node("while", line, test=test, body=self.parse_statement())
+        if self.at("do"):
+            self.next()
+            body = self.parse_statement()
+            self.expect("while")
+            test = self.parse_paren_expression()
+            self.accept(";")
+            return Node("do", line, test=test, body=body)
+        if self.at("return"):
+            self.next()
+            value = None
+            following = self.peek()
+            if not (self.at(";") or self.at("}") or following.newline):
+                value = self.parse_expression()
+            self.end_statement()
+            return Node("return", line, value=value)
+        if self.at("break") or self.at("continue"):
+            keyword = self.next().value
+            if self.peek().kind == "name" and not self.peek().newline:
+                raise ConversionError("labelled {} is not supported".format(
+                    keyword), line)
+            self.end_statement()
+            return Node(keyword, line)
+        if self.at("throw"):
+            self.next()
+            value = self.parse_expression()
+            self.end_statement()
+            return Node("throw", line, value=value)
+        if self.at("try"):
+            return self.parse_try()
+        if self.at("switch"):
+            return self.parse_switch()
+        if token.kind == "name" and token.value in KEYWORDS - set(
+                ["function", "new", "this", "typeof", "void", "delete"]):
+            raise ConversionError("{} statements are not supported".format(
+                token.value), line)
+        if token.kind == "name" and self.at(":", 1):
+            raise ConversionError("labels are not supported", line)
+        expr = self.parse_expression(allow_sequence=True)
+        self.end_statement()
+        return Node("expr", line, expr=expr)
+
+    def parse_var_decls(self):
+        decls = []
+        while True:
+            name = self.expect_name()
+            init = None
+            if self.accept("="):
+                init = self.parse_assignment()
+            decls.append((name, init))
+            if not self.accept(","):
+                return decls
+
+    def parse_for(self):
+        line = self.expect("for").line
+        self.expect("(")
+        offset = 1 if self.at("var") else 0
+        if self.peek(offset).kind == "name" and self.at("in", offset + 1):
+            raise ConversionError("for-in loops are not supported", line)
+        init = None
+        if self.at("var"):
+            init = Node("var", line, decls=[])
+            self.next()
+            init.decls = self.parse_var_decls()
+        elif not self.at(";"):
+            init = Node("expr", line,
+                        expr=self.parse_expression(allow_sequence=True))
+        self.expect(";")
+        test = None
+        if not self.at(";"):
+            test = self.parse_expression()
+        self.expect(";")
+        update = None
+        if not self.at(")"):
+            update = Node("expr", line,
+                          expr=self.parse_expression(allow_sequence=True))
+        self.expect(")")
+        body = self.parse_statement()
+        return Node("for", line, init=init, test=test, update=update,
+                    body=body)
+
+    def parse_try(self):
+        line = self.expect("try").line
+        body, _ = self.parse_block()
+        param = handler = finalizer = None
+        if self.accept("catch"):
+            self.expect("(")
+            param = self.expect_name()
+            self.expect(")")
+            handler, _ = self.parse_block()
+        if self.accept("finally"):
+            finalizer, _ = self.parse_block()
+        if handler is None and finalizer is None:
+            raise ConversionError("try without catch or finally", line)
+        return Node("try", line, body=body, param=param, handler=handler,
+                    finalizer=finalizer)
+
+    def parse_switch(self):
+        line = self.expect("switch").line
+        discriminant = self.parse_paren_expression()
+        self.expect("{")
+        cases = []
+        while not self.accept("}"):
+            case_line = self.peek().line
+            if self.accept("default"):
+                test = None
+            else:
+                self.expect("case")
+                test = self.parse_expression()
+            self.expect(":")
+            body = []
+            while not (self.at("case") or self.at("default") or self.at("}")):
+                body.append(self.parse_statement())
+            cases.append(Node("case", case_line, test=test, body=body))
+        return Node("switch", line, discriminant=discriminant, cases=cases)
+
+    def parse_function(self, declaration=False):
+        line = self.expect("function").line
+        name = None
+        if self.peek().kind == "name":
+            name = self.expect_name()
+        self.expect("(")
+        params = []
+        while not self.accept(")"):
+            params.append(self.expect_name())
+            if not self.at(")"):
+                self.expect(",")
+        body, end_comments = self.parse_block()
+        return Node("function", line, name=name, params=params, body=body,
+                    declaration=declaration, end_comments=end_comments)
+
+    def parse_paren_expression(self):
+        self.expect("(")
+        expr = self.parse_expression()
+        self.expect(")")
+        return expr
+
+    def parse_expression(self, allow_sequence=False):
+        line = self.peek().line
+        expr = self.parse_assignment()
+        if not self.at(","):
+            return expr
+        if not allow_sequence:
+            raise ConversionError("the comma operator is not supported", line)
+        items = [expr]
+        while self.accept(","):
+            items.append(self.parse_assignment())
+        return Node("seq", line, items=items)
+
+    def parse_assignment(self):
+        left = self.parse_conditional()
+        token = self.peek()
+        if token.kind == "punct" and token.value in ASSIGN_OPS:
+            self.next()
+            if left.type not in ("name", "member", "index"):
+                raise ConversionError("invalid assignment target", token.line)
+            value = self.parse_assignment()
+            return Node("assign", token.line, op=token.value, target=left,
+                        value=value)
+        return left
+
+    def parse_conditional(self):
+        test = self.parse_binary(0)
+        if not self.at("?"):
+            return test
+        line = self.next().line
+        consequent = self.parse_assignment()
+        self.expect(":")
+        alternate = self.parse_assignment()
+        return Node("cond", line, test=test, consequent=consequent,
+                    alternate=alternate)
+
+    def parse_binary(self, min_prec):
+        left = self.parse_unary()
+        while True:
+            token = self.peek()
+            if token.kind not in ("punct", "name"):
+                return left
+            prec = BINARY_PRECEDENCE.get(token.value)
+            if prec is None or prec <= min_prec:
+                return left
+            self.next()
+            right = self.parse_binary(prec)
+            left = Node("binary", token.line, op=token.value, left=left,
+                        right=right)
+
+    def parse_unary(self):
+        token = self.peek()
+        if token.kind == "punct" and token.value in ("!", "~", "-", "+"):
+            self.next()
+            return Node("unary", token.line, op=token.value,
+                        expr=self.parse_unary())
+        if token.kind == "punct" and token.value in ("++", "--"):
+            self.next()
+            return Node("update", token.line, op=token.value,
+                        target=self.parse_unary())
+        if token.kind == "name" and token.value in ("typeof", "void",
+                                                    "delete"):
+            raise ConversionError("{} is not supported".format(token.value),
+                                  token.line)
+        expr = self.parse_call()
+        token = self.peek()
+        if token.kind == "punct" and token.value in ("++", "--") and \
+                not token.newline:
+            self.next()
+            return Node("update", token.line, op=token.value, target=expr)
+        return expr
+
+    def parse_call(self):
+        token = self.peek()
+        if self.at("new"):
+            self.next()
+            callee = self.parse_member(self.parse_primary())
+            args = self.parse_args() if self.at("(") else []
+            expr = Node("new", token.line, callee=callee, args=args)
+        elif self.at("function"):
+            expr = self.parse_function()
+        else:
+            expr = self.parse_primary()
+        while True:
+            expr = self.parse_member(expr)
+            if not self.at("("):
+                return expr
+            line = self.peek().line
+            expr = Node("call", line, callee=expr, args=self.parse_args())
+
+    def parse_member(self, expr):
+        while True:
+            if self.accept("."):
+                line = self.peek().line
+                expr = Node("member", line, object=expr,
+                            name=self.expect_name())
+            elif self.at("["):
+                line = self.next().line
+                index = self.parse_expression()
+                self.expect("]")
+                expr = Node("index", line, object=expr, index=index)
+            else:
+                return expr
+
+    def parse_args(self):
+        self.expect("(")
+        args = []
+        while not self.accept(")"):
+            args.append(self.parse_assignment())
+            if not self.at(")"):
+                self.expect(",")
+        return args
+
+    def parse_primary(self):
+        token = self.next()
+        line = token.line
+        if token.kind == "num":
+            return Node("num", line, value=token.value)
+        if token.kind == "str":
+            return Node("str", line, value=token.value)
+        if token.kind == "regexp":
+            return Node("regexp", line, body=token.value[0],
+                        flags=token.value[1])
+        if token.kind == "name":
+            if token.value == "this":
+                return Node("this", line)
+            if token.value in KEYWORDS:
+                raise ConversionError("unexpected {!r}".format(token.value),
+                                      line)
+            return Node("name", line, name=token.value)
+        if token.value == "(":
+            expr = self.parse_expression()
+            self.expect(")")
+            return expr
+        if token.value == "[":
+            items = []
+            while not self.accept("]"):
+                if self.at(","):
+                    raise ConversionError("arrays with holes are not "
+                                          "supported", line)
+                items.append(self.parse_assignment())
+                if not self.at("]"):
+                    self.expect(",")
+            return Node("array", line, items=items)
+        if token.value == "{":
+            pairs = []
+            while not self.accept("}"):
+                key = self.next()
+                if key.kind not in ("name", "str", "num"):
+                    raise ConversionError("invalid property name", key.line)
+                self.expect(":")
+                pairs.append((key.value, self.parse_assignment()))
+                if not self.at("}"):
+                    self.expect(",")
+            return Node("object", line, pairs=pairs)
+        raise ConversionError("unexpected {!r}".format(token.value), line)
+
+
+def _children(node):
+    for name, value in node.__dict__.iteritems():
+        if name in ("comments", "trailing"):
+            continue
+        if isinstance(value, Node):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, Node):
+                    yield item
+                elif isinstance(item, tuple):
+                    for part in item:
+                        if isinstance(part, Node):
+                            yield part
+
+
+def _scan_scope(body):
+    """Find the names declared and assigned by a function body.
+
+    Javascript variables belong to the whole function, so this looks in
+    every nested block, but not inside nested functions.
+    """
+    declared = set()
+    assigned = set()
+    stack = list(body)
+    while stack:
+        node = stack.pop()
+        if node.type == "function":
+            if node.declaration:
+                declared.add(node.name)
+            continue
+        if node.type == "var":
+            declared.update(name for name, _ in node.decls)
+        elif node.type == "try" and node.param is not None:
+            declared.add(node.param)
+        elif node.type in ("assign", "update") and \
+                node.target.type == "name":
+            assigned.add(node.target.name)
+        stack.extend(_children(node))
+    return declared, assigned
+
+
+def _find_classes(tokens):
+    """Find the names of functions that are used as constructors."""
+    classes = set()
+    for i, token in enumerate(tokens[:-2]):
+        if token.kind != "name":
+            continue
+        following = tokens[i + 1]
+        if token.value == "new" and following.kind == "name":
+            classes.add(following.value)
+        elif following.value == "." and tokens[i + 2].value == "prototype":
+            classes.add(token.value)
+    return classes
+
+
+def _find_methods(tokens):
+    """Find the names of methods defined on the prototypes of classes."""
+    methods = set()
+    for i, token in enumerate(tokens[:-2]):
+        if token.kind != "name" or token.value != "prototype":
+            continue
+        if tokens[i + 1].value == "." and tokens[i + 2].kind == "name":
+            methods.add(tokens[i + 2].value)
+        elif tokens[i + 1].value == "=" and tokens[i + 2].value == "{":
+            depth = 0
+            for j in xrange(i + 2, len(tokens) - 1):
+                if tokens[j].value in ("{", "(", "["):
+                    depth += 1
+                elif tokens[j].value in ("}", ")", "]"):
+                    depth -= 1
+                    if depth == 0:
+                        break
+                elif depth == 1 and tokens[j + 1].value == ":" and \
+                        tokens[j].kind in ("name", "str"):
+                    methods.add(tokens[j].value)
+    return methods
+
+
+def _contains_break(body):
+    stack = list(body)
+    while stack:
+        node = stack.pop()
+        if node.type == "break":
+            return True
+        if node.type in ("for", "while", "do", "switch", "function"):
+            continue
+        stack.extend(_children(node))
+    return False
+
+
+def _is_none(node):
+    return node.type == "name" and node.name in ("null", "undefined")
+
+
+def _num_value(text):
+    if text[:2] in ("0x", "0X"):
+        return int(text, 16)
+    value = float(text)
+    if value.is_integer():
+        return int(value)
+    return value
+
+
+def _int32(value):
+    # Javascript's ToInt32, which takes NaN and the infinities to 0.
+    if value != value or value in (float("inf"), float("-inf")):
+        return 0
+    value = int(value) & 0xFFFFFFFF
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+def _statements(node):
+    if node.type == "block":
+        return node.body
+    return [node]
+
+
+def _indent(lines):
+    return ["    " + ln if ln else ln for ln in lines]
+
+
+def _py_string(value):
+    try:
+        return repr(value.encode("ascii"))
+    except UnicodeEncodeError:
+        return repr(value)
+
+
+def _py_name(name):
+    if "$" in name:
+        raise ConversionError("the name {!r} has no python equivalent".format(
+            name))
+    if name in RESERVED:
+        return name + "_"
+    return name
+
+
+class _Scope(object):
+
+    def __init__(self, parent, names, method):
+        self.parent = parent
+        self.names = names
+        self.method = method
+
+
+class Converter(object):
+    """Write out a tree of Nodes as python source.
+
+    Statements become lists of lines and expressions become a string and
+    the precedence of its outermost python operator, so that parentheses
+    are only added where python needs them.
+    """
+
+    def __init__(self, classes, methods=()):
+        self.classes = classes
+        self.methods = set(methods)
+        self.scope = None
+        self.module_names = set()
+        self.module_refs = set()
+        self.helpers = set()
+        self.uses_js = False
+        self.uses_division = False
+        self.pending = []
+        self.loops = []
+        self.counter = 0
+
+    def header(self, program):
+        """Take the comments at the top of the program, like its license.
+
+        These are the comments before the first statement up to the last
+        blank line, so that they can go before the imports.
+        """
+        if not program.body:
+            return []
+        comments = program.body[0].comments
+        if None not in comments:
+            return []
+        split = len(comments) - comments[::-1].index(None)
+        program.body[0].comments = comments[split:]
+        return self.comments(comments[:split - 1]) + [""]
+
+    def convert(self, program):
+        header = self.header(program)
+        declared, assigned = _scan_scope(program.body)
+        self.module_names.update(declared, assigned, self.classes)
+        # Top-level definitions get blank lines around them, including
+        # between the preamble and the body, which is written out first
+        # so that we know which names the preamble needs.
+        lines = []
+        spaced = starts_spaced = False
+        for stmt in program.body:
+            out = self.statement(stmt)
+            if any(ln.startswith(("def ", "class ")) for ln in out):
+                self.add_blank_lines(lines)
+                spaced = True
+                starts_spaced = starts_spaced or not lines
+            elif spaced:
+                self.add_blank_lines(lines)
+                spaced = False
+            while lines and not lines[-1] and out and not out[0]:
+                out.pop(0)
+            lines.extend(out)
+        lines.extend(self.comments(program.comments))
+        preamble = self.preamble()
+        if preamble and (starts_spaced or self.helpers):
+            self.add_blank_lines(preamble)
+        elif preamble:
+            while not preamble[-1]:
+                preamble.pop()
+            preamble.append("")
+        return header + preamble + lines
+
+    def preamble(self):
+        lines = []
+        if self.uses_division:
+            lines.extend(["from __future__ import division", ""])
+        free = sorted(self.module_refs - self.module_names)
+        if free or self.uses_js:
+            lines.extend(["import js", ""])
+        for name in free:
+            lines.append('{} = js.globals["{}"]'.format(_py_name(name), name))
+        if free:
+            lines.append("")
+        for name in sorted(self.helpers):
+            self.add_blank_lines(lines)
+            lines.extend(HELPERS[name])
+        if self.helpers:
+            self.add_blank_lines(lines)
+        return lines
+
+    def add_blank_lines(self, lines):
+        while lines and not lines[-1]:
+            lines.pop()
+        if lines:
+            lines.extend(["", ""])
+
+    def comments(self, comments):
+        return ["" if c is None else "#" + c.rstrip() for c in comments]
+
+    def error(self, message, node):
+        raise ConversionError(message, node.line)
+
+    # Scopes.
+
+    def is_local(self, name):
+        scope = self.scope
+        while scope is not None:
+            if name in scope.names:
+                return True
+            scope = scope.parent
+        return False
+
+    def in_method(self):
+        scope = self.scope
+        while scope is not None:
+            if scope.method:
+                return True
+            scope = scope.parent
+        return False
+
+    def push_scope(self, node, method):
+        declared, assigned = _scan_scope(node.body)
+        names = set(node.params) | declared
+        global_names = []
+        for name in sorted(assigned - names):
+            if self.is_local(name):
+                self.error("assigning to {} from a nested function can't be "
+                           "done in python 2".format(name), node)
+            global_names.append(_py_name(name))
+            self.module_names.add(name)
+        self.scope = _Scope(self.scope, names, method)
+        return global_names
+
+    # Statements.
+
+    def statement(self, node):
+        outer = self.pending
+        self.pending = []
+        handler = getattr(self, "stmt_" + node.type, None)
+        if handler is None:
+            self.error("{} statements are not supported".format(node.type),
+                       node)
+        lines = handler(node)
+        if node.trailing is not None:
+            if node.type in SIMPLE_STATEMENTS and lines:
+                lines[-1] += "  #" + node.trailing.rstrip()
+            else:
+                lines.extend(self.comments([node.trailing]))
+        lines = self.comments(node.comments) + self.pending + lines
+        self.pending = outer
+        return lines
+
+    def block(self, node, end_comments=()):
+        lines = []
+        for stmt in _statements(node):
+            lines.extend(self.statement(stmt))
+        if node.type == "block":
+            lines.extend(self.comments(node.end_comments))
+        lines.extend(self.comments(end_comments))
+        if not any(ln and not ln.startswith("#") for ln in lines):
+            lines.append("pass")
+        return _indent(lines)
+
+    def stmt_empty(self, node):
+        return []
+
+    def stmt_block(self, node):
+        lines = []
+        for stmt in node.body:
+            lines.extend(self.statement(stmt))
+        return lines + self.comments(node.end_comments)
+
+    def stmt_var(self, node):
+        lines = []
+        for name, init in node.decls:
+            if init is None:
+                lines.append("{} = None".format(_py_name(name)))
+            elif init.type == "function":
+                lines.extend(self.function(init, name))
+            else:
+                lines.append("{} = {}".format(_py_name(name), self.text(init)))
+        return lines
+
+    def stmt_function(self, node):
+        if node.name in self.classes:
+            return self.constructor(node)
+        return self.function(node, node.name)
+
+    def stmt_expr(self, node):
+        expr = node.expr
+        if expr.type == "seq":
+            lines = []
+            for item in expr.items:
+                lines.extend(self.stmt_expr(Node("expr", item.line,
+                                                 expr=item)))
+            return lines
+        if expr.type == "assign":
+            return self.assignment(expr)
+        if expr.type == "update":
+            op = "+=" if expr.op == "++" else "-="
+            return ["{} {} 1".format(self.target(expr.target), op)]
+        if expr.type == "call" and expr.callee.type == "member" and \
+                expr.callee.name == "sort" and len(expr.args) <= 1:
+            return ["{}.sort({})".format(self.wrap(expr.callee.object, 14),
+                                         ", ".join(self.wrap(arg, 0)
+                                                   for arg in expr.args))]
+        if expr.type == "call" and expr.callee.type == "name" and \
+                expr.callee.name == "print":
+            args = ", ".join(self.wrap(arg, 0) for arg in expr.args)
+            return [("print " + args).rstrip()]
+        return [self.text(expr)]
+
+    def stmt_if(self, node):
+        lines = ["if {}:".format(self.text(node.test))]
+        lines.extend(self.block(node.consequent))
+        alternate = node.alternate
+        while alternate is not None and alternate.type == "if" and \
+                not alternate.comments:
+            lines.append("elif {}:".format(self.text(alternate.test)))
+            lines.extend(self.block(alternate.consequent))
+            alternate = alternate.alternate
+        if alternate is not None:
+            lines.append("else:")
+            lines.extend(self.block(alternate))
+        return lines
+
+    def stmt_for(self, node):
+        lines = []
+        if node.init is not None:
+            lines.extend(self.statement(node.init))
+        update = []
+        if node.update is not None:
+            update = self.statement(node.update)
+        test = "True" if node.test is None else self.text(node.test)
+        lines.append("while {}:".format(test))
+        # A continue has to run the update before going round again.
+        self.loops.append(update)
+        try:
+            body = self.block(node.body)
+        finally:
+            self.loops.pop()
+        if body == _indent(["pass"]) and update:
+            body = []
+        return lines + body + _indent(update)
+
+    def stmt_while(self, node):
+        lines = ["while {}:".format(self.text(node.test))]
+        self.loops.append([])
+        try:
+            return lines + self.block(node.body)
+        finally:
+            self.loops.pop()
+
+    def stmt_do(self, node):
+        """Convert a do-while loop, checking the test before a continue.
+
+        >>> exec convert('''
+        ... var i = 0, total = 0;
+        ... do {
+        ...   i++;
+        ...   if (i % 2 == 0) continue;
+        ...   total += i;
+        ... } while (i < 7);
+        ... print(i, total);
+        ... ''')
+        7 16
+        """
+        check = ["if not {}:".format(self.wrap(node.test, 4)), "    break"]
+        self.loops.append(check)
+        try:
+            body = self.block(node.body)
+        finally:
+            self.loops.pop()
+        return ["while True:"] + body + _indent(check)
+
+    def stmt_return(self, node):
+        if node.value is None:
+            return ["return"]
+        return ["return {}".format(self.text(node.value))]
+
+    def stmt_break(self, node):
+        return ["break"]
+
+    def stmt_continue(self, node):
+        if not self.loops:
+            self.error("continue outside of a loop", node)
+        return self.loops[-1] + ["continue"]
+
+    def stmt_throw(self, node):
+        return ["raise {}".format(self.text(node.value))]
+
+    def stmt_try(self, node):
+        lines = ["try:"]
+        lines.extend(self.block(Node("block", node.line, body=node.body,
+                                     end_comments=[])))
+        if node.handler is not None:
+            lines.append("except Exception as {}:".format(
+                _py_name(node.param)))
+            lines.extend(self.block(Node("block", node.line,
+                                         body=node.handler, end_comments=[])))
+        if node.finalizer is not None:
+            lines.append("finally:")
+            lines.extend(self.block(Node("block", node.line,
+                                         body=node.finalizer,
+                                         end_comments=[])))
+        return lines
+
+    def stmt_switch(self, node):
+        """Convert a switch into a chain of ifs.
+
+        >>> exec convert('''
+        ... function kind(n) {
+        ...   switch (n & 3) {
+        ...     case 0: return "none";
+        ...     case 1: case 2:
+        ...       var s = "some" + n;
+        ...       break;
+        ...     default: return "all";
+        ...   }
+        ...   return s;
+        ... }
+        ... print(kind(4), kind(5), kind(6), kind(-1));
+        ... ''')
+        none some5 some6 all
+        """
+        lines = []
+        if node.discriminant.type == "name":
+            subject = self.wrap(node.discriminant, 6)
+        else:
+            self.counter += 1
+            subject = "_switch{}".format(self.counter)
+            lines.append("{} = {}".format(subject,
+                                          self.text(node.discriminant)))
+        # Group cases that fall through to the same code.
+        groups = []
+        tests = []
+        for case in node.cases:
+            tests.append(case.test)
+            if case.body:
+                groups.append((tests, case.body, case))
+                tests = []
+        if tests:
+            groups.append((tests, [], node.cases[-1]))
+        for i, (tests, body, case) in enumerate(groups):
+            last = i == len(groups) - 1
+            if body and body[-1].type == "break":
+                body = body[:-1]
+            elif body and not last and body[-1].type not in (
+                    "return", "throw", "continue"):
+                self.error("switch cases that fall through are not "
+                           "supported", case)
+            if _contains_break(body):
+                self.error("break inside a switch case is only supported "
+                           "at its end", case)
+            if None in tests:
+                if not last:
+                    self.error("default must be the last switch case", case)
+                lines.append("else:" if i else "if True:")
+            else:
+                keyword = "elif" if i else "if"
+                if len(tests) == 1:
+                    test = "{} == {}".format(subject, self.wrap(tests[0], 6))
+                else:
+                    test = "{} in ({})".format(subject, ", ".join(
+                        self.wrap(t, 1) for t in tests))
+                lines.append("{} {}:".format(keyword, test))
+            lines.extend(self.block(Node("block", case.line, body=body,
+                                         end_comments=[])))
+        return lines
+
+    # Functions and classes.
+
+    def function(self, node, name, method=False):
+        outer = self.scope
+        global_names = self.push_scope(node, method)
+        try:
+            params = [_py_name(p) for p in node.params]
+            if method:
+                params.insert(0, "self")
+            body = []
+            if global_names:
+                body.append("global " + ", ".join(global_names))
+            # Function declarations are hoisted in javascript, so define
+            # them first in case they're called before they appear.
+            stmts = sorted(node.body, key=lambda s: s.type != "function")
+            for stmt in stmts:
+                body.extend(self.statement(stmt))
+            body.extend(self.comments(node.end_comments))
+        finally:
+            self.scope = outer
+        if not any(ln and not ln.startswith("#") for ln in body):
+            body.append("pass")
+        header = "def {}({}):".format(_py_name(name), ", ".join(params))
+        return [header] + _indent(body)
+
+    def constructor(self, node):
+        lines = ["class {}(object):".format(_py_name(node.name)), ""]
+        lines.extend(_indent(self.function(node, "__init__", method=True)))
+        return lines
+
+    def method(self, cls, name, value):
+        """Convert a function on a constructor's prototype to a method.
+
+        >>> exec convert('''
+        ... function Counter(start) {
+        ...   this.count = start;
+        ... }
+        ... Counter.prototype = {
+        ...   add: function(n) { this.count += n; return this; },
+        ...   toString: function() { return "Counter(" + this.count + ")"; }
+        ... };
+        ... Counter.prototype.reset = function() { this.count = 0; };
+        ... var c = new Counter(1).add(2).add(3);
+        ... print(c.toString(), c.count);
+        ... c.reset();
+        ... print(c.count);
+        ... ''')
+        Counter(6) 6
+        0
+        """
+        # Methods are defined as functions and then attached to the class.
+        if value.type == "function":
+            func_name = "{}_{}".format(cls, name)
+            lines = self.function(value, func_name, method=True)
+            value_text = _py_name(func_name)
+        else:
+            lines = []
+            value_text = self.text(value)
+        if keyword.iskeyword(name):
+            lines.append("setattr({}, {!r}, {})".format(_py_name(cls), name,
+                                                        value_text))
+        else:
+            lines.append("{}.{} = {}".format(_py_name(cls), name, value_text))
+        return lines
+
+    def assignment(self, node):
+        target = node.target
+        value = node.value
+        if node.op == "=" and target.type == "member":
+            obj = target.object
+            if obj.type == "member" and obj.name == "prototype":
+                if obj.object.type == "name" and \
+                        obj.object.name in self.classes:
+                    return self.method(obj.object.name, target.name, value)
+            if target.name == "prototype":
+                if target.object.type == "name" and \
+                        target.object.name in self.classes and \
+                        value.type == "object":
+                    lines = []
+                    for name, item in value.pairs:
+                        if lines and self.scope is None:
+                            self.add_blank_lines(lines)
+                        lines.extend(self.method(target.object.name, name,
+                                                 item))
+                    return lines
+                self.error("prototype inheritance is not supported", node)
+            if keyword.iskeyword(target.name):
+                return ["setattr({}, {!r}, {})".format(
+                    self.wrap(obj, 14), target.name, self.text(value))]
+        if node.op == "=" and value.type == "function":
+            if target.type == "name":
+                return self.function(value, target.name)
+            name = self.hoist(value, target.name)
+            return ["{} = {}".format(self.target(target), name)]
+        targets = [self.target(target)]
+        if node.op == ">>>=":
+            self.helpers.add("_urshift")
+            return ["{0} = _urshift({0}, {1})".format(targets[0],
+                                                      self.text(value))]
+        if node.op[:-1] in INT32_OPERATORS:
+            # Python's augmented assignments don't wrap at 32 bits.
+            value = Node("binary", node.line, op=node.op[:-1], left=target,
+                         right=value)
+            return ["{} = {}".format(targets[0], self.text(value))]
+        if node.op == "/=":
+            self.uses_division = True
+        if node.op == "=" and target.type == "index":
+            if value.type == "assign":
+                self.error("chained assignments to an index are not "
+                           "supported", node)
+            return [self.store(target, value)]
+        while node.op == "=" and value.type == "assign" and value.op == "=":
+            if value.target.type == "index":
+                self.error("chained assignments to an index are not "
+                           "supported", node)
+            targets.append(self.target(value.target))
+            value = value.value
+        return ["{} {} {}".format(" = ".join(targets), node.op,
+                                  self.text(value))]
+
+    def store(self, target, value):
+        """Store into an index, growing python lists as js arrays grow.
+
+        >>> print convert('''
+        ... var a = [];
+        ... a[a.length] = 1;
+        ... a[3] = 2;
+        ... a["x"] = 3;
+        ... ''')
+        def _setitem(a, i, value):
+            if isinstance(a, list) and not 0 <= i < len(a):
+                if i < 0:
+                    raise IndexError('negative array index %r' % (i,))
+                a.extend([None] * (i + 1 - len(a)))
+            a[i] = value
+        <BLANKLINE>
+        <BLANKLINE>
+        a = []
+        a.append(1)
+        _setitem(a, 3, 2)
+        a['x'] = 3
+        <BLANKLINE>
+        """
+        obj = target.object
+        index = target.index
+        obj_text = self.wrap(obj, PY_PRECEDENCE["atom"])
+        index_text = self.text(index)
+        value_text = self.text(value)
+        # Arrays from js grow by themselves, and strings aren't indexes.
+        if index.type == "str" or self.is_js_value(obj):
+            return "{}[{}] = {}".format(obj_text, index_text, value_text)
+        if index.type == "member" and index.name == "length" and \
+                self.text(index.object) == self.text(obj):
+            return "{}.append({})".format(obj_text, value_text)
+        self.helpers.add("_setitem")
+        return "_setitem({}, {}, {})".format(self.text(obj), index_text,
+                                             value_text)
+
+    def hoist(self, node, name):
+        # Define a function expression before the statement that uses it.
+        if name is None or self.is_local(name) or name in self.module_names:
+            self.counter += 1
+            name = "_function{}".format(self.counter)
+        self.pending.extend(self.function(node, name))
+        return _py_name(name)
+
+    def target(self, node):
+        if node.type == "name":
+            return _py_name(node.name)
+        if node.type == "member":
+            if node.name in ("length", "prototype") or \
+                    keyword.iskeyword(node.name):
+                self.error("can't assign to {}".format(node.name), node)
+            return "{}.{}".format(self.wrap(node.object, 14), node.name)
+        return self.text(node)
+
+    # Expressions.
+
+    def text(self, node):
+        return self.expr(node)[0]
+
+    def wrap(self, node, min_prec):
+        text, prec = self.expr(node)
+        if prec < min_prec:
+            return "(" + text + ")"
+        return text
+
+    def expr(self, node):
+        handler = getattr(self, "expr_" + node.type, None)
+        if handler is None:
+            self.error("{} expressions are not supported here".format(
+                node.type), node)
+        return handler(node)
+
+    def expr_num(self, node):
+        return node.value, PY_PRECEDENCE["atom"]
+
+    def expr_str(self, node):
+        return _py_string(node.value), PY_PRECEDENCE["atom"]
+
+    def expr_regexp(self, node):
+        # Regular expressions stay as js objects.
+        self.uses_js = True
+        source = u"/{}/{}".format(node.body, node.flags)
+        return "js.eval({})".format(_py_string(source)), PY_PRECEDENCE["atom"]
+
+    def expr_name(self, node):
+        name = node.name
+        if name in ("true", "false"):
+            return name.capitalize(), PY_PRECEDENCE["atom"]
+        if name in ("null", "undefined"):
+            return "None", PY_PRECEDENCE["atom"]
+        if name == "NaN":
+            return "float('nan')", PY_PRECEDENCE["atom"]
+        if name == "Infinity":
+            return "float('inf')", PY_PRECEDENCE["atom"]
+        if name == "arguments":
+            self.error("arguments is not supported", node)
+        if not self.is_local(name):
+            self.module_refs.add(name)
+        return _py_name(name), PY_PRECEDENCE["atom"]
+
+    def expr_this(self, node):
+        if not self.in_method():
+            self.error("this is only supported in constructors and methods",
+                       node)
+        return "self", PY_PRECEDENCE["atom"]
+
+    def expr_array(self, node):
+        items = ", ".join(self.wrap(item, 0) for item in node.items)
+        return "[{}]".format(items), PY_PRECEDENCE["atom"]
+
+    def expr_object(self, node):
+        fields = []
+        for name, value in node.pairs:
+            if not re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", name) or \
+                    keyword.iskeyword(name):
+                self.error("the property {!r} has no python equivalent".format(
+                    name), node)
+            fields.append("{}={}".format(name, self.wrap(value, 0)))
+        self.helpers.add("_Object")
+        return "_Object({})".format(", ".join(fields)), PY_PRECEDENCE["atom"]
+
+    def expr_member(self, node):
+        obj = node.object
+        if node.name == "length":
+            if self.is_js_value(obj):
+                return "int({}.length)".format(self.wrap(obj, 14)), \
+                    PY_PRECEDENCE["atom"]
+            return "len({})".format(self.text(obj)), PY_PRECEDENCE["atom"]
+        if node.name == "prototype":
+            self.error("prototype is only supported for defining methods",
+                       node)
+        text = self.wrap(obj, PY_PRECEDENCE["atom"])
+        if keyword.iskeyword(node.name):
+            return "getattr({}, {!r})".format(text, node.name), \
+                PY_PRECEDENCE["atom"]
+        if obj.type == "name" and obj.name == "Math":
+            return "float({}.{})".format(text, node.name), \
+                PY_PRECEDENCE["atom"]
+        return "{}.{}".format(text, node.name), PY_PRECEDENCE["atom"]
+
+    def is_js_value(self, node):
+        """Check whether an expression obviously gives a js object."""
+        while node.type in ("member", "index", "call"):
+            if node.type == "call" and node.callee.type == "member" and \
+                    node.callee.name in REGEXP_METHODS:
+                return True
+            node = node.callee if node.type == "call" else node.object
+        if node.type == "regexp":
+            return True
+        return node.type == "name" and not self.is_local(node.name) and \
+            node.name not in self.module_names and \
+            node.name not in ("String", "Date")
+
+    def expr_index(self, node):
+        return "{}[{}]".format(self.wrap(node.object, PY_PRECEDENCE["atom"]),
+                               self.text(node.index)), PY_PRECEDENCE["atom"]
+
+    def expr_call(self, node):
+        callee = node.callee
+        args = [self.wrap(arg, 0) for arg in node.args]
+        atom = PY_PRECEDENCE["atom"]
+        if callee.type == "name":
+            if callee.name == "print":
+                self.error("print is only supported as a statement", node)
+            if callee.name == "awpyNow":
+                return "float({}())".format(self.text(callee)), atom
+            if callee.name in ("parseInt", "parseFloat") and len(args) == 1:
+                convert = "int" if callee.name == "parseInt" else "float"
+                return "{}({})".format(convert, args[0]), atom
+        if callee.type == "member":
+            converted = self.method_call(callee, node.args, args)
+            if converted is not None:
+                return converted, atom
+        return "{}({})".format(self.wrap(callee, atom), ", ".join(args)), atom
+
+    def method_call(self, callee, arg_nodes, args):
+        """Convert calls of builtin methods to their python equivalents.
+
+        Array and string methods without an equivalent are rejected, rather
+        than being left to fail when the program runs:
+
+        >>> exec convert('''
+        ... var a = [];
+        ... for (var i = 0; i < 5; i++) a.push(i * i);
+        ... print(a.join(","), a.join(" + "), a.pop());
+        ... ''')
+        0,1,4,9,16 0 + 1 + 4 + 9 + 16 16
+        >>> convert("var i = [1, 2].indexOf(2);")
+        Traceback (most recent call last):
+          ...
+        ConversionError: line 1: the indexOf method is not supported
+        >>> convert("var s = ['a'].join(',', 1);")
+        Traceback (most recent call last):
+          ...
+        ConversionError: line 1: the join method is not supported like this
+        """
+        obj = callee.object
+        name = callee.name
+        if obj.type == "name" and not self.is_local(obj.name):
+            if obj.name == "Math":
+                convert = "int" if name in INTEGER_MATH else "float"
+                return "{}({}.{}({}))".format(convert, self.text(obj), name,
+                                              ", ".join(args))
+            if obj.name == "String" and name == "fromCharCode" and args:
+                chars = " + ".join("unichr({})".format(a) for a in args)
+                return chars if len(args) == 1 else "(" + chars + ")"
+            if obj.name == "Date" and name == "now" and not args:
+                self.module_refs.add("awpyNow")
+                return "float(awpyNow()) * 1000"
+        atom = PY_PRECEDENCE["atom"]
+        if name == "sort":
+            self.error("sort is only supported as a statement, since "
+                       "python's gives None", callee)
+        if name == "push":
+            if len(args) == 1:
+                return "{}.append({})".format(self.wrap(obj, atom), args[0])
+            return "{}.extend([{}])".format(self.wrap(obj, atom),
+                                            ", ".join(args))
+        if name == "join" and len(args) <= 1:
+            # Javascript turns each item into a string, python doesn't.
+            sep = self.wrap(arg_nodes[0], atom) if args else "','"
+            self.helpers.add("_str")
+            return "{}.join(_str(x) for x in {})".format(
+                sep, self.wrap(obj, PY_PRECEDENCE["if"] + 1))
+        if name == "charCodeAt" and len(args) <= 1:
+            return "ord({}[{}])".format(self.wrap(obj, atom),
+                                        args[0] if args else "0")
+        if name == "charAt" and len(args) == 1:
+            return "{}[{}]".format(self.wrap(obj, atom), args[0])
+        if name in ("substring", "slice") and 1 <= len(args) <= 2:
+            return "{}[{}]".format(self.wrap(obj, atom), ":".join(
+                args if len(args) == 2 else args + [""]))
+        if name in REGEXP_METHODS:
+            # Use the js string method, since python's can't take a regexp
+            # and replaces every match of a string rather than the first.
+            self.uses_js = True
+            return "js.String({}).{}({})".format(self.text(obj), name,
+                                                 ", ".join(args))
+        if name == "pop" and not args:
+            return None
+        # Anything else is either a method of one of our classes, a call
+        # to a method of a js object across the bridge, or unsupported.
+        if name in BUILTIN_METHODS and name not in self.methods and \
+                not self.is_js_value(obj):
+            message = "the {} method is not supported".format(name)
+            if name in CONVERTED_METHODS:
+                message += " like this"
+            self.error(message, callee)
+        return None
+
+    def expr_new(self, node):
+        callee = node.callee
+        atom = PY_PRECEDENCE["atom"]
+        args = [self.wrap(arg, 0) for arg in node.args]
+        if callee.type == "name" and not self.is_local(callee.name):
+            name = callee.name
+            if name == "Array":
+                if len(args) == 1:
+                    return "[None] * {}".format(self.wrap(node.args[0], 12)), \
+                        PY_PRECEDENCE["*"]
+                return "[{}]".format(", ".join(args)), atom
+            if name in TYPED_ARRAYS:
+                if len(args) != 1:
+                    self.error("{} needs a length".format(name), node)
+                if node.args[0].type == "array":
+                    return args[0], atom
+                return "[{}] * {}".format(TYPED_ARRAYS[name],
+                                          self.wrap(node.args[0], 12)), \
+                    PY_PRECEDENCE["*"]
+            if name == "Object" and not args:
+                self.helpers.add("_Object")
+                return "_Object()", atom
+            if name in ("Error", "TypeError", "RangeError"):
+                return "Exception({})".format(", ".join(args)), atom
+        return "{}({})".format(self.wrap(callee, atom), ", ".join(args)), atom
+
+    def is_int32(self, node):
+        """Check whether an expression obviously gives a 32-bit integer."""
+        if node.type == "num":
+            value = _num_value(node.value)
+            return isinstance(value, (int, long)) and _int32(value) == value
+        if node.type == "unary" and node.op == "-" and \
+                node.expr.type == "num":
+            value = _num_value(node.expr.value)
+            return isinstance(value, (int, long)) and _int32(-value) == -value
+        if node.type == "unary":
+            return node.op == "~"
+        return node.type == "binary" and node.op in INT32_OPERATORS
+
+    def is_string(self, node):
+        """Check whether an expression obviously gives a string."""
+        if node.type == "str":
+            return True
+        if node.type == "binary" and node.op == "+":
+            return self.is_string(node.left) or self.is_string(node.right)
+        if node.type == "cond":
+            return self.is_string(node.consequent) and \
+                self.is_string(node.alternate)
+        if node.type == "call" and node.callee.type == "member":
+            callee = node.callee
+            if callee.name in ("charAt", "join", "substring"):
+                return True
+            return callee.name == "fromCharCode" and \
+                callee.object.type == "name" and \
+                callee.object.name == "String"
+        return False
+
+    def expr_int32(self, node):
+        """Convert a value to a signed 32-bit integer, as js's bitwise
+        operators do to their operands."""
+        atom = PY_PRECEDENCE["atom"]
+        if node.type == "num":
+            value = _num_value(node.value)
+            if not self.is_int32(node):
+                value = _int32(value)
+                return str(value), atom if value >= 0 else \
+                    PY_PRECEDENCE["unary"]
+        if self.is_int32(node):
+            return self.expr(node)
+        self.helpers.add("_toint32")
+        return "_toint32({})".format(self.text(node)), atom
+
+    def wrap_int32(self, node, min_prec):
+        text, prec = self.expr_int32(node)
+        if prec < min_prec:
+            return "(" + text + ")"
+        return text
+
+    def shift_count(self, node):
+        if node.type == "num":
+            return str(_int32(_num_value(node.value)) & 31)
+        return "({} & 31)".format(self.wrap_int32(node, PY_PRECEDENCE["&"]))
+
+    def wrap_str(self, node, min_prec):
+        """Convert a value to a string, as js's + does when the other
+        operand is a string."""
+        if self.is_string(node):
+            return self.wrap(node, min_prec)
+        if node.type == "num":
+            value = _num_value(node.value)
+            if isinstance(value, (int, long)) and abs(value) < 1e21:
+                return _py_string(unicode(value))
+        self.helpers.add("_str")
+        return "_str({})".format(self.text(node))
+
+    def expr_unary(self, node):
+        if node.op == "!":
+            prec = PY_PRECEDENCE["not"]
+            return "not {}".format(self.wrap(node.expr, prec)), prec
+        prec = PY_PRECEDENCE["unary"]
+        if node.op == "~":
+            return "~{}".format(self.wrap_int32(node.expr, prec)), prec
+        return "{}{}".format(node.op, self.wrap(node.expr, prec)), prec
+
+    def expr_binary(self, node):
+        """Convert a binary operator, keeping javascript's semantics.
+
+        Bitwise operators work on signed 32-bit integers, and + turns
+        numbers into strings when added to a string:
+
+        >>> print convert('''
+        ... var h = 49734321;
+        ... h = (h + (h << 10)) & 0xffffffff;
+        ... h ^= h >>> 6;
+        ... ''')
+        def _toint32(x):
+            x = int(x) & 0xFFFFFFFF
+            return x - 0x100000000 if x & 0x80000000 else x
+        <BLANKLINE>
+        <BLANKLINE>
+        def _urshift(x, n):
+            return (int(x) & 0xFFFFFFFF) >> (n & 31)
+        <BLANKLINE>
+        <BLANKLINE>
+        h = 49734321
+        h = _toint32(h + _toint32(_toint32(h) << 10)) & -1
+        h = _toint32(h) ^ _toint32(_urshift(h, 6))
+        <BLANKLINE>
+
+        The converted program gives the same results as javascript:
+
+        >>> exec convert('''
+        ... var seed = 49734321;
+        ... seed = ((seed + 0x7ed55d16) + (seed << 12)) & 0xffffffff;
+        ... print(seed, (0xffffffff + 5) | 0, -7 >> 1, 1 << 31, ~1.5);
+        ... print("n=" + 3 + 4, 1 + 2 + "a", "x" + 1.5, "y" + 2.0 * 3);
+        ... ''')
+        -269004857 4 -4 -2147483648 -2
+        n=34 3a x1.5 y6
+        """
+        op = node.op
+        left = node.left
+        right = node.right
+        atom = PY_PRECEDENCE["atom"]
+        if op in ("&&", "||"):
+            op = "and" if op == "&&" else "or"
+        elif op in ("==", "===", "!=", "!=="):
+            negate = op.startswith("!")
+            if _is_none(left) and not _is_none(right):
+                left, right = right, left
+            if _is_none(right):
+                op = "is not" if negate else "is"
+            else:
+                op = "!=" if negate else "=="
+        elif op == ">>>":
+            self.helpers.add("_urshift")
+            return "_urshift({}, {})".format(self.wrap(left, 1),
+                                             self.wrap(right, 1)), atom
+        elif op == "|" and right.type == "num" and \
+                _num_value(right.value) == 0:
+            # The usual idiom for truncating to an integer.
+            return self.expr_int32(left)
+        elif op in ("<<", ">>"):
+            prec = PY_PRECEDENCE[op]
+            text = "{} {} {}".format(self.wrap_int32(left, prec), op,
+                                     self.shift_count(right))
+            # Shifting right can't take a 32-bit integer out of range.
+            if op == ">>":
+                return text, prec
+            self.helpers.add("_toint32")
+            return "_toint32({})".format(text), atom
+        elif op in INT32_OPERATORS:
+            prec = PY_PRECEDENCE[op]
+            return "{} {} {}".format(self.wrap_int32(left, prec), op,
+                                     self.wrap_int32(right, prec + 1)), prec
+        elif op == "+" and self.is_string(left) != self.is_string(right):
+            prec = PY_PRECEDENCE[op]
+            return "{} + {}".format(self.wrap_str(left, prec),
+                                    self.wrap_str(right, prec + 1)), prec
+        elif op == "instanceof":
+            return "isinstance({}, {})".format(self.wrap(left, 1),
+                                               self.wrap(right, 1)), atom
+        elif op == "in":
+            self.error("the in operator is not supported", node)
+        elif op == "/":
+            self.uses_division = True
+        prec = PY_PRECEDENCE[op]
+        # Python chains comparisons, so nested ones need parentheses.
+        left_prec = prec + 1 if op in COMPARISONS else prec
+        return "{} {} {}".format(self.wrap(left, left_prec), op,
+                                 self.wrap(right, prec + 1)), prec
+
+    def expr_cond(self, node):
+        prec = PY_PRECEDENCE["if"]
+        return "{} if {} else {}".format(
+            self.wrap(node.consequent, prec + 1),
+            self.wrap(node.test, prec + 1),
+            self.wrap(node.alternate, prec)), prec
+
+    def expr_function(self, node):
+        body = node.body
+        if node.name is None and len(body) == 1 and \
+                body[0].type == "return" and body[0].value is not None:
+            outer = self.scope
+            global_names = self.push_scope(node, False)
+            try:
+                if global_names:
+                    self.error("functions that assign to globals must be "
+                               "defined as statements", node)
+                value = self.wrap(body[0].value, 0)
+            finally:
+                self.scope = outer
+            params = ", ".join(_py_name(p) for p in node.params)
+            return "lambda {}: {}".format(params, value).replace(
+                "lambda : ", "lambda: "), PY_PRECEDENCE["lambda"]
+        return self.hoist(node, node.name), PY_PRECEDENCE["atom"]
+
+    def expr_assign(self, node):
+        self.error("assignments inside expressions are not supported", node)
+
+    def expr_update(self, node):
+        self.error("{} inside expressions is not supported".format(node.op),
+                   node)
+
+    def expr_seq(self, node):
+        self.error("the comma operator is not supported here", node)
+
+
+def convert(source, filename=None):
+    """Convert a javascript program into python source.
+
+    If the program came from a file, its name goes in a header comment.
+    Constructors become classes, and calls to js globals cross the bridge:
+
+    >>> print convert('''
+    ... function Point(x, y) {
+    ...   this.x = x;
+    ...   this.y = y;
+    ... }
+    ... Point.prototype.norm = function() {
+    ...   return Math.sqrt(this.x * this.x + this.y * this.y);
+    ... };
+    ... var p = new Point(3, 4);
+    ... print(p.norm() | 0);
+    ... ''')
+    import js
+    <BLANKLINE>
+    Math = js.globals["Math"]
+    <BLANKLINE>
+    <BLANKLINE>
+    def _toint32(x):
+        x = int(x) & 0xFFFFFFFF
+        return x - 0x100000000 if x & 0x80000000 else x
+    <BLANKLINE>
+    <BLANKLINE>
+    class Point(object):
+    <BLANKLINE>
+        def __init__(self, x, y):
+            self.x = x
+            self.y = y
+    <BLANKLINE>
+    <BLANKLINE>
+    def Point_norm(self):
+        return float(Math.sqrt(self.x * self.x + self.y * self.y))
+    Point.norm = Point_norm
+    <BLANKLINE>
+    <BLANKLINE>
+    p = Point(3, 4)
+    print _toint32(p.norm())
+    <BLANKLINE>
+
+    Switches become chains of ifs, and do-while loops check their test at
+    the end of the loop and before each continue:
+
+    >>> print convert('''
+    ... var n = 0;
+    ... do {
+    ...   switch (n % 3) {
+    ...     case 0: case 1:
+    ...       n += 2;
+    ...       break;
+    ...     default:
+    ...       n++;
+    ...   }
+    ...   if (n > 5) continue;
+    ... } while (n < 10);
+    ... ''')
+    n = 0
+    while True:
+        _switch1 = n % 3
+        if _switch1 in (0, 1):
+            n += 2
+        else:
+            n += 1
+        if n > 5:
+            if not n < 10:
+                break
+            continue
+        if not n < 10:
+            break
+    <BLANKLINE>
+
+    Code that python can't run the same way is rejected:
+
+    >>> convert("function f(a) { return a[i++]; }")
+    Traceback (most recent call last):
+      ...
+    ConversionError: line 1: ++ inside expressions is not supported
+    """
+    tokens = tokenize(source)
+    program = Parser(tokens).parse_program()
+    converter = Converter(_find_classes(tokens), _find_methods(tokens))
+    lines = converter.convert(program)
+    if filename is not None:
+        lines = [
+            "# This file was generated from {} by _jsconvert.py.".format(
+                filename),
+            "# Edit the javascript version and run \"make bridge\" to "
+            "regenerate it.",
+            "",
+        ] + lines
+    while lines and not lines[-1]:
+        lines.pop()
+    output = u"\n".join(lines) + u"\n"
+    if any(ord(ch) > 127 for ch in output):
+        output = u"# -*- coding: utf-8 -*-\n" + output
+    return output.encode("utf-8")
+
+
+if __name__ == "__main__":
+    filename = None
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            source = f.read()
+        filename = os.path.basename(sys.argv[1])
+    else:
+        source = sys.stdin.read()
+    try:
+        sys.stdout.write(convert(source.decode("utf-8"), filename))
+    except ConversionError as e:
+        sys.stderr.write("{}\n".format(e))
+        sys.exit(1)
@@ -0,0 +1,60 @@
+// The pure javascript counterpart of buffers.py, which runs the same
+// kernels on data that is already in js typed arrays, so that each kernel
+// has a baseline with no transfer cost at all.
+
+var N = 262144;
+
+var MEGABYTE = 1024 * 1024;
+
+function dot(a, b) {
+  var total = 0;
+  for (var i = 0; i < a.length; i++) {
+    total += a[i] * b[i];
+  }
+  return total;
+}
+
+function histogram(data) {
+  var bins = new Uint32Array(256);
+  for (var i = 0; i < data.length; i++) {
+    bins[data[i]] += 1;
+  }
+  var checksum = 0;
+  for (var k = 0; k < 256; k++) {
+    checksum += bins[k] * k;
+  }
+  return checksum;
+}
+
+var a = new Float64Array(N);
+var b = new Float64Array(N);
+var data = new Uint8Array(N);
+for (var i = 0; i < N; i++) {
+  a[i] = Math.sin(i);
+  b[i] = Math.cos(i);
+  data[i] = (i * 7919) & 0xff;
+}
+
+var KERNELS = [
+  ["dot", function() { return dot(a, b); }, 2 * N * 8],
+  ["histogram", function() { return histogram(data); }, N]
+];
+
+for (var i = 0; i < 3; i++) {
+  var total = 0;
+  KERNELS.forEach(function(kernel) {
+    var t0 = awpyNow();
+    kernel[1]();
+    var elapsed = awpyNow() - t0;
+    total += elapsed;
+    print("@awpy " + JSON.stringify({
+      kernel: kernel[0],
+      method: "js",
+      bytes: kernel[2],
+      available: true,
+      time: elapsed,
+      mb_per_sec: elapsed > 0 ? kernel[2] / elapsed / MEGABYTE : null
+    }));
+  });
+  print(total);
+}
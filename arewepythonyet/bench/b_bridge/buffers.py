@@ -0,0 +1,181 @@
+# Measure the cost of handing large numeric buffers from python to javascript.
+#
+# Data in an array.array lives in the asm.js heap, and we time three ways
+# of getting it into a js typed array for processing by a js kernel:
+#
+#   * "element": storing each element into a typed array through a proxy.
+#   * "bulk": passing the whole buffer across as a single string, which
+#     js then unpacks into a typed array.
+#   * "view": a typed array aliasing the array's memory in the asm.js heap,
+#     so that nothing is copied at all.  This relies on the buffer address
+#     being an offset into the running VM's heap, which the driver gives
+#     us as awpyVM, so we check that writes from python show up in the
+#     view, and record whether the engine makes it available.
+#
+# The kernels are a dot product of two float64 arrays and a histogram of
+# a uint8 array.  An "@awpy" record gives the throughput of each method on
+# each kernel, and the total time of the fastest available method for each
+# kernel is printed as the result.  buffers.js times the same kernels on
+# data that is already in js typed arrays.
+
+import js
+import json
+import math
+import array
+
+awpyNow = js.globals["awpyNow"]
+
+helpers = js.eval("""(function() {
+  function findHeap() {
+    // Only the running VM's heap holds our arrays, and if the driver
+    // didn't tell us which VM that is, the view isn't available.
+    var vm = typeof awpyVM === "undefined" ? null : awpyVM;
+    if (!vm) {
+      return null;
+    }
+    var candidates = [vm._module, vm.Module, vm];
+    for (var i = 0; i < candidates.length; i++) {
+      var c = candidates[i];
+      if (c && c.HEAPU8 && c.HEAPU8.buffer) {
+        return c.HEAPU8.buffer;
+      }
+    }
+    return null;
+  }
+  var TYPES = {d: Float64Array, B: Uint8Array};
+  return {
+    newArray: function(typecode, n) {
+      return new TYPES[typecode](n);
+    },
+    fromBytes: function(typecode, s) {
+      var bytes = new Uint8Array(s.length);
+      for (var i = 0; i < s.length; i++) {
+        bytes[i] = s.charCodeAt(i);
+      }
+      return new TYPES[typecode](bytes.buffer);
+    },
+    heapView: function(typecode, address, n) {
+      var heap = findHeap();
+      var type = TYPES[typecode];
+      if (heap === null || address % type.BYTES_PER_ELEMENT) {
+        return null;
+      }
+      if (address + n * type.BYTES_PER_ELEMENT > heap.byteLength) {
+        return null;
+      }
+      return new type(heap, address, n);
+    },
+    dot: function(a, b) {
+      var total = 0;
+      for (var i = 0; i < a.length; i++) {
+        total += a[i] * b[i];
+      }
+      return total;
+    },
+    histogram: function(data) {
+      var bins = new Uint32Array(256);
+      for (var i = 0; i < data.length; i++) {
+        bins[data[i]] += 1;
+      }
+      var checksum = 0;
+      for (var k = 0; k < 256; k++) {
+        checksum += bins[k] * k;
+      }
+      return checksum;
+    }
+  };
+})()""")
+
+N = 262144
+
+MEGABYTE = 1024.0 * 1024.0
+
+
+def to_js_element(arr):
+    result = helpers.newArray(arr.typecode, len(arr))
+    for i in xrange(len(arr)):
+        result[i] = arr[i]
+    return result
+
+
+def to_js_bulk(arr):
+    # Latin-1 maps each byte to the character with that code, so the
+    # string arrives in js with one character per byte.
+    return helpers.fromBytes(arr.typecode, arr.tostring().decode("latin-1"))
+
+
+def to_js_view(arr):
+    address, length = arr.buffer_info()
+    view = helpers.heapView(arr.typecode, address, length)
+    if not view:
+        return None
+    # Make sure that the view really aliases the python array.
+    saved = arr[0]
+    arr[0] = 42
+    aliased = float(view[0]) == 42
+    arr[0] = saved
+    if not aliased:
+        return None
+    return view
+
+
+METHODS = [
+    ("element", to_js_element),
+    ("bulk", to_js_bulk),
+    ("view", to_js_view),
+]
+
+
+def run_dot(to_js, a, b):
+    js_a = to_js(a)
+    js_b = to_js(b)
+    if js_a is None or js_b is None:
+        return None
+    return float(helpers.dot(js_a, js_b))
+
+
+def run_histogram(to_js, data):
+    js_data = to_js(data)
+    if js_data is None:
+        return None
+    return int(helpers.histogram(js_data))
+
+
+a = array.array("d", (math.sin(i) for i in xrange(N)))
+b = array.array("d", (math.cos(i) for i in xrange(N)))
+data = array.array("B", ((i * 7919) & 0xff for i in xrange(N)))
+
+KERNELS = [
+    ("dot", lambda to_js: run_dot(to_js, a, b), 2 * N * 8),
+    ("histogram", lambda to_js: run_histogram(to_js, data), N),
+]
+
+
+for i in xrange(3):
+    total = 0.0
+    for kernel, run_kernel, nbytes in KERNELS:
+        expected = None
+        best = None
+        for method, to_js in METHODS:
+            t0 = float(awpyNow())
+            result = run_kernel(to_js)
+            elapsed = float(awpyNow()) - t0
+            record = {
+                "kernel": kernel,
+                "method": method,
+                "bytes": nbytes,
+                "available": result is not None,
+            }
+            if result is not None:
+                if expected is None:
+                    expected = result
+                elif abs(result - expected) > 1e-6 * max(1, abs(expected)):
+                    raise RuntimeError("%s gave wrong %s" % (method, kernel))
+                record["time"] = elapsed
+                if elapsed > 0:
+                    record["mb_per_sec"] = nbytes / elapsed / MEGABYTE
+                if best is None or elapsed < best:
+                    best = elapsed
+            print "@awpy " + json.dumps(record)
+        total += best
+    print total
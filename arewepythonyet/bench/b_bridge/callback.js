@@ -0,0 +1,109 @@
+// Driver for the callback benchmark, which calls a callback in a tight
+// loop and then from a chain of promise reactions, timing each batch of
+// calls.  The percentiles in each "@awpy" record are of the mean latency
+// of the calls in a batch, rather than of single calls, since a single
+// call is too quick to time reliably.
+//
+// callback.py loads this file to run the driver with a python callback.
+// Run on its own, it is the pure javascript counterpart of callback.py,
+// and runs the driver with a javascript callback instead.
+
+var runCallbacks = (function() {
+  var ITERATIONS = 3;
+  var CALLS = 10000;
+  var BATCH = 10;
+
+  function percentile(sorted, p) {
+    var i = Math.ceil(p / 100 * sorted.length) - 1;
+    return sorted[Math.max(0, Math.min(sorted.length - 1, i))];
+  }
+
+  function report(mode, latencies) {
+    var sorted = latencies.slice().sort(function(a, b) { return a - b; });
+    var total = 0;
+    for (var i = 0; i < sorted.length; i++) {
+      total += sorted[i];
+    }
+    print("@awpy " + JSON.stringify({
+      mode: mode,
+      calls: CALLS,
+      batch: BATCH,
+      mean: total / sorted.length,
+      p50: percentile(sorted, 50),
+      p90: percentile(sorted, 90),
+      p99: percentile(sorted, 99),
+      max: sorted[sorted.length - 1]
+    }));
+  }
+
+  // Call the callback in a tight loop, timing each batch of calls.
+  function timeLoop(callback) {
+    var latencies = [];
+    var x = 0;
+    for (var b = 0; b < CALLS / BATCH; b++) {
+      var t0 = awpyNow();
+      for (var i = 0; i < BATCH; i++) {
+        x = callback(x);
+      }
+      latencies.push((awpyNow() - t0) / BATCH);
+    }
+    report("loop", latencies);
+  }
+
+  // Call the callback from a chain of promise reactions, each of which
+  // runs as a separate microtask, timing each batch of calls.  The clock
+  // starts in the first reaction, so that building the chain isn't timed.
+  function timePromises(callback) {
+    var latencies = [];
+    var count = 0;
+    var t0 = null;
+    function step(x) {
+      if (t0 === null) {
+        t0 = awpyNow();
+      }
+      x = callback(x);
+      count += 1;
+      if (count % BATCH === 0) {
+        var t1 = awpyNow();
+        latencies.push((t1 - t0) / BATCH);
+        t0 = t1;
+      }
+      return x;
+    }
+    var p = Promise.resolve(0);
+    for (var i = 0; i < CALLS; i++) {
+      p = p.then(step);
+    }
+    return p.then(function() {
+      report("promise", latencies);
+    });
+  }
+
+  return function runCallbacks(callback) {
+    var i = 0;
+    function next() {
+      if (i >= ITERATIONS) {
+        return;
+      }
+      i += 1;
+      var t0 = awpyNow();
+      timeLoop(callback);
+      return timePromises(callback).then(function() {
+        print(awpyNow() - t0);
+        return next();
+      });
+    }
+    return Promise.resolve().then(next);
+  };
+})();
+
+// The runner for python benchmarks defines awpyPending, and callback.py
+// passes in its own callback.
+if (typeof awpyPending === "undefined") {
+  runCallbacks(function(x) {
+    return x;
+  }).catch(function(err) {
+    printErr(err);
+    throw err;
+  });
+}
@@ -0,0 +1,27 @@
+# Measure the latency of javascript calling back into python functions.
+#
+# Javascript event handlers and promise callbacks often call into python,
+# and each of these calls has to convert its arguments and result across
+# the bridge.  We pass a python function to a javascript driver that calls
+# it in a tight loop, and then from a chain of promise reactions where each
+# call runs as a separate microtask.  Each batch of calls is timed, and an
+# "@awpy" record gives the mean and percentiles of the per-call latency
+# over the batches for each mode.  The driver is loaded from callback.js,
+# which runs it with a javascript function instead, and prints the total
+# time of each iteration as the result.  Since the promise callbacks only
+# run after the python code has returned, the driver's promise is left for
+# the runner to wait on.
+
+import js
+
+# The driver is shared with callback.js, which only runs it itself when it
+# is not loaded from here.
+js.globals["load"](__file__[:-len(".py")] + ".js")
+runCallbacks = js.globals["runCallbacks"]
+
+
+def callback(x):
+    return x
+
+
+js.globals["awpyPending"].push(runCallbacks(callback))
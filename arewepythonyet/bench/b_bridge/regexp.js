@@ -1853,12 +1853,12 @@ function RegExpBenchmark() {
 RegExpSetup()
 
 for (var i = 0; i < 5; i++) {
-  var t1 = +Date.now();
+  var t1 = awpyNow();
   for (var j = 0; j < 10; j++) {
     RegExpRun()
   }
-  t2 = +Date.now();
-  print((t2 - t1) / 1000);
+  t2 = awpyNow();
+  print(t2 - t1);
 }
 
 RegExpTearDown()
@@ -9,10 +9,11 @@
 # the asm.js heap and into native javascript.
 
 import js
-import time
 import math
 import random
 
+awpyNow = js.globals["awpyNow"]
+
 _builtin_chr = chr
 def _int_math_floor(x):
     return int(math.floor(x))
@@ -1883,12 +1884,12 @@ def RegExpBenchmark():
 RegExpSetup()
 
 for i in xrange(0, 5):
-  t1 = +time.time() * 1000;
+  t1 = float(awpyNow());
   for j in xrange(0, 10):
     RegExpRun()
 
-  t2 = +time.time() * 1000;
-  print((t2 - t1) / 1000);
+  t2 = float(awpyNow());
+  print(t2 - t1);
 
 
 RegExpTearDown()
@@ -0,0 +1,106 @@
+// The pure javascript counterpart of strtransfer.py.  Rather than passing
+// strings into and out of a VM, we do the equivalent copies between js
+// strings and a typed array standing in for the asm.js heap, with one
+// function call per copy, so that each size has a baseline to compare to.
+
+var SIZES = [16, 256, 4096, 65536, 1048576, 16777216];
+var KINDS = ["str", "unicode"];
+
+var BYTES_PER_SIZE = 16777216;
+var MAX_CALLS = 1000;
+var CHUNK = 8192;
+
+var HEAPS = {
+  str: new Uint8Array(16777216),
+  unicode: new Uint16Array(16777216)
+};
+
+var strings = {};
+
+function makeString(size, kind) {
+  var key = kind + size;
+  if (!strings[key]) {
+    var ch = kind === "str" ? "x" : "\u00e9";
+    strings[key] = new Array(size + 1).join(ch);
+  }
+  return strings[key];
+}
+
+// The size in bytes of the string when encoded as utf-8, as for the
+// records of strtransfer.py.
+function numBytes(size, kind) {
+  return kind === "str" ? size : 2 * size;
+}
+
+function numCalls(size) {
+  return Math.max(1, Math.min(MAX_CALLS, Math.floor(BYTES_PER_SIZE / size)));
+}
+
+// Copy a string from the heap into a js string.
+function copyOut(heap, size) {
+  var parts = [];
+  for (var i = 0; i < size; i += CHUNK) {
+    var chunk = heap.subarray(i, Math.min(i + CHUNK, size));
+    parts.push(String.fromCharCode.apply(null, chunk));
+  }
+  return parts.join("");
+}
+
+// Copy a js string into the heap.
+function copyIn(heap, s) {
+  for (var i = 0; i < s.length; i++) {
+    heap[i] = s.charCodeAt(i);
+  }
+  return s.length;
+}
+
+function sink(s) {
+  return s.length;
+}
+
+function timePyToJs(size, kind, calls) {
+  var heap = HEAPS[kind];
+  copyIn(heap, makeString(size, kind));
+  var t0 = awpyNow();
+  for (var n = 0; n < calls; n++) {
+    sink(copyOut(heap, size));
+  }
+  return awpyNow() - t0;
+}
+
+function timeJsToPy(size, kind, calls) {
+  var heap = HEAPS[kind];
+  var s = makeString(size, kind);
+  var t0 = awpyNow();
+  for (var n = 0; n < calls; n++) {
+    copyIn(heap, s);
+  }
+  return awpyNow() - t0;
+}
+
+var DIRECTIONS = [
+  ["py_to_js", timePyToJs],
+  ["js_to_py", timeJsToPy]
+];
+
+for (var i = 0; i < 3; i++) {
+  var total = 0;
+  DIRECTIONS.forEach(function(d) {
+    KINDS.forEach(function(kind) {
+      SIZES.forEach(function(size) {
+        var calls = numCalls(size);
+        var elapsed = d[1](size, kind, calls);
+        total += elapsed;
+        print("@awpy " + JSON.stringify({
+          direction: d[0],
+          kind: kind,
+          size: size,
+          bytes: numBytes(size, kind),
+          calls: calls,
+          time: elapsed
+        }));
+      });
+    });
+  });
+  print(total);
+}
@@ -0,0 +1,111 @@
+# Measure the throughput of passing strings between python and javascript.
+#
+# Strings in the PyPy.js VM live in the asm.js heap, so each string passed
+# to a javascript function has to be copied out into a native js string,
+# and each js string returned to python has to be copied into the heap.
+# We time calls in both directions with strings of 16 up to 16M characters,
+# both as byte strings and as unicode strings with non-ascii characters,
+# so the small sizes give the fixed cost of a call and the large sizes
+# give the bandwidth of the copy.  An "@awpy" record is printed for each
+# direction, kind and size, and the total time for each iteration is
+# printed as the result.  strtransfer.js does the same copies in pure js.
+#
+# The size of each string is a count of characters.  Each record also gives
+# the size of the string in bytes when encoded as utf-8, which is how the
+# VM hands strings across, so that throughput is comparable between kinds.
+#
+# The largest unicode strings come close to the VM's default heap limit.
+# If a size runs out of memory its record is marked as "skipped" and
+# left out of the total, rather than losing the results at other sizes.
+
+import js
+import json
+
+awpyNow = js.globals["awpyNow"]
+
+SIZES = [16, 256, 4096, 65536, 1048576, 16777216]
+KINDS = ["str", "unicode"]
+
+# Enough calls at each size to copy this many bytes, within limits.
+BYTES_PER_SIZE = 16777216
+MAX_CALLS = 1000
+
+sink = js.eval("(function(s) { return s.length; })")
+source = js.eval("""(function() {
+  var cache = {};
+  return function(size, kind) {
+    var key = kind + size;
+    if (!cache[key]) {
+      var ch = kind === "str" ? "x" : "\\u00e9";
+      cache[key] = new Array(size + 1).join(ch);
+    }
+    return cache[key];
+  };
+})()""")
+
+CONVERT = {"str": str, "unicode": unicode}
+
+
+def make_string(size, kind):
+    if kind == "str":
+        return "x" * size
+    return u"\u00e9" * size
+
+
+def num_bytes(size, kind):
+    # "x" takes one byte in utf-8, and u"\u00e9" takes two.
+    if kind == "str":
+        return size
+    return 2 * size
+
+
+def num_calls(size):
+    return max(1, min(MAX_CALLS, BYTES_PER_SIZE // size))
+
+
+def time_py_to_js(size, kind, calls):
+    s = make_string(size, kind)
+    t0 = float(awpyNow())
+    for _ in xrange(calls):
+        sink(s)
+    return float(awpyNow()) - t0
+
+
+def time_js_to_py(size, kind, calls):
+    convert = CONVERT[kind]
+    # Make sure the js string is already built before timing.
+    source(size, kind)
+    t0 = float(awpyNow())
+    for _ in xrange(calls):
+        convert(source(size, kind))
+    return float(awpyNow()) - t0
+
+
+DIRECTIONS = [
+    ("py_to_js", time_py_to_js),
+    ("js_to_py", time_js_to_py),
+]
+
+
+for i in xrange(3):
+    total = 0.0
+    for direction, time_func in DIRECTIONS:
+        for kind in KINDS:
+            for size in SIZES:
+                record = {
+                    "direction": direction,
+                    "kind": kind,
+                    "size": size,
+                    "bytes": num_bytes(size, kind),
+                }
+                calls = num_calls(size)
+                try:
+                    elapsed = time_func(size, kind, calls)
+                except MemoryError:
+                    record["skipped"] = True
+                else:
+                    total += elapsed
+                    record["calls"] = calls
+                    record["time"] = elapsed
+                print "@awpy " + json.dumps(record)
+    print total
@@ -0,0 +1,106 @@
+// The pure javascript counterpart of structdata.py.  The "proxy" strategy
+// becomes a deep copy of each structure, element by element, and the
+// "json" strategy becomes a round trip through JSON.stringify and
+// JSON.parse, so that each shape and size has a baseline to compare to.
+
+var SIZES = [10, 100, 1000, 10000];
+
+var OBJECTS_PER_SIZE = 10000;
+
+function makeNumbers(n) {
+  var result = [];
+  for (var i = 0; i < n; i++) {
+    result.push(i * 0.5);
+  }
+  return result;
+}
+
+function makeStrings(n) {
+  var result = {};
+  for (var i = 0; i < n; i++) {
+    result["key" + i] = "value" + i;
+  }
+  return result;
+}
+
+function makeRecords(n) {
+  var result = [];
+  for (var i = 0; i < n; i++) {
+    result.push({
+      id: i,
+      name: "item" + i,
+      tags: ["red", "green", "blue"],
+      pos: {x: i * 0.5, y: i * -0.5}
+    });
+  }
+  return result;
+}
+
+var SHAPES = [
+  ["numbers", makeNumbers],
+  ["strings", makeStrings],
+  ["records", makeRecords]
+];
+
+function deepCopy(value) {
+  if (Array.isArray(value)) {
+    var arr = [];
+    for (var i = 0; i < value.length; i++) {
+      arr.push(deepCopy(value[i]));
+    }
+    return arr;
+  }
+  if (value !== null && typeof value === "object") {
+    var obj = {};
+    var keys = Object.keys(value);
+    for (var i = 0; i < keys.length; i++) {
+      obj[keys[i]] = deepCopy(value[keys[i]]);
+    }
+    return obj;
+  }
+  return value;
+}
+
+function roundTripProxy(data) {
+  return deepCopy(deepCopy(data));
+}
+
+function roundTripJson(data) {
+  return JSON.parse(JSON.stringify(JSON.parse(JSON.stringify(data))));
+}
+
+var STRATEGIES = [
+  ["proxy", roundTripProxy],
+  ["json", roundTripJson]
+];
+
+for (var i = 0; i < 3; i++) {
+  var total = 0;
+  SHAPES.forEach(function(shape) {
+    SIZES.forEach(function(size) {
+      var data = shape[1](size);
+      var rounds = Math.max(1, Math.floor(OBJECTS_PER_SIZE / size));
+      STRATEGIES.forEach(function(strategy) {
+        var result;
+        var t0 = awpyNow();
+        for (var n = 0; n < rounds; n++) {
+          result = strategy[1](data);
+        }
+        var elapsed = awpyNow() - t0;
+        if (JSON.stringify(result) !== JSON.stringify(data)) {
+          throw new Error(strategy[0] + " changed " + shape[0]);
+        }
+        total += elapsed;
+        print("@awpy " + JSON.stringify({
+          shape: shape[0],
+          strategy: strategy[0],
+          size: size,
+          rounds: rounds,
+          time: elapsed,
+          objects_per_sec: elapsed > 0 ? rounds * size / elapsed : null
+        }));
+      });
+    });
+  });
+  print(total);
+}
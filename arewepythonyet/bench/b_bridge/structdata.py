@@ -0,0 +1,132 @@
+# Measure the cost of moving structured data between python and javascript.
+#
+# We round-trip three shapes of data of increasing size through the js
+# module: lists of numbers, dicts of strings, and lists of nested records.
+# With the "proxy" strategy each value is converted element by element,
+# building js arrays and objects through proxies and reading them back
+# the same way.  With the "json" strategy the whole structure is passed
+# as a single string, through json.dumps and JSON.parse on the way out,
+# and JSON.stringify and json.loads on the way back.  An "@awpy" record
+# gives the objects per second for each shape, strategy and size, and the
+# total time for each iteration is printed as the result.  structdata.js
+# does the same round trips as deep copies in pure js.
+
+import js
+import json
+
+awpyNow = js.globals["awpyNow"]
+
+JSON = js.globals["JSON"]
+newArray = js.eval("(function() { return []; })")
+newObject = js.eval("(function() { return {}; })")
+objectKeys = js.globals["Object"].keys
+typeOf = js.eval("""(function(v) {
+  if (v === null) {
+    return "null";
+  }
+  return Array.isArray(v) ? "array" : typeof v;
+})""")
+
+SIZES = [10, 100, 1000, 10000]
+
+# Enough round trips at each size to move this many objects.
+OBJECTS_PER_SIZE = 10000
+
+
+def make_numbers(n):
+    return [i * 0.5 for i in xrange(n)]
+
+
+def make_strings(n):
+    return dict(("key%d" % i, "value%d" % i) for i in xrange(n))
+
+
+def make_records(n):
+    return [{
+        "id": i,
+        "name": "item%d" % i,
+        "tags": ["red", "green", "blue"],
+        "pos": {"x": i * 0.5, "y": i * -0.5},
+    } for i in xrange(n)]
+
+
+SHAPES = [
+    ("numbers", make_numbers),
+    ("strings", make_strings),
+    ("records", make_records),
+]
+
+
+def to_js(value):
+    if isinstance(value, list):
+        arr = newArray()
+        for item in value:
+            arr.push(to_js(item))
+        return arr
+    if isinstance(value, dict):
+        obj = newObject()
+        for key, item in value.iteritems():
+            obj[key] = to_js(item)
+        return obj
+    return value
+
+
+def from_js(value):
+    kind = str(typeOf(value))
+    if kind == "array":
+        return [from_js(value[i]) for i in xrange(int(value.length))]
+    if kind == "object":
+        keys = objectKeys(value)
+        result = {}
+        for i in xrange(int(keys.length)):
+            key = str(keys[i])
+            result[key] = from_js(value[key])
+        return result
+    if kind == "number":
+        return float(value)
+    if kind == "string":
+        return str(value)
+    if kind == "boolean":
+        return bool(value)
+    return None
+
+
+def round_trip_proxy(data):
+    return from_js(to_js(data))
+
+
+def round_trip_json(data):
+    return json.loads(str(JSON.stringify(JSON.parse(json.dumps(data)))))
+
+
+STRATEGIES = [
+    ("proxy", round_trip_proxy),
+    ("json", round_trip_json),
+]
+
+
+for i in xrange(3):
+    total = 0.0
+    for shape, make_data in SHAPES:
+        for size in SIZES:
+            data = make_data(size)
+            rounds = max(1, OBJECTS_PER_SIZE // size)
+            for strategy, round_trip in STRATEGIES:
+                t0 = float(awpyNow())
+                for _ in xrange(rounds):
+                    result = round_trip(data)
+                elapsed = float(awpyNow()) - t0
+                if result != data:
+                    raise RuntimeError("%s changed %s" % (strategy, shape))
+                total += elapsed
+                print "@awpy " + json.dumps({
+                    "shape": shape,
+                    "strategy": strategy,
+                    "size": size,
+                    "rounds": rounds,
+                    "time": elapsed,
+                    "objects_per_sec": (
+                        rounds * size / elapsed if elapsed > 0 else None
+                    ),
+                })
+    print total
@@ -8,8 +8,8 @@ function sum_log(iterations) {
 }
 
 for (var i = 0; i < 3; i++) {
-  t1 = +Date.now()
+  t1 = awpyNow()
   sum_log(1000000)
-  t2 = +Date.now()
-  print((t2 - t1) / 1000)
+  t2 = awpyNow()
+  print(t2 - t1)
 }
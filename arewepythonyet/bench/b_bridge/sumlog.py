@@ -1,8 +1,11 @@
+# This file was generated from sumlog.js by _jsconvert.py.
+# Edit the javascript version and run "make bridge" to regenerate it.
 
 import js
-import time
 
 Math = js.globals["Math"]
+awpyNow = js.globals["awpyNow"]
+
 
 def sum_log(iterations):
     total = 0
@@ -13,9 +16,10 @@ def sum_log(iterations):
     return total
 
 
-for i in xrange(3):
-    t1 = time.time()
+i = 0
+while i < 3:
+    t1 = float(awpyNow())
     sum_log(1000000)
-    t2 = time.time()
+    t2 = float(awpyNow())
     print t2 - t1
-
+    i += 1
@@ -0,0 +1,27 @@
+# Microbenchmark: reading an instance attribute.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+class Obj(object):
+
+    def __init__(self):
+        self.x = 1
+
+
+def bench(loops):
+    o = Obj()
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += o.x
+            total += o.x
+            total += o.x
+            total += o.x
+            total += o.x
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
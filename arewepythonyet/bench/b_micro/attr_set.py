@@ -0,0 +1,26 @@
+# Microbenchmark: writing an instance attribute.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+class Obj(object):
+
+    def __init__(self):
+        self.x = 0
+
+
+def bench(loops):
+    o = Obj()
+    for _ in xrange(loops):
+        for i in xrange(200):
+            o.x = i
+            o.x = i
+            o.x = i
+            o.x = i
+            o.x = i
+    return o.x
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
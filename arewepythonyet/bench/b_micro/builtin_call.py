@@ -0,0 +1,21 @@
+# Microbenchmark: calling a builtin function.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    items = [1, 2, 3]
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += len(items)
+            total += len(items)
+            total += len(items)
+            total += len(items)
+            total += len(items)
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,27 @@
+# Microbenchmark: calling a closure that reads a variable from its enclosing scope.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def make_closure(x):
+    def closure(y):
+        return x + y
+    return closure
+
+
+def bench(loops):
+    closure = make_closure(1)
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += closure(i)
+            total += closure(i)
+            total += closure(i)
+            total += closure(i)
+            total += closure(i)
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
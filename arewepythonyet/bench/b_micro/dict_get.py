@@ -0,0 +1,21 @@
+# Microbenchmark: looking up a string key in a dict.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    d = dict(("key%d" % i, i) for i in xrange(100))
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += d["key42"]
+            total += d["key42"]
+            total += d["key42"]
+            total += d["key42"]
+            total += d["key42"]
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,17 @@
+# Microbenchmark: iterating over the items of a dict.
+# Each loop of the benchmark iterates over 1000 items.
+
+import awpy_harness
+
+
+def bench(loops):
+    d = dict((i, i) for i in xrange(1000))
+    total = 0
+    for _ in xrange(loops):
+        for key, value in d.iteritems():
+            total += value
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,20 @@
+# Microbenchmark: storing an int key in a dict.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    d = {}
+    for _ in xrange(loops):
+        for i in xrange(200):
+            d[i + 0] = i
+            d[i + 200] = i
+            d[i + 400] = i
+            d[i + 600] = i
+            d[i + 800] = i
+    return len(d)
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,35 @@
+# Microbenchmark: raising and catching an exception.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            try:
+                raise ValueError(i)
+            except ValueError:
+                total += 1
+            try:
+                raise ValueError(i)
+            except ValueError:
+                total += 1
+            try:
+                raise ValueError(i)
+            except ValueError:
+                total += 1
+            try:
+                raise ValueError(i)
+            except ValueError:
+                total += 1
+            try:
+                raise ValueError(i)
+            except ValueError:
+                total += 1
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
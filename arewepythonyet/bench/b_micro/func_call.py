@@ -0,0 +1,24 @@
+# Microbenchmark: calling a plain function with positional arguments.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def func(a, b):
+    return a
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += func(i, 1)
+            total += func(i, 1)
+            total += func(i, 1)
+            total += func(i, 1)
+            total += func(i, 1)
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,24 @@
+# Microbenchmark: calling a function with keyword arguments.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def func(a, b=0, c=0):
+    return a
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += func(i, c=2, b=1)
+            total += func(i, c=2, b=1)
+            total += func(i, c=2, b=1)
+            total += func(i, c=2, b=1)
+            total += func(i, c=2, b=1)
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,23 @@
+# Microbenchmark: resuming a generator.
+# Each loop of the benchmark resumes the generator 1000 times.
+
+import awpy_harness
+
+
+def counter(n):
+    i = 0
+    while i < n:
+        yield i
+        i += 1
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in counter(1000):
+            total += i
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
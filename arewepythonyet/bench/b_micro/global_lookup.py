@@ -0,0 +1,23 @@
+# Microbenchmark: reading a module global.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+GLOBAL = 1
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += GLOBAL
+            total += GLOBAL
+            total += GLOBAL
+            total += GLOBAL
+            total += GLOBAL
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
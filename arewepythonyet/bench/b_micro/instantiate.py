@@ -0,0 +1,26 @@
+# Microbenchmark: creating an instance of a class with __init__.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+class Obj(object):
+
+    def __init__(self, x):
+        self.x = x
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += Obj(i).x
+            total += Obj(i).x
+            total += Obj(i).x
+            total += Obj(i).x
+            total += Obj(i).x
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
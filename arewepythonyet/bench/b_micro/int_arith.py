@@ -0,0 +1,20 @@
+# Microbenchmark: integer arithmetic.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total = (total + i * 3) & 0xffff
+            total = (total + i * 3) & 0xffff
+            total = (total + i * 3) & 0xffff
+            total = (total + i * 3) & 0xffff
+            total = (total + i * 3) & 0xffff
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
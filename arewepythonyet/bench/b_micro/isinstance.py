@@ -0,0 +1,29 @@
+# Microbenchmark: checking the type of an object with isinstance.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+class Base(object):
+    pass
+
+
+class Derived(Base):
+    pass
+
+
+def bench(loops):
+    o = Derived()
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += isinstance(o, Base)
+            total += isinstance(o, Base)
+            total += isinstance(o, Base)
+            total += isinstance(o, Base)
+            total += isinstance(o, Base)
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
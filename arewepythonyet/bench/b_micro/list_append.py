@@ -0,0 +1,20 @@
+# Microbenchmark: appending to a list.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    for _ in xrange(loops):
+        items = []
+        for i in xrange(200):
+            items.append(i)
+            items.append(i)
+            items.append(i)
+            items.append(i)
+            items.append(i)
+    return len(items)
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
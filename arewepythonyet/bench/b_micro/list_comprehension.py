@@ -0,0 +1,20 @@
+# Microbenchmark: building a list with a list comprehension.
+# Each loop of the benchmark builds 5 lists of 200 items.
+
+import awpy_harness
+
+
+def bench(loops):
+    items = range(200)
+    total = 0
+    for _ in xrange(loops):
+        total += len([x + 1 for x in items])
+        total += len([x + 1 for x in items])
+        total += len([x + 1 for x in items])
+        total += len([x + 1 for x in items])
+        total += len([x + 1 for x in items])
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
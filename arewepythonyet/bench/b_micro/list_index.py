@@ -0,0 +1,21 @@
+# Microbenchmark: indexing into a list.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    items = range(10)
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += items[5]
+            total += items[5]
+            total += items[5]
+            total += items[5]
+            total += items[5]
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
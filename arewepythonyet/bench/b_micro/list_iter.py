@@ -0,0 +1,17 @@
+# Microbenchmark: iterating over a list.
+# Each loop of the benchmark iterates over 1000 items.
+
+import awpy_harness
+
+
+def bench(loops):
+    items = range(1000)
+    total = 0
+    for _ in xrange(loops):
+        for item in items:
+            total += item
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
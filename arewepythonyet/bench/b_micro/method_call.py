@@ -0,0 +1,27 @@
+# Microbenchmark: calling a method on an instance.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+class Obj(object):
+
+    def method(self, x):
+        return x
+
+
+def bench(loops):
+    o = Obj()
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += o.method(i)
+            total += o.method(i)
+            total += o.method(i)
+            total += o.method(i)
+            total += o.method(i)
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,21 @@
+# Microbenchmark: slicing a list.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    items = range(20)
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += len(items[2:12])
+            total += len(items[2:12])
+            total += len(items[2:12])
+            total += len(items[2:12])
+            total += len(items[2:12])
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
@@ -0,0 +1,22 @@
+# Microbenchmark: building a string by repeated concatenation.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        s = ""
+        for i in xrange(200):
+            s += "x"
+            s += "x"
+            s += "x"
+            s += "x"
+            s += "x"
+        total += len(s)
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
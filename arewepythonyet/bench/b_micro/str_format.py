@@ -0,0 +1,20 @@
+# Microbenchmark: formatting a string with the % operator.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += len("%d: %s" % (i, "x"))
+            total += len("%d: %s" % (i, "x"))
+            total += len("%d: %s" % (i, "x"))
+            total += len("%d: %s" % (i, "x"))
+            total += len("%d: %s" % (i, "x"))
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
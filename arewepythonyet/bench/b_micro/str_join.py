@@ -0,0 +1,21 @@
+# Microbenchmark: joining a list of strings.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    parts = ["x"] * 10
+    total = 0
+    for _ in xrange(loops):
+        for i in xrange(200):
+            total += len("".join(parts))
+            total += len("".join(parts))
+            total += len("".join(parts))
+            total += len("".join(parts))
+            total += len("".join(parts))
+    return total
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
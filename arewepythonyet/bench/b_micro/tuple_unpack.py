@@ -0,0 +1,21 @@
+# Microbenchmark: packing and unpacking a tuple.
+# Each loop of the benchmark does this 1000 times, 5 at a time.
+
+import awpy_harness
+
+
+def bench(loops):
+    a = 1
+    b = 2
+    for _ in xrange(loops):
+        for i in xrange(200):
+            a, b = b, a
+            a, b = b, a
+            a, b = b, a
+            a, b = b, a
+            a, b = b, a
+    return a + b
+
+
+if __name__ == "__main__":
+    awpy_harness.run(bench, samples=20)
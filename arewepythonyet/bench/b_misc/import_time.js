@@ -0,0 +1,81 @@
+// Measure the time taken to import each of a list of stdlib modules,
+// split into fetching the module data (the source of the module and of
+// the modules that it imports) into the VM's filesystem, and executing
+// the import.  An "@awpy" record is printed for each module giving both
+// times and the bytes of module source that it pulled in, followed by the
+// total time spent executing the imports.  The total leaves out the fetch
+// times, so that it measures the same thing as on the native engines.  The modules are imported in order in
+// the same VM, so each one is only charged for modules that weren't
+// already imported by an earlier one, and a module that the VM imported
+// before we got to it is marked as "preloaded".  Native engines run
+// import_time.py, which imports the same modules.
+
+var MODULES = ["re", "collections", "json", "datetime", "random",
+               "decimal", "textwrap", "fractions"];
+
+// Python helper that imports a module and prints its record, given
+// the time that was spent fetching its data.
+var HELPER = [
+  "import sys",
+  "import os",
+  "import js",
+  "_awpy_now = js.globals['awpyNow']",
+  "_awpy_total = [0.0]",
+  "def _awpy_source_bytes(names):",
+  "    total = 0",
+  "    for name in names:",
+  "        path = getattr(sys.modules[name], '__file__', None)",
+  "        if not path:",
+  "            continue",
+  "        if path.endswith(('.pyc', '.pyo')):",
+  "            path = path[:-1]",
+  "        if not path.endswith('.py'):",
+  "            continue",
+  "        try:",
+  "            total += os.path.getsize(path)",
+  "        except OSError:",
+  "            pass",
+  "    return total",
+  "def _awpy_import(name, fetch):",
+  "    preloaded = 'true' if name in sys.modules else 'false'",
+  "    before = set(sys.modules)",
+  "    t0 = float(_awpy_now())",
+  "    __import__(name)",
+  "    elapsed = float(_awpy_now()) - t0",
+  "    size = _awpy_source_bytes(set(sys.modules) - before)",
+  "    _awpy_total[0] += elapsed",
+  "    print '@awpy {\"module\": \"%s\", \"fetch\": %r, \"exec\": %r, " +
+      "\"bytes\": %d, \"preloaded\": %s}' % " +
+      "(name, fetch, elapsed, size, preloaded)",
+].join("\n");
+
+function importAll(vm) {
+  var i = 0;
+  function next() {
+    if (i >= MODULES.length) {
+      return vm.exec("print _awpy_total[0]");
+    }
+    var name = MODULES[i];
+    i += 1;
+    var t0 = awpyNow();
+    return vm.loadModuleData(name).then(function() {
+      var fetch = awpyNow() - t0;
+      return vm.exec("_awpy_import(" + JSON.stringify(name) + ", " +
+                     fetch + ")");
+    }).then(next);
+  }
+  return next();
+}
+
+load("{{pypyjs_lib}}")
+pypyjs.ready().then(function() {
+  // The helper's own imports are loaded before anything is measured.
+  return pypyjs.loadModuleData("os");
+}).then(function() {
+  return pypyjs.exec(HELPER);
+}).then(function() {
+  return importAll(pypyjs);
+}).catch(function(err) {
+  printErr(err);
+  throw err;
+});
@@ -0,0 +1,59 @@
+# Measure the time taken to import each of a list of stdlib modules on the
+# native engines; see import_time.js for the version run in pypy.js, which
+# also splits out the time taken to fetch the module data.  An "@awpy"
+# record is printed for each module giving the time taken and the bytes of
+# module source that it pulled in, followed by the total time.  We format
+# the records by hand, since importing json would skew the results.
+#
+# CPython's site module imports several modules at startup (including re),
+# so we re-run ourselves with -S to make the imports as cold as they are in
+# pypy.js.  Any module that was imported before we got to it is still
+# marked as "preloaded" in its record, since it was not really timed.
+
+import sys
+import os
+import time
+
+MODULES = ["re", "collections", "json", "datetime", "random",
+           "decimal", "textwrap", "fractions"]
+
+
+def source_bytes(names):
+    total = 0
+    for name in names:
+        path = getattr(sys.modules[name], "__file__", None)
+        if not path:
+            continue
+        if path.endswith((".pyc", ".pyo")):
+            path = path[:-1]
+        if not path.endswith(".py"):
+            continue
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+
+def import_all():
+    total = 0.0
+    for name in MODULES:
+        preloaded = name in sys.modules
+        before = set(sys.modules)
+        t0 = time.time()
+        __import__(name)
+        elapsed = time.time() - t0
+        size = source_bytes(set(sys.modules) - before)
+        total += elapsed
+        print ('@awpy {"module": "%s", "exec": %r, "bytes": %d, '
+               '"preloaded": %s}') % (
+            name, elapsed, size, "true" if preloaded else "false"
+        )
+    return total
+
+
+if __name__ == "__main__":
+    if not sys.flags.no_site:
+        args = [sys.executable, "-S", os.path.abspath(__file__)]
+        os.execv(sys.executable, args + sys.argv[1:])
+    print import_all()
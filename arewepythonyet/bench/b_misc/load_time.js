@@ -1,8 +1,109 @@
-var tStart = +new Date();
-load("{{pypyjs_lib}}")
-pypyjs.ready().then(function() {
-  var tFinish = +new Date();
-  print((tFinish - tStart) / 1000);
-}, function(err) {
+// Measure the time taken to start up the interpreter, broken down into
+// phases.  We can't hook into pypyjs.js itself, so instead we wrap the
+// shell functions that it uses to load its files, and attribute the time
+// spent in each call to a phase according to the file being loaded.
+// Each phase is printed as an "@awpy" record, followed by the total time
+// until the interpreter is ready.  For "hot" startup the interpreter is
+// loaded once without being measured, and then loaded again.
+
+var startup = "{{startup}}";
+
+var phases = {};
+var phaseFiles = {};
+var nestedTimes = [];
+
+function addPhase(name, duration) {
+  phases[name] = (phases[name] || 0) + duration;
+}
+
+function phaseFor(filename) {
+  filename = String(filename);
+  if (/\.z?mem$/.test(filename)) {
+    return "mem_fetch";
+  }
+  if (/pypyjs\.vm\.js$/.test(filename)) {
+    return "vm_load";
+  }
+  if (/pypyjs\.js$/.test(filename)) {
+    return "lib_load";
+  }
+  return null;
+}
+
+function wrap(obj, name) {
+  var orig = obj[name];
+  if (typeof orig !== "function") {
+    return;
+  }
+  obj[name] = function(filename) {
+    var phase = phaseFor(filename);
+    if (phase === null) {
+      return orig.apply(this, arguments);
+    }
+    phaseFiles[phase] = String(filename).replace(/^.*\//, "");
+    // Time spent in nested calls is attributed to their own phase.
+    nestedTimes.push(0);
+    var t0 = awpyNow();
+    try {
+      return orig.apply(this, arguments);
+    } finally {
+      var elapsed = awpyNow() - t0;
+      addPhase(phase, elapsed - nestedTimes.pop());
+      if (nestedTimes.length) {
+        nestedTimes[nestedTimes.length - 1] += elapsed;
+      }
+    }
+  };
+}
+
+var shellGlobal = this;
+["load", "read", "readbuffer", "readbinary", "snarf"].forEach(function(name) {
+  wrap(shellGlobal, name);
+});
+if (typeof os !== "undefined" && os.file) {
+  wrap(os.file, "readFile");
+}
+
+function measure() {
+  phases = {};
+  phaseFiles = {};
+  var tStart = awpyNow();
+  load("{{pypyjs_lib}}")
+  return pypyjs.ready().then(function() {
+    return report(awpyNow() - tStart);
+  });
+}
+
+function report(total) {
+  // Whatever isn't accounted for by loading files is heap setup,
+  // decompressing the memory initializer, etc.
+  var accounted = 0;
+  for (var name in phases) {
+    accounted += phases[name];
+  }
+  addPhase("init", total - accounted);
+  var tExec = awpyNow();
+  return pypyjs.exec("pass").then(function() {
+    addPhase("first_exec", awpyNow() - tExec);
+    for (var name in phases) {
+      var record = {phase: name, time: phases[name]};
+      if (phaseFiles[name]) {
+        record.file = phaseFiles[name];
+      }
+      print("@awpy " + JSON.stringify(record));
+    }
+    print(total);
+  });
+}
+
+var started;
+if (startup === "hot") {
+  load("{{pypyjs_lib}}")
+  started = pypyjs.ready().then(measure);
+} else {
+  started = measure();
+}
+started.catch(function(err) {
+  printErr(err);
   throw err;
 });
@@ -0,0 +1,91 @@
+// Measure the cost of creating several VMs in the same shell process.
+// The first VM pays for compiling pypyjs.vm.js, while later ones should
+// only pay for setting up a new heap.  We first create NUM_VMS VMs one
+// after another, dropping each before creating the next, and print the
+// time taken by each as the results.  We then create NUM_VMS more while
+// keeping them all alive at the same time.  An "@awpy" record is printed
+// for every VM giving its latency and the memory that it added, which is
+// mostly the typed array holding its asm.js heap, plus whatever growth we
+// can see in the shell's garbage-collected heap.  The harness also records
+// the peak RSS of the shell as a whole.
+
+var NUM_VMS = 5;
+
+// The size of the shell's garbage-collected heap in bytes, or null if we
+// can't tell, as on d8.  This doesn't include the memory backing each
+// VM's typed array heap, which we count separately.
+function heapSize() {
+  if (typeof gc === "function") {
+    gc();
+  }
+  if (typeof process !== "undefined" && process.memoryUsage) {
+    var usage = process.memoryUsage();
+    return usage.heapUsed;
+  }
+  if (typeof gcparam === "function") {
+    return gcparam("gcBytes");
+  }
+  return null;
+}
+
+// The size in bytes of the typed array holding a VM's asm.js heap.
+function vmHeapSize(vm) {
+  var candidates = [vm._module, vm.Module, vm];
+  for (var i = 0; i < candidates.length; i++) {
+    var c = candidates[i];
+    if (c && c.HEAPU8 && c.HEAPU8.buffer) {
+      return c.HEAPU8.buffer.byteLength;
+    }
+  }
+  return null;
+}
+
+function createVMs(mode, keepAlive) {
+  var alive = [];
+  var times = [];
+  var i = 0;
+  function next() {
+    if (i >= NUM_VMS) {
+      return times;
+    }
+    var heapBefore = heapSize();
+    var t0 = awpyNow();
+    var vm = new pypyjs();
+    return vm.ready().then(function() {
+      var elapsed = awpyNow() - t0;
+      var vmHeap = vmHeapSize(vm);
+      if (keepAlive) {
+        alive.push(vm);
+      }
+      vm = null;
+      var heapAfter = heapSize();
+      var record = {
+        mode: mode,
+        vm: i,
+        time: elapsed,
+        vm_heap: vmHeap,
+        heap_growth: vmHeap
+      };
+      if (heapBefore !== null && heapAfter !== null) {
+        record.heap_growth = (vmHeap || 0) + heapAfter - heapBefore;
+      }
+      print("@awpy " + JSON.stringify(record));
+      times.push(elapsed);
+      i += 1;
+      return next();
+    });
+  }
+  return next();
+}
+
+load("{{pypyjs_lib}}")
+createVMs("sequential", false).then(function(times) {
+  return createVMs("alive", true).then(function() {
+    for (var i = 0; i < times.length; i++) {
+      print(times[i]);
+    }
+  });
+}).catch(function(err) {
+  printErr(err);
+  throw err;
+});
@@ -15,7 +15,7 @@ import random
 import math
 random.seed(1234)
 import sys
-import time
+import awpy_harness
 
 class GVector(object):
     def __init__(self, x = 0, y = 0, z = 0):
@@ -217,15 +217,18 @@ class Chaosgame(object):
         if point.y < self.miny:
             point.y = self.miny
 
-    def create_image_chaos(self, w, h, name, n):
-        im = [[1] * h for i in range(w)]
-        point = GVector((self.maxx + self.minx) / 2,
-                        (self.maxy + self.miny) / 2, 0)
-        colored = 0
-        times = []
-        for _ in range(n):
-            t1 = time.time()
-            for i in xrange(5000):
+    def create_image_chaos(self, w, h):
+        self.im = [[1] * h for i in range(w)]
+        self.point = GVector((self.maxx + self.minx) / 2,
+                             (self.maxy + self.miny) / 2, 0)
+
+    def iterate_image_chaos(self, loops, points):
+        im = self.im
+        point = self.point
+        w = len(im)
+        h = len(im[0])
+        for _ in xrange(loops):
+            for i in xrange(points):
                 point = self.transform_point(point)
                 x = (point.x - self.minx) / self.width * w
                 y = (point.y - self.miny) / self.height * h
@@ -236,13 +239,14 @@ class Chaosgame(object):
                 if y == h:
                     y -= 1
                 im[x][h - y - 1] = 0
-            t2 = time.time()
-            times.append(t2 - t1)
-        save_im(im, name)
-        return times
+        self.point = point
 
 
-def main(n):
+DEFAULT_POINTS = 5000
+SWEEP_POINTS = (1250, 2500, 5000, 10000, 20000)
+
+
+def main():
     splines = [
         Spline([
             GVector(1.597350, 3.304460, 0.000000),
@@ -267,9 +271,11 @@ def main(n):
             3, [0, 0, 0, 1, 1, 1])
         ]
     c = Chaosgame(splines, 0.25)
-    return c.create_image_chaos(1000, 1200, "py.ppm", n)
+    c.create_image_chaos(1000, 1200)
+    awpy_harness.run(c.iterate_image_chaos, samples=20,
+                     size=DEFAULT_POINTS, sweep=SWEEP_POINTS)
+    save_im(c.im, "py.ppm")
 
 
 if __name__ == "__main__":
-    for result in main(20):
-        print result
+    main()
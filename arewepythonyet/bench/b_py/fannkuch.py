@@ -10,7 +10,7 @@
 # contributed by Sokolov Yura
 # modified by Tupteq
 
-import time
+import awpy_harness
 
 def fannkuch(n):
     count = range(1, n+1)
@@ -54,16 +54,11 @@ def fannkuch(n):
             return max_flips
 
 DEFAULT_ARG = 9
+SWEEP_ARGS = (5, 6, 7, 8, 9)
 
-def main(n):
-    times = []
-    for i in range(n):
-        t0 = time.time()
-        fannkuch(DEFAULT_ARG)
-        tk = time.time()
-        times.append(tk - t0)
-    return times
+def bench(loops, n):
+    for i in xrange(loops):
+        fannkuch(n)
     
 if __name__ == "__main__":
-    for result in main(20):
-        print result
+    awpy_harness.run(bench, samples=20, size=DEFAULT_ARG, sweep=SWEEP_ARGS)
@@ -9,7 +9,7 @@ from math import sin
 from math import cos
 from math import sqrt
 import optparse
-import time
+import awpy_harness
 
 class Point(object):
 
@@ -52,18 +52,11 @@ def benchmark(n):
     return maximize(points)
 
 POINTS = 100000
+SWEEP_POINTS = (25000, 50000, 100000, 200000, 400000)
 
-def main(arg):
-    # XXX warmup
-    
-    times = []
-    for i in xrange(arg):
-        t0 = time.time()
-        o = benchmark(POINTS)
-        tk = time.time()
-        times.append(tk - t0)
-    return times
+def bench(loops, points):
+    for i in xrange(loops):
+        o = benchmark(points)
     
 if __name__ == "__main__":
-    for result in main(20):
-        print result
+    awpy_harness.run(bench, samples=20, size=POINTS, sweep=SWEEP_POINTS)
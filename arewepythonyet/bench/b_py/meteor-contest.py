@@ -9,7 +9,7 @@
 #
 # contributed by Daniel Nanz, 2008-08-21
 
-import time
+import awpy_harness
 from bisect import bisect
 
 w, h = 5, 10
@@ -136,23 +136,18 @@ def solve(n, i_min, free, curr_board, pieces_left, solutions,
     return
 
 SOLVE_ARG = 60
+SWEEP_ARGS = (15, 30, 60, 120, 240)
 
-def main(n):
-    times = []
-    for i in range(n):
-        t0 = time.time()
+def bench(loops, n):
+    for i in xrange(loops):
         free = frozenset(xrange(len(board)))
         curr_board = [-1] * len(board)
         pieces_left = range(len(pieces))
         solutions = []
-        solve(SOLVE_ARG, 0, free, curr_board, pieces_left, solutions)
+        solve(n, 0, free, curr_board, pieces_left, solutions)
         #print len(solutions),  'solutions found\n'
         #for i in (0, -1): print_board(solutions[i])
-        tk = time.time()
-        times.append(tk - t0)
-    return times
     
 if __name__ == "__main__":
-    for result in main(20):
-        print result
+    awpy_harness.run(bench, samples=20, size=SOLVE_ARG, sweep=SWEEP_ARGS)
 
@@ -9,7 +9,7 @@
 # contributed by Kevin Carson
 # modified by Tupteq, Fredrik Johansson, and Daniel Nanz
 
-import time
+import awpy_harness
 
 def combinations(l):
     result = []
@@ -109,21 +109,15 @@ def offset_momentum(ref, bodies=SYSTEM, px=0.0, py=0.0, pz=0.0):
     v[2] = pz / m
 
 NUMBER_OF_ITERATIONS = 20000
+SWEEP_ITERATIONS = (5000, 10000, 20000, 40000, 80000)
 
-def main(n, ref='sun'):
-    # XXX warmup
-    
-    times = []
-    for i in range(n):
-        t0 = time.time()
+def bench(loops, iterations, ref='sun'):
+    for i in xrange(loops):
         offset_momentum(BODIES[ref])
         report_energy()
-        advance(0.01, NUMBER_OF_ITERATIONS)
+        advance(0.01, iterations)
         report_energy()
-        tk = time.time()
-        times.append(tk - t0)
-    return times
 
 if __name__ == "__main__":
-    for result in main(20):
-        print result
+    awpy_harness.run(bench, samples=20, size=NUMBER_OF_ITERATIONS,
+                     sweep=SWEEP_ITERATIONS)
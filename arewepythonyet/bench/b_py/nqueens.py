@@ -6,7 +6,7 @@ __author__ = "collinwinter@google.com (Collin Winter)"
 
 import re
 import string
-import time
+import awpy_harness
 
 
 # Pure-Python implementation of itertools.permutations().
@@ -54,20 +54,15 @@ def n_queens(queen_count):
             yield vec
 
 
-def test_n_queens(iterations):
-    # Warm-up runs.
-    list(n_queens(8))
-    list(n_queens(8))
+DEFAULT_QUEENS = 8
+SWEEP_QUEENS = (5, 6, 7, 8, 9)
 
-    times = []
-    for _ in xrange(iterations):
-        t0 = time.time()
-        list(n_queens(8))
-        t1 = time.time()
-        times.append(t1 - t0)
-    return times
+
+def bench_n_queens(loops, queen_count):
+    for _ in xrange(loops):
+        list(n_queens(queen_count))
 
 
 if __name__ == "__main__":
-    for result in test_n_queens(20):
-        print result
+    awpy_harness.run(bench_n_queens, samples=20, warmups=2,
+                     size=DEFAULT_QUEENS, sweep=SWEEP_QUEENS)
@@ -346,6 +346,7 @@ class WorkTask(Task):
         return self.qpkt(pkt)
 
 import time
+import awpy_harness
 
 
 
@@ -418,20 +419,10 @@ def main(entry_point = entry_point, iterations = 10):
     print "Average time per iteration: %.2f ms" %(total_s*1000/iterations)
     return 42
 
-def test_richards(iterations):
-    # Warm-up
+def bench_richards(loops):
     r = Richards()
-    r.run(iterations=2)
-
-    times = []
-    for _ in xrange(iterations):
-        t0 = time.time()
-        r.run(iterations=1)
-        t1 = time.time()
-        times.append(t1 - t0)
-    return times
+    r.run(iterations=loops)
 
 
 if __name__ == '__main__':
-    for result in test_richards(20):
-        print result
+    awpy_harness.run(bench_richards, samples=20, warmups=1)
@@ -13,7 +13,7 @@
 # Concurrency by Jason Stitt
 
 from itertools import izip
-import time
+import awpy_harness
 
 def eval_A (i, j):
     return 1.0 / ((i + j) * (i + j + 1) / 2 + i + 1)
@@ -42,12 +42,11 @@ def part_At_times_u((i,u)):
     return partial_sum
 
 DEFAULT_N = 130
+SWEEP_N = (65, 90, 130, 180, 260)
 
-def main(n):
-    times = []
-    for i in range(n):
-        t0 = time.time()
-        u = [1] * DEFAULT_N
+def bench(loops, n):
+    for i in xrange(loops):
+        u = [1] * n
 
         for dummy in xrange (10):
             v = eval_AtA_times_u (u)
@@ -58,10 +57,6 @@ def main(n):
         for ue, ve in izip (u, v):
             vBv += ue * ve
             vv  += ve * ve
-        tk = time.time()
-        times.append(tk - t0)
-    return times
     
 if __name__ == "__main__":
-    for result in main(20):
-        print result
+    awpy_harness.run(bench, samples=20, size=DEFAULT_N, sweep=SWEEP_N)
@@ -0,0 +1,137 @@
+"""
+
+Cache of previous benchmark results, keyed by the content of their inputs.
+
+Most of the time an engine's binaries haven't changed since the last bench,
+so re-measuring it just gives us the same numbers again at the cost of a lot
+of wall time.  To avoid this, each (benchmark, engine) pair is given a cache
+key that hashes everything that went into it: the engine's binaries and
+stdlib, the benchmark's source code, and the options that decide how many
+runs are done.  Previous results from the same machine that have
+a matching key can then be copied rather than measured again.
+
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime, timedelta
+
+
+def hash_files(paths):
+    """Hash the contents of the given files, in order."""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(hash_file(path))
+    return h.hexdigest()
+
+
+_file_hashes = {}
+
+
+def hash_file(path):
+    """Hash the contents of a file, following symlinks.
+
+    Engine binaries can be large, so hashes are remembered for as long as
+    the file's size and modification time stay the same.  Use
+    load_file_hashes() and save_file_hashes() to remember them between
+    processes.
+    """
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    memo_key = (path, st.st_size, st.st_mtime)
+    digest = _file_hashes.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(1024 * 1024)
+                if not data:
+                    break
+                h.update(data)
+        digest = _file_hashes[memo_key] = h.hexdigest()
+    return digest
+
+
+def load_file_hashes(cache_path):
+    """Remember the file hashes saved by save_file_hashes(), if any."""
+    if not os.path.exists(cache_path):
+        return
+    try:
+        with open(cache_path, "r") as f:
+            saved = json.load(f)
+    except ValueError:
+        return
+    for path, entry in saved.iteritems():
+        memo_key = (path, entry["size"], entry["mtime"])
+        _file_hashes.setdefault(memo_key, entry["sha256"])
+
+
+def save_file_hashes(cache_path):
+    """Save the latest hash of each file hashed so far to cache_path."""
+    to_save = {}
+    for (path, size, mtime), digest in _file_hashes.items():
+        entry = to_save.get(path)
+        if entry is None or entry["mtime"] < mtime:
+            to_save[path] = {"size": size, "mtime": mtime, "sha256": digest}
+    dirname = os.path.dirname(cache_path)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(to_save, f, sort_keys=True, indent=4)
+    os.rename(tmp_path, cache_path)
+
+
+def hash_strings(*items):
+    h = hashlib.sha256()
+    for item in items:
+        h.update(json.dumps(item, sort_keys=True))
+    return h.hexdigest()
+
+
+class ResultCache(object):
+    """Index of recent bench results recorded on this machine.
+
+    Each result file under results_dir with the given machine fingerprint,
+    and no older than max_age days, is loaded.  Lookups return the newest
+    matching result.
+    """
+
+    def __init__(self, results_dir, fingerprint, max_age=30):
+        self.results = []
+        if not os.path.isdir(results_dir):
+            return
+        oldest = datetime.utcnow() - timedelta(days=max_age)
+        oldest = oldest.strftime("%Y%m%d%H%M%S")
+        for filename in os.listdir(results_dir):
+            if not filename.endswith(".json"):
+                continue
+            # Filenames are "{timestamp}-{platform}-{fingerprint}.json".
+            timestamp = filename.split("-", 1)[0]
+            if timestamp < oldest:
+                continue
+            if not filename.endswith("-" + fingerprint + ".json"):
+                continue
+            with open(os.path.join(results_dir, filename), "r") as f:
+                res = json.load(f)
+            if "run_details" not in res:
+                continue
+            self.results.append(res)
+        self.results.sort(key=lambda r: r["timestamp"], reverse=True)
+
+    def lookup(self, key, engine_name, cache_key):
+        """Find cached (timestamp, runs, details) for a benchmark, or None."""
+        for res in self.results:
+            runs = res["benchmarks"]
+            details = res["run_details"]
+            for k in key:
+                runs = runs.get(k) or {}
+                details = details.get(k) or {}
+            runs = runs.get(engine_name)
+            details = details.get(engine_name)
+            if runs is None or details is None:
+                continue
+            if details.get("cache_key") == cache_key:
+                return res["timestamp"], runs, details
+        return None
@@ -0,0 +1,96 @@
+"""
+
+Journal of completed benchmark runs, for resuming an interrupted bench.
+
+A full benchmark run takes hours, so rather than only writing out results
+at the very end, each completed (category, benchmark, engine, run) is
+appended to a journal file as soon as it finishes.  The journal is a file
+of JSON records, one per line.  The first is a header holding the metadata
+of the bench, and each subsequent record holds the output of a single run.
+Every record is fsync'd to disk before we move on.
+
+"""
+
+import os
+import json
+
+
+class Journal(object):
+
+    def __init__(self, path, header, completed=None):
+        self.path = path
+        self.header = header
+        self.completed = completed if completed is not None else {}
+        self._file = open(path, "a")
+
+    @classmethod
+    def create(cls, path, header):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        if os.path.exists(path):
+            raise RuntimeError("Journal already exists: {}".format(path))
+        journal = cls(path, header)
+        journal._write(dict(header, type="header"))
+        return journal
+
+    @classmethod
+    def resume(cls, path):
+        header = None
+        completed = {}
+        with open(path, "r") as f:
+            for ln in f:
+                try:
+                    record = json.loads(ln)
+                except ValueError:
+                    # The final record may have been cut short by a crash,
+                    # in which case that run will simply be done again.
+                    continue
+                if record.get("type") == "header":
+                    header = record
+                elif record.get("type") == "run":
+                    run_key = (
+                        tuple(record["key"]),
+                        record["engine"],
+                        record["run"],
+                    )
+                    completed[run_key] = (record["times"], record["details"])
+        if header is None:
+            raise RuntimeError("No header found in journal: {}".format(path))
+        del header["type"]
+        cls._truncate_partial_line(path)
+        return cls(path, header, completed)
+
+    @staticmethod
+    def _truncate_partial_line(path):
+        # Cut off a record that was cut short by a crash, so that the next
+        # record doesn't get appended onto the end of it.
+        with open(path, "r+b") as f:
+            data = f.read()
+            if data and not data.endswith("\n"):
+                f.truncate(data.rfind("\n") + 1)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def get(self, key, engine_name, index):
+        """Get (times, details) for a previously-completed run, or None."""
+        return self.completed.get((tuple(key), engine_name, index))
+
+    def record(self, key, engine_name, index, times, details):
+        self.completed[(tuple(key), engine_name, index)] = (times, details)
+        self._write({
+            "type": "run",
+            "key": list(key),
+            "engine": engine_name,
+            "run": index,
+            "times": times,
+            "details": details,
+        })
+
+    def close(self):
+        self._file.close()
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, sort_keys=True) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
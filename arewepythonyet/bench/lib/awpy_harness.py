@@ -0,0 +1,173 @@
+"""
+
+Common timing harness for the python benchmarks.
+
+A benchmark defines a function that runs its workload a given number of
+times in a loop, and passes it to run().  We first calibrate the number of
+inner loops so that each sample takes at least a minimum time, which keeps
+the timer's resolution from dominating fast benchmarks.  Then we run some
+warmup samples, followed by the samples that are actually reported.
+
+Each sample is printed as a machine-readable record of the form:
+
+    @awpy {"iteration": 0, "loops": 10, "elapsed": 0.52, "overhead": 1e-06}
+
+giving the time for all the inner loops and the measured overhead of
+reading the timer, so the time per loop is (elapsed - overhead) / loops.
+Warmup samples are marked with "warmup": true.
+
+The number of samples and warmups, and the minimum sample time, can be
+given on the command line as --samples, --warmups and --min-time, or
+in the environment as AWPY_SAMPLES, AWPY_WARMUPS and AWPY_MIN_TIME.
+Otherwise the defaults given by the benchmark are used.
+
+A benchmark may also declare a problem size, which its function is called
+with, and a list of sizes to sweep over.  The size can be given as --size,
+and given --sweep (or AWPY_SWEEP) the harness instead calibrates and runs
+each size of the sweep in turn.  The records then also give the "size".
+
+This must also work under pypy.js, where it is loaded by the bench runner
+rather than imported from disk, and where the high-resolution clock that
+the runner provides to all js scripts is used as the timer.
+
+"""
+
+import sys
+import time
+
+
+RECORD_PREFIX = "@awpy "
+
+DEFAULT_MIN_TIME = 0.1
+
+MAX_LOOPS = 1000000
+
+
+def _get_timer():
+    try:
+        import js
+    except ImportError:
+        return time.time
+    now = js.globals["awpyNow"]
+    return lambda: float(now())
+
+
+timer = _get_timer()
+
+
+def get_timer_overhead(timer=timer, trials=100):
+    """Measure the minimum time taken by a pair of timer calls."""
+    overhead = None
+    for _ in xrange(trials):
+        t0 = timer()
+        t1 = timer()
+        if overhead is None or t1 - t0 < overhead:
+            overhead = t1 - t0
+    return max(overhead, 0.0)
+
+
+def get_setting(name, default, convert=int):
+    """Get a setting from the command line, the environment, or the default."""
+    flag = "--" + name.replace("_", "-")
+    argv = getattr(sys, "argv", None) or []
+    for i, arg in enumerate(argv):
+        if arg == flag and i + 1 < len(argv):
+            return convert(argv[i + 1])
+        if arg.startswith(flag + "="):
+            return convert(arg[len(flag) + 1:])
+    try:
+        import os
+        value = os.environ.get("AWPY_" + name.upper())
+    except (ImportError, AttributeError):
+        value = None
+    if value:
+        return convert(value)
+    return default
+
+
+def get_flag(name):
+    """Check for a boolean setting on the command line or the environment."""
+    argv = getattr(sys, "argv", None) or []
+    if "--" + name.replace("_", "-") in argv:
+        return True
+    return bool(get_setting(name, 0, int))
+
+
+def print_record(iteration, loops, elapsed, overhead, warmup=False,
+                 size=None):
+    # Formatted by hand so that we don't need to load the json module,
+    # which is slow under pypy.js.  The repr of a float is valid json.
+    record = '{"iteration": %d, "loops": %d, "elapsed": %r, "overhead": %r' % (
+        iteration, loops, float(elapsed), float(overhead)
+    )
+    if warmup:
+        record += ', "warmup": true'
+    if size is not None:
+        record += ', "size": %d' % (size,)
+    print RECORD_PREFIX + record + "}"
+
+
+def time_loops(func, loops):
+    t0 = timer()
+    func(loops)
+    t1 = timer()
+    return t1 - t0
+
+
+def calibrate(func, min_time):
+    """Find how many inner loops are needed to take at least min_time.
+
+    The trials are only used to pick the number of loops, and none of them
+    is reported as a sample, so that all the samples are taken after
+    calibration has finished.
+    """
+    loops = 1
+    while True:
+        elapsed = time_loops(func, loops)
+        if elapsed >= min_time or loops >= MAX_LOOPS:
+            return loops
+        # Aim a little over the target, but don't grow too fast in case
+        # the first few loops were unusually quick.
+        if elapsed > 0:
+            target = int(loops * min_time * 1.2 / elapsed) + 1
+        else:
+            target = loops * 10
+        loops = min(max(target, loops * 2), loops * 10, MAX_LOOPS)
+
+
+def run(func, samples=20, warmups=0, min_time=DEFAULT_MIN_TIME,
+        size=None, sweep=()):
+    """Run a benchmark function, printing a record for each sample.
+
+    The function is called with the number of times to run its workload,
+    and also with the problem size if the benchmark has one.  Benchmarks
+    without a size are run as normal when sweeping.
+    """
+    samples = get_setting("samples", samples)
+    warmups = get_setting("warmups", warmups)
+    min_time = get_setting("min_time", min_time, float)
+    overhead = get_timer_overhead()
+    if size is None:
+        run_samples(func, samples, warmups, min_time, overhead)
+    elif sweep and get_flag("sweep"):
+        for sweep_size in sweep:
+            run_samples(sized(func, sweep_size), samples, warmups, min_time,
+                        overhead, sweep_size)
+    else:
+        size = get_setting("size", size)
+        run_samples(sized(func, size), samples, warmups, min_time,
+                    overhead, size)
+
+
+def sized(func, size):
+    return lambda loops: func(loops, size)
+
+
+def run_samples(func, samples, warmups, min_time, overhead, size=None):
+    loops = calibrate(func, min_time)
+    for i in xrange(warmups + samples):
+        elapsed = time_loops(func, loops)
+        if i < warmups:
+            print_record(i, loops, elapsed, overhead, True, size)
+        else:
+            print_record(i - warmups, loops, elapsed, overhead, False, size)
@@ -0,0 +1,218 @@
+"""
+
+Probes for collecting metadata about how the engines were built.
+
+Each probe finds a single item of build metadata, such as the git revision
+of a checkout or the version reported by a compiler.  Some of them have to
+shell out to slow or unreliable tools (starting a docker container takes
+several seconds, and fails outright if docker isn't running) so all the
+probes are run concurrently, each with its own timeout, and any probe that
+fails just reports None.
+
+Results are cached on disk, keyed by the contents of the files that each
+probe reads and the modification times of the tools that it calls, so
+that they only need to be re-run when something has actually changed.
+
+"""
+
+import os
+import json
+import time
+import threading
+from distutils.spawn import find_executable
+
+from arewepythonyet.bench.cache import hash_strings
+
+
+class Probe(object):
+    """Base class for build metadata probes.
+
+    Subclasses should set "name" and implement run(), and may implement
+    get_files() and get_tools() to list what the result depends on.  If
+    the result depends on something we can't check, like the contents of
+    a docker image, then "max_age" limits how long it is cached for.
+    """
+
+    name = None
+    timeout = 10
+    max_age = None
+
+    def __init__(self, benv):
+        self.benv = benv
+
+    def get_files(self):
+        """Files whose contents the result depends on."""
+        return []
+
+    def get_tools(self):
+        """Names of executables whose mtimes the result depends on."""
+        return []
+
+    def cache_key(self):
+        deps = [self.name]
+        for path in self.get_files():
+            try:
+                with open(path, "r") as f:
+                    deps.append(f.read())
+            except (IOError, OSError):
+                deps.append(None)
+        for tool in self.get_tools():
+            path = self.find_tool(tool)
+            if path is None:
+                deps.append(None)
+            else:
+                deps.append([path, os.stat(path).st_mtime])
+        return hash_strings(*deps)
+
+    def find_tool(self, tool):
+        path = self.benv.abspath("build", "bin", tool)
+        if os.path.exists(path):
+            return path
+        return find_executable(tool)
+
+    def run(self):
+        raise NotImplementedError
+
+
+class GitRevisionProbe(Probe):
+
+    def __init__(self, benv, name, ref_path):
+        super(GitRevisionProbe, self).__init__(benv)
+        self.name = name
+        self.ref_path = benv.abspath(ref_path)
+
+    def get_files(self):
+        return [self.ref_path]
+
+    def run(self):
+        with open(self.ref_path, "r") as f:
+            return f.read().strip()
+
+
+class CommandProbe(Probe):
+    """Probe reporting part of the output of a command."""
+
+    def __init__(self, benv, name, cmd, max_age=None, timeout=None):
+        super(CommandProbe, self).__init__(benv)
+        self.name = name
+        self.cmd = cmd
+        self.max_age = max_age
+        if timeout is not None:
+            self.timeout = timeout
+
+    def get_tools(self):
+        return [self.cmd[0]]
+
+    def run(self):
+        if self.find_tool(self.cmd[0]) is None:
+            return None
+        output = self.benv.bt(list(self.cmd), timeout=self.timeout)
+        return self.parse(output)
+
+    def parse(self, output):
+        return output.strip().split("\n")[0]
+
+
+class DockerImageProbe(CommandProbe):
+
+    def __init__(self, benv, name, image):
+        cmd = ["docker", "images", image]
+        super(DockerImageProbe, self).__init__(benv, name, cmd, 24 * 60 * 60)
+
+    def parse(self, output):
+        # The first line is a header, and there are no other lines if the
+        # image hasn't been pulled.
+        rows = [ln for ln in output.strip().split("\n")[1:] if ln.strip()]
+        if not rows:
+            return None
+        return rows[-1].split()[2]
+
+
+def get_default_probes(benv):
+    return [
+        # The git revision for pypyjs (and hence for pypy).
+        GitRevisionProbe(benv, "pypyjs_revision",
+                         "build/pypyjs/.git/refs/heads/master"),
+        # The git revision for cpython.
+        GitRevisionProbe(benv, "cpython_revision",
+                         "build/cpython/.git/refs/heads/2.7"),
+        # The git revision for gecko (and hence for spidermonkey).
+        GitRevisionProbe(benv, "gecko_revision",
+                         "build/gecko-dev/.git/refs/heads/master"),
+        # The git revision for v8.
+        GitRevisionProbe(benv, "v8_revision",
+                         "build/v8/.git/refs/heads/master"),
+        # The docker image used to build pypyjs.
+        DockerImageProbe(benv, "pypyjs_build_image", "rfkelly/pypyjs-build"),
+        # The version reported by emcc.  Starting the container can take
+        # much longer than the other probes.
+        CommandProbe(benv, "emcc_version",
+                     ["docker", "run", "rfkelly/pypyjs-build", "emcc",
+                      "--version"],
+                     max_age=24 * 60 * 60, timeout=120),
+        # The version reported by native clang.
+        CommandProbe(benv, "clang_version", ["clang", "--version"]),
+    ]
+
+
+def run_probes(probes, cache_path=None):
+    """Run the given probes concurrently, returning a dict of their results.
+
+    Results are read from and written to the cache file at cache_path,
+    if given.  A probe that fails or times out reports None, which is
+    not cached.
+    """
+    cache = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+        except ValueError:
+            cache = {}
+    results = {}
+    threads = []
+    lock = threading.Lock()
+    now = time.time()
+
+    def run_probe(probe, key):
+        try:
+            value = probe.run()
+        except Exception as e:
+            print "WARNING: build probe {} failed: {}".format(probe.name, e)
+            return
+        with lock:
+            results[probe.name] = value
+            if value is not None:
+                cache[probe.name] = {"key": key, "value": value, "time": now}
+
+    for probe in probes:
+        key = probe.cache_key()
+        cached = cache.get(probe.name)
+        if cached is not None and cached["key"] == key:
+            if probe.max_age is None or now - cached["time"] < probe.max_age:
+                results[probe.name] = cached["value"]
+                continue
+        thread = threading.Thread(target=run_probe, args=(probe, key))
+        thread.daemon = True
+        thread.start()
+        threads.append((probe, thread))
+    for probe, thread in threads:
+        # The probe's own commands are killed after its timeout, so this
+        # is just a backstop in case it gets stuck somewhere else.
+        thread.join(max(0, now + probe.timeout + 5 - time.time()))
+        if thread.is_alive():
+            print "WARNING: build probe {} timed out".format(probe.name)
+    with lock:
+        output = {}
+        for probe in probes:
+            output[probe.name] = results.get(probe.name)
+        to_save = dict(cache)
+    if cache_path is not None:
+        dirname = os.path.dirname(cache_path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(to_save, f, sort_keys=True, indent=4)
+        os.rename(tmp_path, cache_path)
+    return output
@@ -0,0 +1,235 @@
+"""
+
+Helpers for managing the child processes that run the benchmarks.
+
+Rather than waiting for a benchmark process to exit before looking at its
+output, we read from its pipes as data arrives.  This lets us timestamp
+each line of output on the host side, and keep whatever output we got if
+the process has to be killed for running too long.  Each child is started
+in its own process group so that killing it also kills any processes that
+it spawned in turn.  Children are reaped with os.wait4() so that we can
+report on their resource usage.
+
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import subprocess
+
+
+def _get_monotonic_clock():
+    """Find a monotonic clock function, returning time in seconds.
+
+    Python 2 has no time.monotonic(), so we fall back to calling the
+    clock_gettime() function from libc, and if all else fails we just
+    use the wall clock.
+    """
+    if hasattr(time, "monotonic"):
+        return time.monotonic
+    try:
+        import ctypes
+        import ctypes.util
+        if sys.platform.startswith("linux"):
+            clock_id = 1
+        elif sys.platform == "darwin":
+            clock_id = 6
+        else:
+            raise OSError("unknown CLOCK_MONOTONIC for " + sys.platform)
+
+        class timespec(ctypes.Structure):
+            _fields_ = [
+                ("tv_sec", ctypes.c_long),
+                ("tv_nsec", ctypes.c_long),
+            ]
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        clock_gettime = libc.clock_gettime
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+        def monotonic():
+            ts = timespec()
+            if clock_gettime(clock_id, ctypes.byref(ts)) != 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            return ts.tv_sec + ts.tv_nsec * 1e-9
+
+        monotonic()
+        return monotonic
+    except (ImportError, OSError, AttributeError):
+        return time.time
+
+
+monotonic = _get_monotonic_clock()
+
+
+class ProcessFailed(subprocess.CalledProcessError):
+    """A process exited with an error; includes the tail of its stderr."""
+
+    def __init__(self, returncode, cmd, output=None, stderr=None):
+        super(ProcessFailed, self).__init__(returncode, cmd, output)
+        self.stderr = stderr
+
+    def __str__(self):
+        msg = super(ProcessFailed, self).__str__()
+        if self.stderr:
+            msg += "\n" + tail(self.stderr)
+        return msg
+
+
+class ProcessTimeout(RuntimeError):
+    """A process was killed for running too long.
+
+    Any output it produced before being killed is available as the
+    "stdout" and "stderr" attributes.
+    """
+
+    def __init__(self, cmd, timeout, stdout=None, stderr=None):
+        msg = "Command '{}' timed out after {} seconds".format(cmd, timeout)
+        super(ProcessTimeout, self).__init__(msg)
+        self.cmd = cmd
+        self.timeout = timeout
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+def tail(output, max_bytes=4096):
+    """Get the end of some output, for including in diagnostics."""
+    if output is None or len(output) <= max_bytes:
+        return output
+    return "..." + output[-max_bytes:]
+
+
+def poll(proc):
+    """Check whether a process has exited, like proc.poll().
+
+    This reaps the process using os.wait4() and stores its resource usage
+    as a dict in proc.rusage, which will be None until the process exits.
+    """
+    if not hasattr(proc, "rusage"):
+        proc.rusage = None
+    if proc.returncode is None:
+        pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        if pid == proc.pid:
+            if os.WIFSIGNALED(status):
+                proc.returncode = -os.WTERMSIG(status)
+            else:
+                proc.returncode = os.WEXITSTATUS(status)
+            proc.rusage = rusage_to_dict(rusage)
+    return proc.returncode
+
+
+def rusage_to_dict(rusage):
+    # Linux reports max RSS in kilobytes, while OSX reports it in bytes.
+    max_rss = rusage.ru_maxrss
+    if sys.platform != "darwin":
+        max_rss *= 1024
+    return {
+        "max_rss": max_rss,
+        "user_time": rusage.ru_utime,
+        "system_time": rusage.ru_stime,
+        "voluntary_switches": rusage.ru_nvcsw,
+        "involuntary_switches": rusage.ru_nivcsw,
+        "minor_faults": rusage.ru_minflt,
+        "major_faults": rusage.ru_majflt,
+    }
+
+
+def new_process_group():
+    """Put the calling process in its own process group.
+
+    This is intended to be used as (part of) the preexec_fn for a child.
+    """
+    os.setpgid(0, 0)
+
+
+def kill_process_group(proc, grace=5):
+    """Kill a process and everything in its process group.
+
+    We send SIGTERM first, and then SIGKILL if the process hasn't exited
+    after the given grace period.
+    """
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+            # The group has already gone, but the process itself may
+            # not have been reaped yet.
+        deadline = monotonic() + grace
+        while poll(proc) is None and monotonic() < deadline:
+            time.sleep(0.05)
+        if poll(proc) is not None:
+            return
+
+
+def communicate(proc, cmd, timeout=None, line_times=None):
+    """Read all output from a process and wait for it to exit.
+
+    This is like proc.communicate() but reads stdout and stderr as the
+    data arrives.  If line_times is given then the time at which each line
+    of stdout arrived, in seconds since this function was called, is
+    appended to it.  If the process is still running after the given
+    timeout then its whole process group is killed, and ProcessTimeout is
+    raised carrying any output produced so far.  Once the process exits,
+    its resource usage is available in proc.rusage.
+    """
+    start = monotonic()
+    if timeout is not None:
+        deadline = start + timeout
+    else:
+        deadline = None
+    chunks = {}
+    stdout_fd = stderr_fd = None
+    if proc.stdout is not None:
+        stdout_fd = proc.stdout.fileno()
+        chunks[stdout_fd] = []
+    if proc.stderr is not None:
+        stderr_fd = proc.stderr.fileno()
+        chunks[stderr_fd] = []
+    open_fds = list(chunks)
+    timed_out = False
+    try:
+        while True:
+            if deadline is None:
+                remaining = None
+            else:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+            if open_fds:
+                ready, _, _ = select.select(open_fds, [], [], remaining)
+            else:
+                # All output has been read, just wait for it to exit.
+                if poll(proc) is not None:
+                    break
+                ready = []
+                time.sleep(0.05 if remaining is None else min(remaining, 0.05))
+            for fd in ready:
+                data = os.read(fd, 65536)
+                if not data:
+                    open_fds.remove(fd)
+                    continue
+                chunks[fd].append(data)
+                if fd == stdout_fd and line_times is not None:
+                    now = monotonic() - start
+                    line_times.extend([now] * data.count("\n"))
+    finally:
+        if poll(proc) is None:
+            kill_process_group(proc)
+        for f in (proc.stdout, proc.stderr):
+            if f is not None:
+                f.close()
+    stdout = stderr = None
+    if stdout_fd is not None:
+        stdout = "".join(chunks[stdout_fd])
+    if stderr_fd is not None:
+        stderr = "".join(chunks[stderr_fd])
+    if timed_out:
+        raise ProcessTimeout(cmd, timeout, stdout, stderr)
+    return stdout, stderr
@@ -1,9 +1,27 @@
+// Python code can push promises onto awpyPending to have us wait for
+// them before the run is done, e.g. when it sets up callbacks from js
+// that will only run after the python code has returned.
+var awpyPending = [];
+
+// The VM that is running the current python code, so that it can find
+// its own asm.js heap from js.
+var awpyVM = null;
+
+function awpyWaitPending() {
+  var pending = awpyPending.splice(0, awpyPending.length);
+  if (!pending.length) {
+    return Promise.resolve();
+  }
+  return Promise.all(pending).then(awpyWaitPending);
+}
+
 load("{{pypyjs_lib}}")
+awpyVM = pypyjs;
 pypyjs.ready().then(function() {
   return pypyjs.loadModuleData.apply(pypyjs, {{py_imports}})
 }).then(function() {
   return pypyjs.exec({{py_code}})
-}).catch(function(err) {
+}).then(awpyWaitPending).catch(function(err) {
   printErr(err);
   throw err;
 });
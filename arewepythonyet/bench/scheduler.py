@@ -0,0 +1,148 @@
+"""
+
+Scheduling of independent benchmark runs onto a pool of workers.
+
+Each (benchmark, engine, run) triple is independent of all the others, so
+on a multi-core machine we can execute several of them at once.  To stop
+concurrent runs from fighting over caches, each worker owns a single cpu
+core and every child process it launches is pinned to that core.
+
+With a single job, runs are executed inline in the calling thread in the
+order they were submitted, which is exactly the old serial behaviour.
+
+"""
+
+import os
+import sys
+import Queue
+import threading
+import collections
+
+import psutil
+
+
+def parse_cpu_list(cpu_list):
+    """Parse a kernel-style cpu list such as "0-3,8" into a list of ints."""
+    cores = []
+    for item in cpu_list.strip().split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "-" in item:
+            first, last = item.split("-", 1)
+            cores.extend(xrange(int(first), int(last) + 1))
+        else:
+            cores.append(int(item))
+    return cores
+
+
+def get_available_cores():
+    """Get the list of cpu cores that benchmark workers may be pinned to.
+
+    If the kernel was booted with isolated cores then we use those, since
+    nothing else will be scheduled onto them.  Otherwise we use whichever
+    cores the current process is allowed to run on.  On platforms without
+    support for cpu affinity, this returns None.
+    """
+    try:
+        with open("/sys/devices/system/cpu/isolated", "r") as f:
+            isolated = parse_cpu_list(f.read())
+    except (IOError, OSError):
+        isolated = []
+    if isolated:
+        return isolated
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    try:
+        return sorted(psutil.Process().cpu_affinity())
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def pin_to_core(core, pid=0):
+    """Restrict the given process (default: this one) to a single core."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(pid, [core])
+    else:
+        psutil.Process(pid or os.getpid()).cpu_affinity([core])
+
+
+class Scheduler(object):
+    """Pool of workers executing benchmark runs, one per pinned core.
+
+    Jobs are added with submit() and their results collected by iterating
+    over completed(), which yields (tag, result, exc_info) tuples in order
+    of completion.  It's fine to submit more jobs while iterating, e.g. to
+    schedule further runs based on the results obtained so far.
+    """
+
+    def __init__(self, jobs=1, cores=None):
+        if jobs < 1:
+            raise ValueError("need at least one job, not {}".format(jobs))
+        self.jobs = jobs
+        self.cores = []
+        self._local = threading.local()
+        self._pending = 0
+        self._done = Queue.Queue()
+        self._workers = []
+        if jobs == 1:
+            self._todo = collections.deque()
+            return
+        if cores is None:
+            cores = get_available_cores()
+        if cores is None:
+            print "WARNING: cpu affinity not supported, not pinning jobs"
+            cores = [None] * jobs
+        elif len(cores) < jobs:
+            msg = "only {} cores available for {} jobs"
+            raise ValueError(msg.format(len(cores), jobs))
+        self.cores = cores[:jobs]
+        self._todo = Queue.Queue()
+        for core in self.cores:
+            worker = threading.Thread(target=self._work, args=(core,))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def current_core(self):
+        """Get the core assigned to the calling worker, if any."""
+        return getattr(self._local, "core", None)
+
+    def submit(self, tag, func, *args):
+        self._pending += 1
+        if self._workers:
+            self._todo.put((tag, func, args))
+        else:
+            self._todo.append((tag, func, args))
+
+    def completed(self):
+        while self._pending > 0:
+            if self._workers:
+                outcome = self._done.get()
+            else:
+                tag, func, args = self._todo.popleft()
+                outcome = self._execute(tag, func, args)
+            self._pending -= 1
+            yield outcome
+
+    def close(self):
+        for _ in self._workers:
+            self._todo.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _work(self, core):
+        self._local.core = core
+        while True:
+            job = self._todo.get()
+            if job is None:
+                break
+            self._done.put(self._execute(*job))
+
+    def _execute(self, tag, func, args):
+        try:
+            result = func(*args)
+        except Exception:
+            return (tag, None, sys.exc_info())
+        return (tag, result, None)
@@ -0,0 +1,122 @@
+"""
+
+Measurement of the download size of the interpreter files.
+
+Each file is compressed in memory with a range of codecs that a web server
+or CDN might use as its transfer encoding, so that we can see which of them
+gives the smallest download.  The interpreter files are large and mostly
+unchanged from one bench to the next, so the compressed sizes are cached on
+disk keyed by the hash of each file's contents.
+
+"""
+
+import os
+import bz2
+import json
+import zlib
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+from arewepythonyet.bench.cache import hash_file
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _zlib_codec(level, wbits):
+    return lambda: zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+
+# Each codec maps to a function creating a compressor object with the
+# usual compress() and flush() methods.  The "gzip" codecs give the size
+# of a gzip stream (as for Content-Encoding: gzip) while "deflate" gives
+# the size of a zlib stream (as for Content-Encoding: deflate) and
+# "deflate-raw" the bare deflate data without any header.
+CODECS = {
+    "gzip-1": _zlib_codec(1, 16 + zlib.MAX_WBITS),
+    "gzip-6": _zlib_codec(6, 16 + zlib.MAX_WBITS),
+    "gzip-9": _zlib_codec(9, 16 + zlib.MAX_WBITS),
+    "deflate-9": _zlib_codec(9, zlib.MAX_WBITS),
+    "deflate-raw-9": _zlib_codec(9, -zlib.MAX_WBITS),
+    "bz2-9": lambda: bz2.BZ2Compressor(9),
+}
+
+if lzma is not None:
+    CODECS["xz-6"] = lambda: lzma.LZMACompressor()
+
+
+def compressed_sizes(path, codecs):
+    """Compress a file with each of the given codecs, returning the sizes.
+
+    The file is read in chunks and fed through all the compressors at
+    once, so that it only needs to be read from disk a single time.
+    """
+    compressors = dict((codec, CODECS[codec]()) for codec in codecs)
+    sizes = dict((codec, 0) for codec in codecs)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+            for codec, compressor in compressors.iteritems():
+                sizes[codec] += len(compressor.compress(data))
+    for codec, compressor in compressors.iteritems():
+        sizes[codec] += len(compressor.flush())
+    return sizes
+
+
+class SizeCache(object):
+    """On-disk cache of compressed file sizes, keyed by file hash."""
+
+    def __init__(self, path):
+        self.path = path
+        self.sizes = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.sizes = json.load(f)
+            except ValueError:
+                self.sizes = {}
+
+    def get_sizes(self, path):
+        """Get the raw and compressed sizes of a file, for every codec."""
+        digest = hash_file(path)
+        sizes = self.sizes.setdefault(digest, {})
+        missing = [codec for codec in CODECS if codec not in sizes]
+        if missing:
+            sizes.update(compressed_sizes(path, missing))
+        sizes["raw"] = os.stat(path).st_size
+        return dict((codec, sizes[codec]) for codec in ["raw"] + list(CODECS))
+
+    def save(self):
+        dirname = os.path.dirname(self.path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.sizes, f, sort_keys=True, indent=4)
+        os.rename(tmp_path, self.path)
+
+
+def measure_sizes(lib_dir, filenames, optional_filenames, cache):
+    """Measure the sizes of the given files in lib_dir, under every codec.
+
+    Optional files that don't exist are skipped.  Returns a dict with the
+    sizes of each file under "files", and the combined size under "totals".
+    """
+    files = {}
+    totals = dict((codec, 0) for codec in ["raw"] + list(CODECS))
+    for filename in list(filenames) + list(optional_filenames):
+        path = os.path.join(lib_dir, filename)
+        if filename in optional_filenames and not os.path.exists(path):
+            continue
+        files[filename] = cache.get_sizes(path)
+        for codec, size in files[filename].iteritems():
+            totals[codec] += size
+    return {"files": files, "totals": totals}
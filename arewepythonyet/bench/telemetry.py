@@ -0,0 +1,279 @@
+"""
+
+Telemetry about how noisy the machine is while the benchmarks are running.
+
+A busy machine, thermal throttling or a powersave cpu governor are the
+most common sources of false regressions.  To catch them we check that the
+machine is quiet before starting, and sample its state in a background
+thread for the whole bench.  Each sample records the load average, the
+frequency of each cpu relative to its maximum, the number of times each cpu
+has been thermally throttled, and how much cpu was used by processes other
+than the bench itself.  From these we calculate a noise score for each run,
+covering the period in which it was executing.
+
+"""
+
+import os
+import glob
+import time
+import resource
+import threading
+
+import psutil
+
+from arewepythonyet.bench.process import monotonic
+
+
+CPUFREQ_GLOB = "/sys/devices/system/cpu/cpu[0-9]*/cpufreq"
+THROTTLE_GLOB = "/sys/devices/system/cpu/cpu[0-9]*/thermal_throttle"
+
+
+def read_cpufreq(name):
+    """Read a cpufreq value for each cpu, e.g. "scaling_cur_freq".
+
+    Returns a dict mapping cpu directory names to values, which will be
+    empty on platforms without cpufreq support.
+    """
+    values = {}
+    for cpufreq_dir in sorted(glob.glob(CPUFREQ_GLOB)):
+        cpu = os.path.basename(os.path.dirname(cpufreq_dir))
+        try:
+            with open(os.path.join(cpufreq_dir, name), "r") as f:
+                value = f.read().strip()
+        except (IOError, OSError):
+            continue
+        try:
+            value = int(value)
+        except ValueError:
+            pass
+        values[cpu] = value
+    return values
+
+
+def get_frequency_ratios():
+    """Get the frequency of each cpu as a fraction of its maximum."""
+    cur_freqs = read_cpufreq("scaling_cur_freq")
+    max_freqs = read_cpufreq("cpuinfo_max_freq")
+    ratios = {}
+    for cpu, cur_freq in cur_freqs.iteritems():
+        max_freq = max_freqs.get(cpu)
+        if max_freq:
+            ratios[cpu] = float(cur_freq) / max_freq
+    return ratios
+
+
+def get_throttle_counts():
+    """Get the number of times each cpu has been thermally throttled.
+
+    Returns a dict mapping cpu directory names to counts, which will be
+    empty on platforms that don't report them.
+    """
+    counts = {}
+    for throttle_dir in sorted(glob.glob(THROTTLE_GLOB)):
+        cpu = os.path.basename(os.path.dirname(throttle_dir))
+        try:
+            with open(os.path.join(throttle_dir, "core_throttle_count")) as f:
+                counts[cpu] = int(f.read().strip())
+        except (IOError, OSError, ValueError):
+            continue
+    return counts
+
+
+def get_busy_time():
+    """Get the total busy cpu time of the machine, in cpu-seconds."""
+    times = psutil.cpu_times()
+    idle = times.idle + getattr(times, "iowait", 0)
+    return sum(times) - idle
+
+
+def get_own_time():
+    """Get the total cpu time used by this process and all its descendants.
+
+    This includes children that have already exited and been reaped, so
+    that it increases steadily even as benchmark processes come and go.
+    """
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    for child in psutil.Process().children(recursive=True):
+        try:
+            times = child.cpu_times()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        total += times.user + times.system
+    return total
+
+
+class NoiseSampler(object):
+    """Background thread sampling the noise level of the machine.
+
+    Each sample is a dict giving the monotonic "time" at which it was
+    taken, the "period" in seconds since the previous sample, the 1-minute
+    "load" average, the frequency of each cpu as a fraction of its maximum
+    ("cpu_freq_ratios") along with their average and minimum ("freq_ratio"
+    and "min_freq_ratio", or None if unknown), the thermal throttling count
+    of each cpu ("throttle_counts"), and the "foreign" cpu usage by other
+    processes as a fraction of the total cpu capacity of the machine, since
+    the previous sample.  Extra samples can be taken at any time by calling
+    sample(), e.g. at the start and end of each run.
+    """
+
+    def __init__(self, interval=5):
+        self.interval = interval
+        self.samples = []
+        self.cpu_count = psutil.cpu_count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last = None
+
+    def start(self):
+        self._stopped.clear()
+        with self._lock:
+            self._last = (monotonic(), get_busy_time(), get_own_time())
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            self.sample()
+
+    def sample(self):
+        with self._lock:
+            if self._last is None:
+                return None
+            now, busy, own = (monotonic(), get_busy_time(), get_own_time())
+            last_now, last_busy, last_own = self._last
+            self._last = (now, busy, own)
+            capacity = (now - last_now) * self.cpu_count
+            foreign = 0.0
+            if capacity > 0:
+                foreign = max(0.0, (busy - last_busy) - (own - last_own))
+                foreign = min(1.0, foreign / capacity)
+            cpu_ratios = get_frequency_ratios()
+            ratios = cpu_ratios.values()
+            sample = {
+                "time": now,
+                "period": now - last_now,
+                "load": os.getloadavg()[0],
+                "cpu_freq_ratios": cpu_ratios,
+                "freq_ratio": None,
+                "min_freq_ratio": None,
+                "throttle_counts": get_throttle_counts(),
+                "foreign": foreign,
+            }
+            if ratios:
+                sample["freq_ratio"] = sum(ratios) / len(ratios)
+                sample["min_freq_ratio"] = min(ratios)
+            self.samples.append(sample)
+            return sample
+
+    def noise_between(self, start, end, min_period=1.0, cores=None):
+        """Calculate the noise during the given period of monotonic time.
+
+        The noise "score" is the average foreign cpu usage, plus one if any
+        of the given cores (or any cpu, if the run wasn't pinned) was
+        thermally throttled, so zero is a perfectly quiet machine.  The
+        frequency of the cores is reported as "core_freq_ratio" but isn't
+        counted in the score, since with a powersave governor or turbo it
+        is well below the maximum even on a quiet machine.  Since each
+        sample covers the period since the previous one, we include the
+        first sample after the end.  The kernel only counts cpu time in
+        ticks of around 10ms, so for very short runs we also include
+        earlier samples until they cover at least min_period seconds.
+        """
+        with self._lock:
+            first = last = len(self.samples)
+            for i, sample in enumerate(self.samples):
+                if sample["time"] > start and first == len(self.samples):
+                    first = i
+                if sample["time"] >= end:
+                    last = i + 1
+                    break
+            # Throttling is counted from the last sample before the start.
+            before = self.samples[first - 1] if first > 0 else None
+            period = sum(s["period"] for s in self.samples[first:last])
+            while first > 0 and period < min_period:
+                first -= 1
+                period += self.samples[first]["period"]
+            samples = self.samples[first:last]
+        if not samples:
+            return None
+        cpus = None
+        if cores is not None:
+            cpus = set("cpu{}".format(core) for core in cores)
+        # Samples are taken at irregular times, so weight by their periods.
+        period = sum(s["period"] for s in samples)
+        if period > 0:
+            foreign = sum(s["foreign"] * s["period"] for s in samples) / period
+        else:
+            foreign = max(s["foreign"] for s in samples)
+        load = max(s["load"] for s in samples)
+        ratios = [s["freq_ratio"] for s in samples
+                  if s["freq_ratio"] is not None]
+        noise = {
+            "foreign": foreign,
+            "load": load,
+            "num_samples": len(samples),
+            "score": foreign,
+        }
+        if ratios:
+            noise["freq_ratio"] = sum(ratios) / len(ratios)
+            noise["min_freq_ratio"] = min(s["min_freq_ratio"] for s in samples
+                                          if s["min_freq_ratio"] is not None)
+        if cpus:
+            core_ratios = [
+                ratio
+                for s in samples
+                for cpu, ratio in s.get("cpu_freq_ratios", {}).iteritems()
+                if cpu in cpus
+            ]
+            if core_ratios:
+                noise["core_freq_ratio"] = sum(core_ratios) / len(core_ratios)
+        if before is not None:
+            start_counts = before.get("throttle_counts", {})
+            end_counts = samples[-1].get("throttle_counts", {})
+            throttled = sum(
+                count - start_counts[cpu]
+                for cpu, count in end_counts.iteritems()
+                if cpu in start_counts and (cpus is None or cpu in cpus)
+            )
+            if start_counts:
+                noise["throttled"] = throttled
+            if throttled > 0:
+                noise["score"] += 1.0
+        return noise
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+
+def preflight(max_load=1.0, max_foreign=0.1, duration=2):
+    """Check whether the machine is quiet enough to run benchmarks.
+
+    Returns a list of warning messages, which will be empty if all is well.
+    """
+    warnings = []
+    sampler = NoiseSampler()
+    sampler.start()
+    time.sleep(duration)
+    sampler.stop()
+    sample = sampler.samples[-1]
+    if sample["load"] > max_load:
+        msg = "load average is {:.2f}, above the limit of {:.2f}"
+        warnings.append(msg.format(sample["load"], max_load))
+    if sample["foreign"] > max_foreign:
+        msg = ("other processes are using {:.0%} of cpu, "
+               "above the limit of {:.0%}")
+        warnings.append(msg.format(sample["foreign"], max_foreign))
+    for cpu, governor in sorted(read_cpufreq("scaling_governor").iteritems()):
+        if governor != "performance":
+            msg = "{} is using the {!r} cpufreq governor"
+            warnings.append(msg.format(cpu, governor))
+    return warnings
@@ -0,0 +1,36 @@
+// High-resolution clock, injected at the top of every templated script.
+// Date.now() only has millisecond resolution, which is a visible share of
+// the variance for benchmarks whose iterations take a fraction of a second,
+// so we use the best clock that the shell has to offer.  It returns time
+// in seconds, and python code can use it as js.globals["awpyNow"] so that
+// both sides of the bridge benchmarks are timed with the same clock.
+
+var awpyNow = (function() {
+  // d8 and recent SpiderMonkey shells.
+  if (typeof performance !== "undefined" &&
+      typeof performance.now === "function") {
+    var now = function() { return performance.now() / 1000; };
+    now.clock = "performance.now";
+    return now;
+  }
+  // Older SpiderMonkey shells, with microsecond resolution.
+  if (typeof dateNow === "function") {
+    var now = function() { return dateNow() / 1000; };
+    now.clock = "dateNow";
+    return now;
+  }
+  // Node-style shells.
+  if (typeof process !== "undefined" &&
+      typeof process.hrtime === "function") {
+    var now = function() {
+      var t = process.hrtime();
+      return t[0] + t[1] / 1e9;
+    };
+    now.clock = "process.hrtime";
+    return now;
+  }
+  var now = function() { return Date.now() / 1000; };
+  now.clock = "Date.now";
+  return now;
+})();
+
@@ -0,0 +1,131 @@
+"""
+
+Attribution of the size of pypyjs.vm.js to the parts of the interpreter.
+
+The compiled interpreter is a single large asm.js module, in which every
+function keeps the name that RPython gave it.  By finding the boundaries
+of each function we can attribute its bytes to a prefix of its name (which
+is usually the RPython class or module it came from) and to a coarse
+bucket such as the GC or the JIT backend.  Static data lives in the .mem
+file, which has no symbols, so we can only bucket it by its contents.
+
+"""
+
+import os
+import re
+
+
+FUNCTION_RE = re.compile(r"\bfunction\s+([\w$]+)\s*\(")
+FUNCTION_TABLE_RE = re.compile(r"^\s*var\s+FUNCTION_TABLE\w*\s*=.*$", re.M)
+START_FUNCS = "// EMSCRIPTEN_START_FUNCS"
+END_FUNCS = "// EMSCRIPTEN_END_FUNCS"
+
+# Coarse buckets for function names, checked in order.
+BUCKETS = [
+    ("gc", re.compile(r"^_pypy_g_(IncrementalMiniMarkGC|MiniMarkGC|"
+                      r"ArenaCollection|gc_|.*_gc_)")),
+    ("jit", re.compile(r"^_pypy_g_(.*[Jj]it|Assembler|ASMJS|ResOp|"
+                       r"Optimiz|MetaInterp|MIFrame|BlackholeInterp)")),
+    ("rlib", re.compile(r"^_pypy_g_(ll_|rpy_|RPy|rbigint|rstr|rlist|rdict)")),
+    ("interp", re.compile(r"^_pypy_g_")),
+    ("runtime", re.compile(r"")),
+]
+
+ZEROS_RE = re.compile(r"\x00{8,}")
+STRINGS_RE = re.compile(r"[\t\n\r\x20-\x7e]{4,}\x00")
+
+
+def get_prefix(name):
+    """Get the grouping prefix of a function name.
+
+    For RPython functions this is the first component of the name after
+    "pypy_g_", which is usually a class name, or the first two components
+    for names like "W_IntObject" and "ll_dict".
+    """
+    if not name.startswith("_pypy_g_"):
+        return "runtime"
+    parts = name[len("_pypy_g_"):].split("_")
+    if len(parts) > 1 and parts[0] in ("W", "ll", "rpy", "gc"):
+        return "_".join(parts[:2])
+    return parts[0]
+
+
+def get_bucket(name):
+    for bucket, pattern in BUCKETS:
+        if pattern.match(name):
+            return bucket
+    return "runtime"
+
+
+def analyze_vm(lib_dir, top_n=20):
+    """Break down the size of pypyjs.vm.js and its .mem file.
+
+    Returns a dict giving the total bytes in each coarse bucket under
+    "buckets", the top_n largest function name prefixes as a list of
+    [prefix, bytes] pairs under "top", and the number of functions.
+    """
+    buckets = {}
+    prefixes = {}
+    with open(os.path.join(lib_dir, "pypyjs.vm.js"), "r") as f:
+        source = f.read()
+    # Only look for functions inside the asm.js module, if we can find it.
+    start = source.find(START_FUNCS)
+    end = source.find(END_FUNCS, max(start, 0))
+    if start == -1 or end == -1:
+        start, end = 0, len(source)
+    functions = [(m.start(), m.group(1))
+                 for m in FUNCTION_RE.finditer(source, start, end)]
+    if functions:
+        start = functions[0][0]
+    bounds = [f[0] for f in functions[1:]] + [end]
+    for (func_start, name), func_end in zip(functions, bounds):
+        size = func_end - func_start
+        bucket = get_bucket(name)
+        buckets[bucket] = buckets.get(bucket, 0) + size
+        prefix = get_prefix(name)
+        prefixes[prefix] = prefixes.get(prefix, 0) + size
+    # Everything outside the functions is either a function table,
+    # or the javascript glue code that loads and runs the module.
+    tables = sum(len(m.group(0)) for m in FUNCTION_TABLE_RE.finditer(
+        source, end
+    ))
+    buckets["function_tables"] = tables
+    buckets["glue"] = start + len(source) - end - tables
+    mem_path = os.path.join(lib_dir, "pypyjs.vm.js.mem")
+    if os.path.exists(mem_path):
+        with open(mem_path, "rb") as f:
+            data = f.read()
+        zeros = sum(len(m.group(0)) for m in ZEROS_RE.finditer(data))
+        strings = sum(len(m.group(0)) for m in STRINGS_RE.finditer(data))
+        buckets["mem:zeros"] = zeros
+        buckets["mem:strings"] = strings
+        buckets["mem:other"] = len(data) - zeros - strings
+    top = sorted(prefixes.iteritems(), key=lambda p: (-p[1], p[0]))[:top_n]
+    return {
+        "buckets": buckets,
+        "top": [list(p) for p in top],
+        "num_functions": len(functions),
+    }
+
+
+def diff_breakdowns(old, new, top_n=10):
+    """Compare two breakdowns, naming the biggest growers.
+
+    Returns a dict with the change in size of each bucket under "buckets",
+    and the top_n prefixes that grew the most under "growers".  Only the
+    top prefixes are recorded, so a prefix missing from the old breakdown
+    is reported as having grown from zero.
+    """
+    buckets = {}
+    for bucket in set(old["buckets"]) | set(new["buckets"]):
+        buckets[bucket] = (new["buckets"].get(bucket, 0) -
+                           old["buckets"].get(bucket, 0))
+    old_top = dict(old["top"])
+    growth = [(prefix, size - old_top.get(prefix, 0))
+              for (prefix, size) in new["top"]]
+    growth = [g for g in growth if g[1] > 0]
+    growth.sort(key=lambda g: (-g[1], g[0]))
+    return {
+        "buckets": buckets,
+        "growers": [list(g) for g in growth[:top_n]],
+    }
@@ -0,0 +1,79 @@
+// Driver for running many python benchmarks in a single shell process,
+// so that the cost of loading pypyjs.js is only paid once per engine.
+// Each line on stdin is a JSON payload giving the "code" to execute and
+// the "imports" that it needs.  The output of each payload is followed
+// by a line containing the delimiter and either "ok" or "error".
+
+// Python code can push promises onto awpyPending to have us wait for
+// them before the run is done, e.g. when it sets up callbacks from js
+// that will only run after the python code has returned.
+var awpyPending = [];
+
+// The VM that is running the current python code, so that it can find
+// its own asm.js heap from js.
+var awpyVM = null;
+
+function awpyWaitPending() {
+  var pending = awpyPending.splice(0, awpyPending.length);
+  if (!pending.length) {
+    return Promise.resolve();
+  }
+  return Promise.all(pending).then(awpyWaitPending);
+}
+
+load("{{pypyjs_lib}}")
+
+var freshVM = {{fresh_vm}};
+var delimiter = "{{delimiter}}";
+
+// When payloads share a VM, we put its imported modules and globals back
+// the way they were before the first payload after each one, so that a
+// benchmark doesn't see what earlier ones left behind.
+var SNAPSHOT = [
+  "import sys as _awpy_sys",
+  "def _awpy_reset(modules, names):",
+  "    scope = globals()",
+  "    for name in list(_awpy_sys.modules):",
+  "        if name not in modules:",
+  "            del _awpy_sys.modules[name]",
+  "    scope.clear()",
+  "    scope.update(names)",
+  "    scope['_awpy_baseline'] = (modules, names)",
+  "_awpy_baseline = (set(_awpy_sys.modules), dict(globals()))",
+].join("\n");
+
+function resetVM(vm) {
+  if (freshVM) {
+    return Promise.resolve();
+  }
+  return vm.exec("_awpy_reset(*_awpy_baseline)");
+}
+
+function nextPayload() {
+  var line = readline();
+  if (line === null || line === undefined || line === "") {
+    quit(0);
+  }
+  var payload = JSON.parse(line);
+  var vm = freshVM ? new pypyjs() : pypyjs;
+  awpyVM = vm;
+  return vm.ready().then(function() {
+    return vm.loadModuleData.apply(vm, payload.imports)
+  }).then(function() {
+    return vm.exec(payload.code)
+  }).then(awpyWaitPending).then(function() {
+    print(delimiter + " ok");
+  }, function(err) {
+    printErr(err);
+    print(delimiter + " error");
+  }).then(function() {
+    return resetVM(vm);
+  }).then(nextPayload);
+}
+
+pypyjs.ready().then(function() {
+  return freshVM ? null : pypyjs.exec(SNAPSHOT);
+}).then(nextPayload).catch(function(err) {
+  printErr(err);
+  throw err;
+});
@@ -0,0 +1,191 @@
+"""
+
+Statistical helpers shared by the bench runner and the summarizer.
+
+Benchmark results take the form of a list of runs, each of which is a list
+of individual timing results from the iterations within that run.
+
+"""
+
+import math
+import random
+
+
+def geometric_mean(results):
+    count = 0
+    product = 1
+    for res in results:
+        product *= res
+        count += 1
+    return math.pow(product, 1.0 / count)
+
+
+def arithmetic_mean(results):
+    total = 0.0
+    count = 0
+    for res in results:
+        total += res
+        count += 1
+    return total / count
+
+
+def median(results):
+    results = sorted(results)
+    middle = len(results) // 2
+    if len(results) % 2:
+        return results[middle]
+    return (results[middle - 1] + results[middle]) / 2.0
+
+
+ESTIMATORS = {
+    "mean": arithmetic_mean,
+    "median": median,
+}
+
+
+def bootstrap_ci(runs, estimator="mean", confidence=0.95, resamples=1000):
+    """Calculate a bootstrap confidence interval over a list of runs.
+
+    The statistic is the chosen estimator applied to the mean of each run.
+    Since the variation between runs is typically much larger than that
+    between iterations within a run, we do a two-level bootstrap: each
+    resample picks runs with replacement, then iterations within each of
+    those runs with replacement.  Returns a (point, lower, upper) tuple.
+    """
+    estimate = ESTIMATORS[estimator]
+    point = estimate([arithmetic_mean(run) for run in runs])
+    # Use a fixed seed so that re-running on the same data gives the
+    # same answer, and hence the same decision about doing more runs.
+    rng = random.Random(0)
+    samples = []
+    for _ in xrange(resamples):
+        run_means = []
+        for _ in xrange(len(runs)):
+            run = rng.choice(runs)
+            run_means.append(arithmetic_mean(
+                rng.choice(run) for _ in xrange(len(run))
+            ))
+        samples.append(estimate(run_means))
+    samples.sort()
+    tail = (1.0 - confidence) / 2
+    lower = samples[int(math.floor(tail * (resamples - 1)))]
+    upper = samples[int(math.ceil((1.0 - tail) * (resamples - 1)))]
+    return point, lower, upper
+
+
+def relative_ci_width(runs, estimator="mean", confidence=0.95):
+    """Width of the bootstrap confidence interval, relative to the estimate."""
+    point, lower, upper = bootstrap_ci(runs, estimator, confidence)
+    return (upper - lower) / abs(point)
+
+
+def fit_power_law(sizes, times):
+    """Fit times = coefficient * size ** exponent by least squares in log-log.
+
+    Returns the (exponent, coefficient) pair.  An exponent near 1 means
+    that the time grows linearly with the problem size, while a constant
+    overhead shows up as an exponent well below the benchmark's expected
+    complexity.
+    """
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(t) for t in times]
+    x_mean = arithmetic_mean(xs)
+    y_mean = arithmetic_mean(ys)
+    sxx = sum((x - x_mean) ** 2 for x in xs)
+    sxy = sum((x - x_mean) * (y - y_mean) for (x, y) in zip(xs, ys))
+    exponent = sxy / sxx
+    return exponent, math.exp(y_mean - exponent * x_mean)
+
+
+def detect_steady_state(series, min_segment=2, tolerance=0.05):
+    """Find where a run's sequence of iteration results reaches steady state.
+
+    This segments the series at changes in its mean, using binary
+    segmentation with a BIC-style penalty, in the spirit of Kalibera and
+    Jones.  Trailing segments whose means are within the given relative
+    tolerance of the final segment are considered part of the steady state,
+    and everything before them is warmup.  If the steady state is shorter
+    than a quarter of the series then we consider that no steady state was
+    reached.  Returns a dict with the number of "warmup" iterations, the
+    "steady_state" segment as [start, end) indices, a "steady" flag, and
+    the list of detected "changepoints".
+
+    A run that steps down to a faster speed after a few iterations:
+
+    >>> state = detect_steady_state([3.0, 2.9, 3.1, 3.0] +
+    ...                             [1.0, 1.02, 0.98, 1.01] * 2)
+    >>> state["changepoints"], state["warmup"], state["steady_state"]
+    ([4], 4, [4, 12])
+
+    and one that only changes speed right at the end:
+
+    >>> state = detect_steady_state([1.0, 1.01, 0.99, 1.0] * 3 + [2.0, 2.01])
+    >>> state["changepoints"], state["steady"]
+    ([12], False)
+    """
+    n = len(series)
+    if n < 2 * min_segment:
+        return {
+            "warmup": 0,
+            "steady_state": [0, n],
+            "steady": True,
+            "changepoints": [],
+        }
+    # Estimate the noise level from successive differences, which is robust
+    # to the shifts in mean that we're trying to find.
+    diffs = [abs(series[i + 1] - series[i]) for i in xrange(n - 1)]
+    sigma = median(diffs) / (0.6745 * math.sqrt(2))
+    scale = tolerance * abs(arithmetic_mean(series))
+    penalty = 2 * math.log(n) * max(sigma ** 2, scale ** 2)
+    changepoints = sorted(_binary_segmentation(series, 0, n, min_segment,
+                                               penalty))
+    bounds = [0] + changepoints + [n]
+    segments = [(bounds[i], bounds[i + 1]) for i in xrange(len(bounds) - 1)]
+    # Merge trailing segments that are equivalent to the final one.
+    start, end = segments[-1]
+    final_mean = arithmetic_mean(series[start:end])
+    for (seg_start, seg_end) in reversed(segments[:-1]):
+        seg_mean = arithmetic_mean(series[seg_start:seg_end])
+        if abs(seg_mean - final_mean) > tolerance * abs(final_mean):
+            break
+        start = seg_start
+    if (end - start) * 4 < n:
+        return {
+            "warmup": None,
+            "steady_state": None,
+            "steady": False,
+            "changepoints": changepoints,
+        }
+    return {
+        "warmup": start,
+        "steady_state": [start, end],
+        "steady": True,
+        "changepoints": changepoints,
+    }
+
+
+def _segment_cost(series, start, end):
+    values = series[start:end]
+    mean = arithmetic_mean(values)
+    return sum((v - mean) ** 2 for v in values)
+
+
+def _binary_segmentation(series, start, end, min_segment, penalty):
+    if end - start < 2 * min_segment:
+        return []
+    total_cost = _segment_cost(series, start, end)
+    best_split = None
+    best_cost = total_cost
+    for split in xrange(start + min_segment, end - min_segment + 1):
+        cost = (_segment_cost(series, start, split) +
+                _segment_cost(series, split, end))
+        if cost < best_cost:
+            best_split = split
+            best_cost = cost
+    if best_split is None or total_cost - best_cost <= penalty:
+        return []
+    return (
+        _binary_segmentation(series, start, best_split, min_segment, penalty) +
+        [best_split] +
+        _binary_segmentation(series, best_split, end, min_segment, penalty)
+    )
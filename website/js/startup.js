@@ -5,6 +5,16 @@ $(document).ready(function() {
   });
   cfg_jit.add_widget("#config-filesize-jit");
   cfg_jit.add_widget("#config-loadtime-jit");
+  cfg_jit.add_widget("#config-loadphases-jit");
+
+  var cfg_shell = new AWPY.ConfigOption("shell", {
+    default: "js"
+  });
+  cfg_shell.add_widget("#config-loadphases-shell");
+
+  // Phases of startup reported by the load time benchmark, in the order
+  // that they happen.
+  var LOAD_PHASES = ["lib_load", "vm_load", "mem_fetch", "init", "first_exec"];
 
   function cfg_js_engines() {
     if (cfg_jit.value === "on") {
@@ -79,6 +89,47 @@ $(document).ready(function() {
     }
   });
 
+  // Load time broken down into phases, stacked so that each line is the
+  // time taken up to the end of its phase.
+
+  var miscLoadPhases = new AWPY.Graph({
+    target: "#graph-load-phases",
+    legend: LOAD_PHASES,
+    legend_target: "#legend-load-phases",
+    x_accessor: "timestamp",
+    y_accessor: "value",
+    y_label: "load time (seconds)",
+    data: function() {
+      return AWPY.fetch("data/summary/misc/benchmarks/load_time.json").then((function(ts) {
+        var engine = cfg_shell.value + "+pypy" + (cfg_jit.value === "on" ? "" : "-nojit");
+        var data = [];
+        for (var j = 0; j < LOAD_PHASES.length; j++) {
+          data.push([]);
+        }
+        var results = ts["values"];
+        for (var i = results.length - 1; i >= 0; i--) {
+          var e_res = results[i].engines[engine];
+          // Older results don't have the breakdown.
+          if (!e_res || !e_res.phases) {
+            continue;
+          }
+          var total = 0;
+          for (var j = 0; j < LOAD_PHASES.length; j++) {
+            total += e_res.phases[LOAD_PHASES[j]] || 0;
+            data[j].push({
+              "timestamp": results[i]["timestamp"],
+              "value": total,
+            });
+          }
+        }
+        if (!data[0].length) {
+          return undefined;
+        }
+        return data;
+      }).bind(this));
+    }
+  });
+
   $("#localtime-test-now").on("click", function() {
     var $this = $(this);
     $this.off("click");